@@ -1,4 +1,8 @@
+import multiprocessing
+
 from dcscope.__main__ import main
 
 if __name__ == "__main__":
+    # required for the process pool of the task manager
+    multiprocessing.freeze_support()
     main()
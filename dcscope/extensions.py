@@ -2,6 +2,7 @@ import collections
 import functools
 import pathlib
 import shutil
+import sys
 
 from dclab.util import hashfile
 from dclab.rtdc_dataset.feat_anc_plugin import plugin_feature
@@ -228,6 +229,7 @@ class Extension:
             # do not load disabled extensions or extensions already loaded
             return
 
+        sys_path = list(sys.path)
         try:
             if self.type == "feat_anc_plugin":
                 plugin_feature.load_plugin_feature(self.path)
@@ -236,6 +238,11 @@ class Extension:
             # raise the exception.
             self.set_enabled(False)
             raise
+        finally:
+            # dclab does not restore `sys.path` properly, which would break
+            # the process pool of the TaskManager (spawned processes
+            # inherit `sys.path`).
+            sys.path[:] = sys_path
 
     def unload(self):
         """Unload the extension"""
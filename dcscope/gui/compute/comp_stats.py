@@ -88,10 +88,12 @@ class ComputeStatistics(QtWidgets.QDialog):
         if self.ui.comboBox.currentIndex() == 0:
             # from pipeline
             prog.setMaximum(len(self.pipeline.slots))
+            # only export slots "used" (#15)
+            futures = self.pipeline.prepare_rays(self.pipeline.slots_used)
             for slot_index in range(len(self.pipeline.slots)):
                 slot = self.pipeline.slots[slot_index]
-                if slot.slot_used:  # only export slots "used" (#15)
-                    ds = self.pipeline.get_dataset(slot_index)
+                if slot.identifier in futures:
+                    ds = futures[slot.identifier].result()
                     h, v = dclab.statistics.get_statistics(ds,
                                                            methods=methods,
                                                            features=features)
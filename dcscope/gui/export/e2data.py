@@ -221,6 +221,8 @@ class ExportData(QtWidgets.QDialog):
         tm.add_task(
             task=task,
             topic="export",
+            # interactive tasks (e.g. QuickView) are served first
+            priority=-10,
             communicate_progress=prog.setValue,
             communicate_message=prog.setLabelText,
         )
@@ -1,3 +1,8 @@
+import contextlib
+
+from PyQt6 import QtCore
+
+
 def connect_pp_mod_signals(parent, child):
     """The sender-receiver signal pyramid
 
@@ -32,3 +37,117 @@ def disconnect_pp_mod_signals(parent, child):
     """
     parent.pp_mod_recv.disconnect(child.pp_mod_recv)
     child.pp_mod_send.disconnect(parent.pp_mod_send)
+
+
+class PPModCoalescer(QtCore.QObject):
+    """Coalesce bursts of pipeline modification signals
+
+    Widgets may send many pipeline modifications in quick
+    succession (e.g. a plot window sends `plot_size_changed` for
+    every resize event while the user drags its border). The first
+    modification is passed on immediately. Identical modifications
+    that follow within `interval` milliseconds are passed on once
+    when the interval has passed, so the final state is always
+    delivered. Different modifications are never merged, because
+    the receivers act on the keys and values of each modification
+    (e.g. a plot ignores modifications with "plot_changed" set to
+    another plot); they are passed on in order.
+
+    Only modifications of existing pipeline elements are coalesced
+    (see :const:`COALESCE_KEYS`). Other signals (e.g. elements that
+    were added or removed) are passed on immediately, after any
+    pending modifications.
+
+    Within :func:`hold`, no modifications are passed on at all.
+    """
+    #: emitted with the (combined) pipeline modification dictionary
+    pp_mod_send = QtCore.pyqtSignal(dict)
+
+    #: pipeline modifications that may be coalesced
+    COALESCE_KEYS = {
+        "pipeline": ["filter_modified",
+                     "filter_ray_change",
+                     "filter_toggled",
+                     "plot_changed",
+                     ],
+        "pipeline-rendering": ["plot_range_corrected",
+                               "plot_size_changed",
+                               ],
+    }
+
+    def __init__(self, parent=None, interval=50):
+        super(PPModCoalescer, self).__init__(parent)
+        #: interval in milliseconds (zero disables coalescing)
+        self.interval = interval
+        self._pending = None
+        # modifications received within `hold`
+        self._held = []
+        self._hold_count = 0
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.on_timeout)
+
+    @QtCore.pyqtSlot(dict)
+    def on_pp_mod_recv(self, data):
+        if self._hold_count:
+            self._held.append(data)
+        elif self.interval <= 0 or not self.can_coalesce(data):
+            self.flush()
+            self.pp_mod_send.emit(data)
+        elif not self._timer.isActive():
+            # pass on the first modification of a burst immediately
+            self._timer.start(self.interval)
+            self.pp_mod_send.emit(data)
+        else:
+            if self._pending is not None and self._pending != data:
+                # different modifications are sent in order
+                self.pp_mod_send.emit(self._pending)
+            self._pending = data
+
+    @QtCore.pyqtSlot()
+    def on_timeout(self):
+        if self._pending is not None and not self._hold_count:
+            data = self._pending
+            self._pending = None
+            # start a new interval for modifications that follow
+            self._timer.start(self.interval)
+            self.pp_mod_send.emit(data)
+
+    def can_coalesce(self, data):
+        """Whether a modification dictionary may be coalesced"""
+        for key, value in data.items():
+            if (not isinstance(value, dict)
+                    or not set(value) <= set(self.COALESCE_KEYS.get(key, []))):
+                return False
+        return bool(data)
+
+    @contextlib.contextmanager
+    def hold(self):
+        """Do not pass on any modifications until the context is left
+
+        Use this when Qt events are processed while the pipeline is
+        being modified (e.g. to show a progress dialog), so that the
+        receivers do not access the pipeline in the meantime. The
+        modifications received are passed on in order afterwards.
+        """
+        self._hold_count += 1
+        try:
+            yield
+        finally:
+            self._hold_count -= 1
+            if not self._hold_count:
+                held = self._held
+                self._held = []
+                for data in held:
+                    self.on_pp_mod_recv(data)
+                if self._pending is not None and not self._timer.isActive():
+                    self.flush()
+
+    def flush(self):
+        """Send pending modifications immediately"""
+        self._timer.stop()
+        if self._pending is not None:
+            data = self._pending
+            self._pending = None
+            self.pp_mod_send.emit(data)
+
@@ -1,8 +1,10 @@
 import json
 import logging
+import os
 import pathlib
 import signal
 import sys
+import threading
 import traceback
 import webbrowser
 
@@ -34,7 +36,8 @@ from . import (
     update,
     widgets,
 )
-from .helpers import connect_pp_mod_signals, disconnect_pp_mod_signals
+from .helpers import (PPModCoalescer, connect_pp_mod_signals,
+                      disconnect_pp_mod_signals)
 from .main_ui import Ui_MainWindow
 
 # global plotting configuration parameters
@@ -68,15 +71,6 @@ class DCscope(QtWidgets.QMainWindow):
         self.activateWindow()
         self.showMaximized()
 
-        # task manager for loading sessions and plotting
-        self.tm = tasks.TaskManager(self)
-        self.tm.task_done.connect(self.on_update_tasks_label)
-
-        # progress bar in lower right corner
-        self.tasks_label = QtWidgets.QLabel(self)
-        self.tasks_label.setText("")
-        self.ui.statusbar.addPermanentWidget(self.tasks_label)
-
         logging.basicConfig(format='%(levelname)s:%(message)s',
                             level=logging.INFO)
 
@@ -139,6 +133,23 @@ class DCscope(QtWidgets.QMainWindow):
             self.settings.value("cache/disk store size", "9")) * 1000**3))
         store_keeper.set_memory_store_size(
             int(self.settings.value("cache/memory num", "200")))
+        # maximum number of datasets kept open by the dataslots
+        pipeline.dataslot.dataset_pool.max_open = int(
+            self.settings.value("cache/open datasets", "256"))
+
+        # task manager for loading sessions and plotting
+        self.tm = tasks.TaskManager(
+            self,
+            num_workers=int(self.settings.value("advanced/task workers",
+                                                os.cpu_count() or 1)),
+            num_processes=int(self.settings.value("advanced/task processes",
+                                                  "0")))
+        self.tm.task_done.connect(self.on_update_tasks_label)
+
+        # progress bar in lower right corner
+        self.tasks_label = QtWidgets.QLabel(self)
+        self.tasks_label.setText("")
+        self.ui.statusbar.addPermanentWidget(self.tasks_label)
 
         #: Extensions
         store_path = pathlib.Path(
@@ -243,8 +254,14 @@ class DCscope(QtWidgets.QMainWindow):
         self.widget_ana_view.ui.widget_filter.request_edit_polygon_filter.connect(  # noqa: E501
             self.on_edit_polygon_filter)
 
-        # Top of the pipeline modification hierarchy
-        self.pp_mod_send.connect(self.on_pp_mod_recv)
+        # Top of the pipeline modification hierarchy (bursts of
+        # modifications are combined before they are passed on)
+        self.pp_mod_coalescer = PPModCoalescer(
+            self,
+            interval=int(self.settings.value(
+                "advanced/signal coalescing interval", "50")))
+        self.pp_mod_send.connect(self.pp_mod_coalescer.on_pp_mod_recv)
+        self.pp_mod_coalescer.pp_mod_send.connect(self.on_pp_mod_recv)
         connect_pp_mod_signals(self, self.ui.block_matrix)
         connect_pp_mod_signals(self, self.widget_quick_view)
         connect_pp_mod_signals(self, self.widget_ana_view)
@@ -304,33 +321,51 @@ class DCscope(QtWidgets.QMainWindow):
             self.ui.toolButton_new_plot.setEnabled(True)
             self.ui.block_matrix.ui.toolButton_new_plot.setEnabled(True)
 
-        failed_paths = []
-
-        slot_ids = []
-        # Create Dataslot instance and update block matrix
+        paths = []
+        for fn in fnames:
+            if is_dcor:
+                path = fn
+            else:
+                path = pathlib.Path(fn)
+                settings.set_dir("add_dataset", path, self.settings)
+            paths.append(path)
+
+        # add a filter if we don't have one already
+        if paths and self.pipeline.num_filters == 0:
+            self.add_filter()
+
+        # The datasets are opened in a thread pool, the progress dialog
+        # only shows up if this takes a while.
+        prog = QtWidgets.QProgressDialog("Loading datasets...", "Abort",
+                                         0, 1000, self)
+        prog.setWindowTitle("Loading datasets")
+        prog.setWindowModality(QtCore.Qt.WindowModality.WindowModal)
+        event_abort = threading.Event()
+
+        def communicate_progress(value):
+            prog.setValue(int(value * 1000))
+            QtWidgets.QApplication.processEvents(
+                QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 100)
+            if prog.wasCanceled():
+                event_abort.set()
+
+        # Create Dataslot instances (the progress dialog processes Qt
+        # events, so pipeline modifications are only passed on after
+        # all slots were added)
+        with self.pp_mod_coalescer.hold(), widgets.ShowWaitCursor():
+            slot_ids, failed = self.pipeline.add_slots(
+                paths,
+                communicate_progress=communicate_progress,
+                event_abort=event_abort)
+        prog.close()
+
+        if failed and len(paths) == 1:
+            # Let the user know immediately
+            raise failed[0][1]
+        failed_paths = [item for item, _ in failed]
+
+        # Update block matrix
         self.setUpdatesEnabled(False)
-        with widgets.ShowWaitCursor():
-            for fn in fnames:
-                if is_dcor:
-                    path = fn
-                else:
-                    path = pathlib.Path(fn)
-                    settings.set_dir("add_dataset", path, self.settings)
-                # add a filter if we don't have one already
-                if self.pipeline.num_filters == 0:
-                    self.add_filter()
-                try:
-                    slot_id = self.pipeline.add_slot(path=path)
-                except BaseException:
-                    if len(fnames) == 1:
-                        # Let the user know immediately
-                        raise
-                    else:
-                        failed_paths.append(path)
-                    continue
-
-                slot_ids.append(slot_id)
-
         self.pipeline.deduce_reduced_sample_names()
 
         self.pp_mod_send.emit({"pipeline": {"slots_added": slot_ids}})
@@ -401,6 +436,7 @@ class DCscope(QtWidgets.QMainWindow):
             closing = True
 
         if closing:
+            self.pp_mod_coalescer.flush()
             if self.widget_quick_view is not None:
                 self.widget_quick_view.close()
             self.tm.close()
@@ -1033,6 +1069,17 @@ class DCscope(QtWidgets.QMainWindow):
                 self.subwindows["quick_view"].setVisible(True)
             self.ui.mdiArea.setActiveSubWindow(self.subwindows["quick_view"])
 
+        if data.get("pipeline"):
+            # Determine which slots and plots were affected, so that
+            # the receivers can skip unaffected work.
+            dirty = self.pipeline.get_dirty_elements()
+            if [key for key in data["pipeline"]
+                    if key.startswith("extension")]:
+                # plugin features are not part of the pipeline state
+                dirty = {"slots": set(self.pipeline.slot_ids),
+                         "plots": set(self.pipeline.plot_ids)}
+            data = dict(data, dirty=dirty)
+
         # Send new signal to all receivers
         self.pp_mod_recv.emit(data)
 
@@ -1080,6 +1127,7 @@ class DCscope(QtWidgets.QMainWindow):
         self.widget_ana_view.set_pipeline(self.pipeline)
 
     def wait_for_tasks(self):
+        self.pp_mod_coalescer.flush()
         while self.tm.num_tasks:
             QtTest.QTest.qWait(100)
 
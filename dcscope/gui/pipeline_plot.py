@@ -7,7 +7,8 @@ import dclab
 from PyQt6 import QtCore, QtGui, QtWidgets
 
 from .. import util
-from .widgets import DCscopeColorBarItem
+from ..pipeline.plot import split_plot_state
+from .widgets import DCscopeColorBarItem, get_colormap
 from .pipeline_plot_item import PipelinePlotItem, get_axes_labels
 from .pipeline_plot_ui import Ui_Form
 
@@ -43,6 +44,12 @@ class PipelinePlot(QtWidgets.QWidget):
         # used to avoid unnecessary plotting
         self._plot_data_hash = "unset"
         self._plot_data_hash_lock = threading.Lock()
+        # used to only restyle the plot for presentation-only changes
+        self._plot_style_hash = "unset"
+
+        # plot title and colorbar (restyled in `update_content_style`)
+        self._title_label = None
+        self._colorbar = None
 
         self._window_decoration_size = (None, None)
 
@@ -84,6 +91,9 @@ class PipelinePlot(QtWidgets.QWidget):
                     "plot_created", self.identifier) != self.identifier
                 # A plot was removed.
                 or pip_data.get("plot_removed")
+                # This plot is not affected by the modification.
+                or self.identifier not in data.get(
+                    "dirty", {}).get("plots", [self.identifier])
             ):
                 pass
             else:
@@ -124,29 +134,40 @@ class PipelinePlot(QtWidgets.QWidget):
         )
         plot = self.pipeline.get_plot(self.identifier, run_checks=False)
         plot_state = plot.__getstate__()
+        # Presentation-only changes (e.g. line widths or the slot colors)
+        # are applied to the existing plot items (no recomputation).
+        data_state, presentation_state = split_plot_state(plot_state)
+        slot_data_states = []
+        slot_colors = []
+        for slot_state in slot_states:
+            slot_data_state = copy.deepcopy(slot_state)
+            slot_colors.append(slot_data_state.pop("color"))
+            slot_data_states.append(slot_data_state)
+        plot_style_hash = util.hashobj([presentation_state, slot_colors])
         # check whether anything changed
         # 1. plot state and all relevant slot states
-        tohash = [slot_states, plot_state]
-        # 2. all relevant filter states
+        tohash = [slot_data_states, data_state]
+        # 2. all relevant filter states (the filter hashes are cached
+        # and only recomputed for modified filters)
         for slot_state in slot_states:
             slot_id = slot_state["identifier"]
             for filt_id in self.pipeline.filter_ids:
                 if self.pipeline.is_element_active(slot_id, filt_id):
                     filt = self.pipeline.get_filter(filt_id)
-                    filt_state = filt.__getstate__()
-                    tohash.append([slot_id, filt_id, filt_state])
+                    tohash.append([slot_id, filt_id, filt.hash])
                     # also check whether the polygon filters changed (#26)
-                    for pid in filt_state["polygon filters"]:
+                    for pid in sorted(filt.polylist):
                         pf = dclab.PolygonFilter.get_instance_from_id(pid)
-                        tohash.append(pf.__getstate__())
+                        tohash.append(pf.hash)
         plot_data_hash = util.hashobj(tohash)
         with self._plot_data_hash_lock:
-            if plot_data_hash == self._plot_data_hash:
-                # do nothing
-                pass
-            else:
+            if plot_data_hash != self._plot_data_hash:
                 self._plot_data_hash = plot_data_hash
+                self._plot_style_hash = plot_style_hash
                 self.update_content_plot(plot_state, slot_states, dslist)
+            elif plot_style_hash != self._plot_style_hash:
+                self._plot_style_hash = plot_style_hash
+                self.update_content_style(plot_state, slot_states)
 
         self.update_geometry(plot_state)
 
@@ -195,6 +216,8 @@ class PipelinePlot(QtWidgets.QWidget):
 
         # clear widget
         self.ui.plot_layout.clear()
+        self._title_label = None
+        self._colorbar = None
 
         # set background to white
         self.ui.plot_layout.setBackground("w")
@@ -206,9 +229,10 @@ class PipelinePlot(QtWidgets.QWidget):
 
         # font size for plot title (default size + 2)
         size = "{}pt".format(QtGui.QFont().pointSize() + 2)
-        self.ui.plot_layout.addLabel(html.escape(lay["name"]),
-                                     colspan=3,
-                                     size=size)
+        self._title_label = self.ui.plot_layout.addLabel(
+            html.escape(lay["name"]),
+            colspan=3,
+            size=size)
         self.ui.plot_layout.nextRow()
 
         self.ui.plot_layout.addLabel(labely, angle=-90)
@@ -331,11 +355,35 @@ class PipelinePlot(QtWidgets.QWidget):
                 **colorbar_kwds
             )
             self.ui.plot_layout.addItem(colorbar)
+            self._colorbar = colorbar
 
         # x-axis label
         self.ui.plot_layout.nextRow()
         self.ui.plot_layout.addLabel(labelx, col=1)
 
+    def update_content_style(self, plot_state, slot_states):
+        """Apply presentation-only changes to the current plot
+
+        This does not recompute any plot data.
+        """
+        lay = plot_state["layout"]
+        sca = plot_state["scatter"]
+
+        self.setWindowTitle(lay["name"])
+        if self._title_label is not None:
+            size = "{}pt".format(QtGui.QFont().pointSize() + 2)
+            self._title_label.setText(html.escape(lay["name"]), size=size)
+
+        for pp in self.plot_items:
+            pp.restyle(plot_state, slot_states)
+
+        if self._colorbar is not None:
+            self._colorbar.setColorMap(get_colormap(sca["colormap"]))
+            label = dclab.dfn.get_feature_label(sca["hue feature"])
+            if sca["marker hue"] == "feature" and not label.endswith("[a.u.]"):
+                self._colorbar.setLevels((sca["hue min"], sca["hue max"]))
+            self._colorbar.setFixedHeight(min(300, lay["size y"] // 2))
+
 
 def get_hash_flag(hash_set, rtdc_ds):
     """Helper function to determine the hash flag based on the dataset and
@@ -4,14 +4,14 @@ The idea is you can only change the pyqtgraph plots in the main loop,
 but you can prepare the plotted data (e.g. KDE computation) in the
 background, keeping the UI responsive.
 """
-from dclab.kde import KernelDensityEstimator
 from dclab.kde.smooth_contour import compute_contour_opening_angles
 import numpy as np
 import pyqtgraph as pg
 
-from ..pipeline import Pipeline
+from ..pipeline import Pipeline, plot_data
+from ..pipeline.dataslot import get_dataset_lock
 
-from .widgets import get_colormap
+from .widgets import map_to_brushes
 
 
 def compute_contours_from_state(
@@ -19,6 +19,8 @@ def compute_contours_from_state(
         rtdc_ds,
         pipeline: Pipeline | None = None,
         slot_state: dict | None = None,
+        process_pool=None,
+        event_abort=None,
         ):
     """Compute the contours given the plot state and a dataset
 
@@ -27,27 +29,57 @@ def compute_contours_from_state(
 
     `slot_state` is not used, but required for correctly assigning a
     contour to a slot in the pipeline plot TaskManager workflow.
+
+    If `process_pool` is specified (and `pipeline` is given), the
+    contours are computed in a separate process
+    (see :mod:`dcscope.pipeline.plot_data`).
+
+    The contours are cached in :data:`.plot_data.plot_data_cache`.
     """
     if pipeline is not None:
         # get the latest plot state
         plot = pipeline.get_plot(plot_state["identifier"])
         plot_state = plot.__getstate__()
 
-    gen = plot_state["general"]
-    con = plot_state["contour"]
-    rtdc_ds.apply_filter()
-    # compute contour plot data
-    kde_instance = KernelDensityEstimator(rtdc_ds=rtdc_ds)
-    contours = kde_instance.get_contour_lines(
-        xax=gen["axis x"],
-        yax=gen["axis y"],
-        xacc=gen["spacing x"],
-        yacc=gen["spacing y"],
-        xscale=gen["scale x"],
-        yscale=gen["scale y"],
-        kde_type=gen["kde"],
-        quantiles=[p/100 for p in con["percentiles"]],
-    )
+    if process_pool is not None and pipeline is not None:
+        ray_state = plot_data.get_ray_state(pipeline, rtdc_ds.identifier)
+        cache_key = plot_data.get_cache_key(
+            "contour", plot_state,
+            plot_data.get_dataset_key(ray_state=ray_state))
+        contours = plot_data.plot_data_cache.get(cache_key)
+        if contours is None:
+            result = plot_data.run_in_process_pool(
+                process_pool,
+                plot_data.compute_contours_in_process,
+                ray_state,
+                plot_state,
+                event_abort=event_abort)
+            if result is None:
+                # aborted
+                return None
+            contours = plot_data.receive_contours(result)
+            plot_data.plot_data_cache.set(cache_key, contours)
+    else:
+        # The datasets of a slot are shared with other tasks (e.g. the
+        # scatter data of the same plot), which also apply the filters.
+        with get_dataset_lock(rtdc_ds):
+            rtdc_ds.apply_filter()
+            if event_abort is not None and event_abort.is_set():
+                # superseded by another task
+                return None
+            dataset_key = plot_data.get_dataset_key(rtdc_ds=rtdc_ds)
+            if dataset_key is None:
+                # not a filter ray dataset (the data are not cached)
+                cache_key = contours = None
+            else:
+                cache_key = plot_data.get_cache_key(
+                    "contour", plot_state, dataset_key)
+                contours = plot_data.plot_data_cache.get(cache_key)
+            if contours is None:
+                # compute contour plot data
+                contours = plot_data.compute_contours(rtdc_ds, plot_state)
+                if cache_key is not None:
+                    plot_data.plot_data_cache.set(cache_key, contours)
     return contours
 
 
@@ -75,11 +107,55 @@ def compute_contour_reliable(plot_state, contour, thresh_ang=np.deg2rad(23)):
     return reliable
 
 
+def compute_scatter_brush(plot_state, kde, hue=None, slot_state=None):
+    """Compute the brush(es) for scatter plot data
+
+    Parameters
+    ----------
+    plot_state: dict
+        plot state defining the marker hue
+    kde: 1d ndarray
+        normalized density of the scatter data
+        (used for "kde" marker hue)
+    hue: 1d ndarray
+        feature values of the scatter data
+        (used for "feature" marker hue)
+    slot_state: dict
+        slot state defining the color (used for "dataset" marker hue)
+    """
+    sca = plot_state["scatter"]
+    slot_state = slot_state or {}
+    if sca["marker hue"] == "kde":
+        # Note: we don't expand the density to [0, 1], because the
+        # colorbar will show "density" and because we don't want to
+        # compute the density in this function and not someplace else.
+        brush = map_to_brushes(kde, sca["colormap"])
+    elif sca["marker hue"] == "feature":
+        f_min = sca.get("hue min") or np.min(hue)
+        f_max = sca.get("hue max") or np.max(hue)
+        feat = (hue - f_min) / (f_max - f_min)
+        brush = map_to_brushes(feat, sca["colormap"], nan_color="#FF0000")
+    elif sca["marker hue"] == "dataset":
+        alpha = int(sca["marker alpha"] * 255)
+        colord = pg.mkColor(slot_state.get("color", "k"))
+        colord.setAlpha(alpha)
+        brush = pg.mkBrush(colord)
+    else:
+        alpha = int(sca["marker alpha"] * 255)
+        colork = pg.mkColor("#000000")
+        colork.setAlpha(alpha)
+        brush = pg.mkBrush(colork)
+
+    return brush
+
+
 def compute_scatter_data_from_state(
         plot_state,
         rtdc_ds,
         pipeline: Pipeline | None = None,
         slot_state: dict | None = None,
+        process_pool=None,
+        event_abort=None,
         ):
     """Compute scatte rplot data given the plot state and a dataset
 
@@ -88,90 +164,72 @@ def compute_scatter_data_from_state(
 
     `slot_state` is not used, but required for correctly assigning a
     contour to a slot in the pipeline plot TaskManager workflow.
+
+    If `process_pool` is specified (and `pipeline` is given), the
+    scatter data are computed in a separate process
+    (see :mod:`dcscope.pipeline.plot_data`).
+
+    The scatter data (not the brushes) are cached in
+    :data:`.plot_data.plot_data_cache`.
+
+    Returns
+    -------
+    x, y, kde, idx: 1d ndarrays
+        scatter data (see :func:`.plot_data.compute_scatter`)
+    brush: list or ndarray
+        brushes of the scatter points (see :func:`compute_scatter_brush`)
+    hue: 1d ndarray or None
+        values of the hue feature for "feature" marker hue, so that
+        the brushes can be recomputed without accessing `rtdc_ds`
     """
     if pipeline is not None:
         # get the latest plot state
         plot = pipeline.get_plot(plot_state["identifier"])
         plot_state = plot.__getstate__()
 
-    gen = plot_state["general"]
-    sca = plot_state["scatter"]
-    slot_state = slot_state or {}
-    rtdc_ds.apply_filter()
-
-    # get downsampled list of points for scatter plot
-    x, y, idx = rtdc_ds.get_downsampled_scatter(
-        downsample=sca["downsample"] * sca["downsampling value"],
-        xax=gen["axis x"],
-        yax=gen["axis y"],
-        xscale=gen["scale x"],
-        yscale=gen["scale y"],
-        remove_invalid=True,
-        ret_mask=True)
-
-    # create KDE instance
-    kde_instance = KernelDensityEstimator(rtdc_ds=rtdc_ds)
-
-    # interpolate the KDE at the specified positions
-    kde = kde_instance.get_at(
-        positions=(x, y),
-        xax=gen["axis x"],
-        yax=gen["axis y"],
-        kde_type=gen["kde"],
-        xscale=gen["scale x"],
-        yscale=gen["scale y"],
-        xacc=gen["spacing x"],
-        yacc=gen["spacing y"],
-    )
-
-    if kde.size:
-        kde_nan = np.isnan(kde)
-
-        if np.any(~kde_nan):
-            # We have non-nan values that we can normalize.
-            kde_min = np.nanmin(kde)
-            kde_max = np.nanmax(kde)
-            if not np.any(np.isnan([kde_min, kde_max])) and kde_min != kde_max:
-                kde -= kde_min
-                kde /= (kde_max - kde_min)
-
-        if np.any(kde_nan):
-            # Set all nan-values to zero so user can see the dots
-            kde[kde_nan] = 0
-
-    # brush
-    cmap = get_colormap(sca["colormap"])
-    if sca["marker hue"] == "kde":
-        # Note: we don't expand the density to [0, 1], because the
-        # colorbar will show "density" and because we don't want to
-        # compute the density in this function and not someplace else.
-        brush = [cmap.mapToQColor(k) for k in kde]
-        # Note, colors could also be digitized (does not seem to be faster):
-        # cbin = np.linspace(0, 1, 1000)
-        # dig = np.digitize(kde, cbin)
-        # for idx in dig:
-        #     brush.append(cmap.mapToQColor(cbin[idx]))
-    elif sca["marker hue"] == "feature":
-        brush = []
-        feat = np.asarray(rtdc_ds[sca["hue feature"]][idx], dtype=float)
-        f_min = sca.get("hue min") or np.min(feat)
-        f_max = sca.get("hue max") or np.max(feat)
-        feat -= f_min
-        feat /= f_max - f_min
-        for f in feat:
-            if np.isnan(f):
-                brush.append(pg.mkColor("#FF0000"))
-            else:
-                brush.append(cmap.mapToQColor(f))
-    elif sca["marker hue"] == "dataset":
-        alpha = int(sca["marker alpha"] * 255)
-        colord = pg.mkColor(slot_state.get("color", "k"))
-        colord.setAlpha(alpha)
-        brush = pg.mkBrush(colord)
+    if process_pool is not None and pipeline is not None:
+        ray_state = plot_data.get_ray_state(pipeline, rtdc_ds.identifier)
+        cache_key = plot_data.get_cache_key(
+            "scatter", plot_state,
+            plot_data.get_dataset_key(ray_state=ray_state))
+        data = plot_data.plot_data_cache.get(cache_key)
+        if data is None:
+            result = plot_data.run_in_process_pool(
+                process_pool,
+                plot_data.compute_scatter_in_process,
+                ray_state,
+                plot_state,
+                event_abort=event_abort)
+            if result is None:
+                # aborted
+                return None
+            data = tuple(plot_data.receive_scatter(result))
+            plot_data.plot_data_cache.set(cache_key, data)
     else:
-        alpha = int(sca["marker alpha"] * 255)
-        colork = pg.mkColor("#000000")
-        colork.setAlpha(alpha)
-        brush = pg.mkBrush(colork)
-
-    return x, y, kde, idx, brush
+        # The datasets of a slot are shared with other tasks (e.g. the
+        # contour data of the same plot), which also apply the filters.
+        with get_dataset_lock(rtdc_ds):
+            rtdc_ds.apply_filter()
+            if event_abort is not None and event_abort.is_set():
+                # superseded by another task
+                return None
+            dataset_key = plot_data.get_dataset_key(rtdc_ds=rtdc_ds)
+            if dataset_key is None:
+                # not a filter ray dataset (the data are not cached)
+                cache_key = data = None
+            else:
+                cache_key = plot_data.get_cache_key(
+                    "scatter", plot_state, dataset_key)
+                data = plot_data.plot_data_cache.get(cache_key)
+            if data is None:
+                data = plot_data.compute_scatter(rtdc_ds, plot_state)
+                if cache_key is not None:
+                    plot_data.plot_data_cache.set(cache_key, data)
+    # Note that the cached arrays must not be modified in-place.
+    x, y, kde, idx, hue = data
+
+    brush = compute_scatter_brush(plot_state=plot_state,
+                                  kde=kde,
+                                  hue=hue,
+                                  slot_state=slot_state)
+    return x, y, kde, idx, brush, hue
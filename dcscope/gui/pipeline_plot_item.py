@@ -9,11 +9,13 @@ from dclab.kde import KernelDensityEstimator
 from PyQt6 import QtCore, QtGui, QtTest, QtWidgets
 from pyqtgraph import exporters
 
+from ..pipeline.plot import split_plot_state
 from .tasks import TaskManager
 from .widgets import SimplePlotItem
 from .pipeline_plot_compute import (
     compute_contours_from_state,
     compute_contour_reliable,
+    compute_scatter_brush,
     compute_scatter_data_from_state,
 )
 
@@ -38,6 +40,9 @@ class PipelinePlotItem(SimplePlotItem):
         self._task_data_contour = []
         self._task_data_scatter = []
         self._list_contours = []
+        # contour lines and scatter plots (see `restyle`)
+        self._contour_items = []
+        self._scatter_items = []
         self.legend = None
         # circumvent problems with removed plots
         self.setAcceptHoverEvents(False)
@@ -103,6 +108,12 @@ class PipelinePlotItem(SimplePlotItem):
             self.removeItem(el)
         self._plot_elements.clear()
         self._list_contours.clear()
+        self._contour_items.clear()
+        self._scatter_items.clear()
+        # results of previous requests are not needed anymore
+        with self._update_lock:
+            self._task_data_contour.clear()
+            self._task_data_scatter.clear()
 
         if not dslist:
             return
@@ -197,6 +208,8 @@ class PipelinePlotItem(SimplePlotItem):
         self.tm.add_task(
             task=task,
             topic="pipeline-plot",
+            # only compute the data for the latest plot state
+            supersede=get_supersede_key("contour", plot_state, slot_state),
         )
 
     @QtCore.pyqtSlot(dict, object)
@@ -206,7 +219,8 @@ class PipelinePlotItem(SimplePlotItem):
             return
 
         plot_state = self.state_data["plot_state"]
-        slot_state = task["kwargs"]["slot_state"]
+        slot_state = self._get_slot_state(
+            task["kwargs"]["slot_state"]["identifier"])
         contours = result
 
         con = plot_state["contour"]
@@ -237,6 +251,8 @@ class PipelinePlotItem(SimplePlotItem):
                                         )
                 elements.append(cline)
                 with self._update_lock:
+                    self._contour_items.append(
+                        (slot_state["identifier"], ii, cline))
                     self.addItem(cline)
                     if ii == 0 and self.legend is not None:
                         self.legend.addItem(cline, slot_state["name"])
@@ -286,6 +302,8 @@ class PipelinePlotItem(SimplePlotItem):
         self.tm.add_task(
             task=task,
             topic="pipeline-plot",
+            # only compute the data for the latest plot state
+            supersede=get_supersede_key("scatter", plot_state, slot_state),
         )
 
     @QtCore.pyqtSlot(dict, object)
@@ -296,7 +314,7 @@ class PipelinePlotItem(SimplePlotItem):
 
         plot_state = self.state_data["plot_state"]
         hash_flag = self.state_data["hash_flag"]
-        x, y, _, _, brush = result
+        x, y, _, _, brush, _ = result
 
         gen = plot_state["general"]
         sca = plot_state["scatter"]
@@ -341,9 +359,79 @@ class PipelinePlotItem(SimplePlotItem):
 
         scatter.setData(x=x, y=y, brush=brush)
         scatter.setZValue(-50)
+        entry = {"item": scatter,
+                 "slot_id": task["kwargs"]["slot_state"]["identifier"],
+                 "kde": result[2],
+                 # (the dataset is shared with other threads)
+                 "hue": result[5],
+                 }
+        # The presentation might have changed since the data were requested.
+        request_style = [
+            split_plot_state(task["kwargs"]["plot_state"])[1],
+            task["kwargs"]["slot_state"]["color"]]
+        current_style = [
+            split_plot_state(plot_state)[1],
+            self._get_slot_state(entry["slot_id"])["color"]]
+        if request_style != current_style:
+            self._restyle_scatter(entry)
         with self._update_lock:
             self._task_data_scatter.remove(task)
             self._plot_elements.append(scatter)
+            self._scatter_items.append(entry)
+
+    def restyle(self, plot_state, slot_states):
+        """Apply presentation-only changes without recomputing any data
+
+        Only the entries in :const:`.PRESENTATION_STATE_KEYS` of
+        `plot_state` and the slot colors in `slot_states` may differ
+        from the states given to `request_draw`.
+        """
+        if self.state_data is None:
+            return
+        self.state_data["plot_state"] = plot_state
+        self.state_data["slot_states"] = slot_states
+        con = plot_state["contour"]
+
+        for entry in self._scatter_items:
+            self._restyle_scatter(entry)
+
+        for slot_id, ii, cline in self._contour_items:
+            slot_state = self._get_slot_state(slot_id)
+            cline.setPen(pg.mkPen(color=slot_state["color"],
+                                  width=con["line widths"][ii],
+                                  style=linestyles[con["line styles"][ii]],
+                                  ))
+
+        # legend
+        if con["enabled"] and con["legend"] and self.legend is None:
+            self.legend = self.addLegend(offset=(-.01, +.01))
+            for slot_id, ii, cline in self._contour_items:
+                if ii == 0:
+                    self.legend.addItem(cline,
+                                        self._get_slot_state(slot_id)["name"])
+        elif not con["legend"] and self.legend is not None:
+            if self.legend.scene() is not None:
+                self.legend.scene().removeItem(self.legend)
+            self.legend = None
+
+    def _get_slot_state(self, slot_id):
+        """Return the current slot state of this plot item"""
+        for slot_state in self.state_data["slot_states"]:
+            if slot_state["identifier"] == slot_id:
+                return slot_state
+        raise KeyError(f"Slot '{slot_id}' not in plot item {self}")
+
+    def _restyle_scatter(self, entry):
+        """Update the marker size and brushes of a scatter plot"""
+        plot_state = self.state_data["plot_state"]
+        sca = plot_state["scatter"]
+        brush = compute_scatter_brush(
+            plot_state=plot_state,
+            kde=entry["kde"],
+            hue=entry["hue"],
+            slot_state=self._get_slot_state(entry["slot_id"]))
+        entry["item"].setSize(sca["marker size"])
+        entry["item"].setBrush(brush)
 
     def zoomin_contours(self, margin_per=5):
         """Zoom-in to contour data with margin"""
@@ -470,6 +558,20 @@ def add_label(text, anchor_parent, text_halign="center", text_valign="center",
     label.setPos(x + dx, y + dy)
 
 
+def get_supersede_key(kind, plot_state, slot_state):
+    """Return the `supersede` key of a pipeline plot task
+
+    A plot window is redrawn with new `PipelinePlotItem` instances,
+    but the plot identifier, the slot identifier, and the kind of
+    plot data ("scatter" or "contour") uniquely identify the data
+    shown in a subplot.
+    """
+    return ("pipeline-plot",
+            kind,
+            plot_state["identifier"],
+            slot_state["identifier"])
+
+
 def get_axes_labels(plot_state, slot_states):
     gen = plot_state["general"]
     # Use slot_states[0] because we only have one x-axis label
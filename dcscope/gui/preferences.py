@@ -1,3 +1,4 @@
+import os
 import os.path as os_path
 import pathlib
 import traceback
@@ -60,9 +61,17 @@ class Preferences(QtWidgets.QDialog):
         #: configuration keys, corresponding widgets, and defaults
         self.config_pairs = [
             ["advanced/developer mode", self.ui.advanced_developer_mode, "0"],
+            ["advanced/signal coalescing interval",
+             self.ui.spinBox_signal_coalescing_interval, "50"],
+            ["advanced/task workers", self.ui.spinBox_tasks_num_workers,
+             str(os.cpu_count() or 1)],
+            ["advanced/task processes", self.ui.spinBox_tasks_num_processes,
+             "0"],
             ["cache/disk store path", self.ui.lineEdit_cache_path, cpath_act],
             ["cache/disk store size", self.ui.doubleSpinBox_cache_disk_size, "9"],  # noqa: E501
             ["cache/memory num", self.ui.spinBox_cache_mem_num, "200"],
+            ["cache/open datasets", self.ui.spinBox_cache_open_datasets,
+             "256"],
             ["cache/write interval", self.ui.spinBox_cache_interval, "30"],
             ["check for updates", self.ui.general_check_for_updates, "1"],
             ["dcor/api key", self.ui.dcor_api_key, ""],
@@ -397,8 +406,11 @@ class Preferences(QtWidgets.QDialog):
                     self.pp_mod_send.emit(signal)
 
             # Determine whether restart is required
-            if key == "advanced/developer mode":
-                if value != self.settings.value(key, "0"):
+            if key in ["advanced/developer mode",
+                       "advanced/signal coalescing interval",
+                       "advanced/task processes",
+                       "advanced/task workers"]:
+                if value != str(self.settings.value(key, default)):
                     restart_required = True
             elif key.startswith("cache/"):
                 if self.settings.value(key) != str(value):
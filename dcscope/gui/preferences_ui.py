@@ -295,7 +295,51 @@ class Ui_Dialog(object):
         self.spinBox_cache_interval.setMaximum(600)
         self.spinBox_cache_interval.setObjectName("spinBox_cache_interval")
         self.gridLayout_2.addWidget(self.spinBox_cache_interval, 3, 1, 1, 1)
+        self.label_cache_open_datasets = QtWidgets.QLabel(parent=self.groupBox)
+        self.label_cache_open_datasets.setObjectName("label_cache_open_datasets")
+        self.gridLayout_2.addWidget(self.label_cache_open_datasets, 4, 0, 1, 1)
+        self.spinBox_cache_open_datasets = QtWidgets.QSpinBox(parent=self.groupBox)
+        self.spinBox_cache_open_datasets.setMinimum(0)
+        self.spinBox_cache_open_datasets.setMaximum(100000)
+        self.spinBox_cache_open_datasets.setSingleStep(50)
+        self.spinBox_cache_open_datasets.setObjectName("spinBox_cache_open_datasets")
+        self.gridLayout_2.addWidget(self.spinBox_cache_open_datasets, 4, 1, 1, 1)
         self.verticalLayout_2.addWidget(self.groupBox)
+        self.groupBox_tasks = QtWidgets.QGroupBox(parent=self.tab_advanced)
+        self.groupBox_tasks.setObjectName("groupBox_tasks")
+        self.gridLayout_tasks = QtWidgets.QGridLayout(self.groupBox_tasks)
+        self.gridLayout_tasks.setObjectName("gridLayout_tasks")
+        self.label_tasks_num_workers = QtWidgets.QLabel(parent=self.groupBox_tasks)
+        self.label_tasks_num_workers.setObjectName("label_tasks_num_workers")
+        self.gridLayout_tasks.addWidget(self.label_tasks_num_workers, 0, 0, 1, 1)
+        self.spinBox_tasks_num_workers = QtWidgets.QSpinBox(parent=self.groupBox_tasks)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Policy.Preferred, QtWidgets.QSizePolicy.Policy.Fixed)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.spinBox_tasks_num_workers.sizePolicy().hasHeightForWidth())
+        self.spinBox_tasks_num_workers.setSizePolicy(sizePolicy)
+        self.spinBox_tasks_num_workers.setMinimum(1)
+        self.spinBox_tasks_num_workers.setMaximum(256)
+        self.spinBox_tasks_num_workers.setObjectName("spinBox_tasks_num_workers")
+        self.gridLayout_tasks.addWidget(self.spinBox_tasks_num_workers, 0, 1, 1, 1)
+        self.label_tasks_num_processes = QtWidgets.QLabel(parent=self.groupBox_tasks)
+        self.label_tasks_num_processes.setObjectName("label_tasks_num_processes")
+        self.gridLayout_tasks.addWidget(self.label_tasks_num_processes, 1, 0, 1, 1)
+        self.spinBox_tasks_num_processes = QtWidgets.QSpinBox(parent=self.groupBox_tasks)
+        self.spinBox_tasks_num_processes.setMinimum(0)
+        self.spinBox_tasks_num_processes.setMaximum(256)
+        self.spinBox_tasks_num_processes.setObjectName("spinBox_tasks_num_processes")
+        self.gridLayout_tasks.addWidget(self.spinBox_tasks_num_processes, 1, 1, 1, 1)
+        self.label_signal_coalescing_interval = QtWidgets.QLabel(parent=self.groupBox_tasks)
+        self.label_signal_coalescing_interval.setObjectName("label_signal_coalescing_interval")
+        self.gridLayout_tasks.addWidget(self.label_signal_coalescing_interval, 2, 0, 1, 1)
+        self.spinBox_signal_coalescing_interval = QtWidgets.QSpinBox(parent=self.groupBox_tasks)
+        self.spinBox_signal_coalescing_interval.setMinimum(0)
+        self.spinBox_signal_coalescing_interval.setMaximum(1000)
+        self.spinBox_signal_coalescing_interval.setSingleStep(10)
+        self.spinBox_signal_coalescing_interval.setObjectName("spinBox_signal_coalescing_interval")
+        self.gridLayout_tasks.addWidget(self.spinBox_signal_coalescing_interval, 2, 1, 1, 1)
+        self.verticalLayout_2.addWidget(self.groupBox_tasks)
         spacerItem6 = QtWidgets.QSpacerItem(20, 40, QtWidgets.QSizePolicy.Policy.Minimum, QtWidgets.QSizePolicy.Policy.Expanding)
         self.verticalLayout_2.addItem(spacerItem6)
         self.tabWidget.addTab(self.tab_advanced, "")
@@ -367,4 +411,17 @@ class Ui_Dialog(object):
         self.label_16.setText(_translate("Dialog", "Write interval"))
         self.spinBox_cache_interval.setToolTip(_translate("Dialog", "Time between disk store write operations"))
         self.spinBox_cache_interval.setSuffix(_translate("Dialog", " s"))
+        self.label_cache_open_datasets.setText(_translate("Dialog", "Open datasets"))
+        self.spinBox_cache_open_datasets.setToolTip(_translate("Dialog", "Maximum number of datasets kept open at the same time (least-recently-used datasets are closed and reopened when needed)"))
+        self.spinBox_cache_open_datasets.setSpecialValueText(_translate("Dialog", "unlimited"))
+        self.groupBox_tasks.setTitle(_translate("Dialog", "Background tasks"))
+        self.label_tasks_num_workers.setText(_translate("Dialog", "Worker threads"))
+        self.spinBox_tasks_num_workers.setToolTip(_translate("Dialog", "Number of threads used for computing plot data and running other background tasks in parallel"))
+        self.label_tasks_num_processes.setText(_translate("Dialog", "Worker processes"))
+        self.spinBox_tasks_num_processes.setToolTip(_translate("Dialog", "Number of processes used for computing contour and scatter plot data (set to zero to compute plot data in the worker threads)"))
+        self.spinBox_tasks_num_processes.setSpecialValueText(_translate("Dialog", "disabled"))
+        self.label_signal_coalescing_interval.setText(_translate("Dialog", "Signal coalescing"))
+        self.spinBox_signal_coalescing_interval.setToolTip(_translate("Dialog", "Pipeline modifications within this interval are combined before plots and other views are updated"))
+        self.spinBox_signal_coalescing_interval.setSpecialValueText(_translate("Dialog", "disabled"))
+        self.spinBox_signal_coalescing_interval.setSuffix(_translate("Dialog", " ms"))
         self.tabWidget.setTabText(self.tabWidget.indexOf(self.tab_advanced), _translate("Dialog", "Advanced"))
@@ -280,18 +280,12 @@ class QuickView(QtWidgets.QWidget):
             if self.current_pipeline_element is not None:
                 slot_id = self.current_pipeline_element["slot_id"]
                 filt_id = self.current_pipeline_element["filt_id"]
-                try:
-                    slot_index = self.pipeline.slot_ids.index(slot_id)
-                    filt_index = self.pipeline.filter_ids.index(filt_id)
-                    ds = self.pipeline.get_dataset(slot_index=slot_index,
-                                                   filt_index=filt_index)
-                    self.show_rtdc(rtdc_ds=ds,
-                                   slot=self.pipeline.slots[slot_index])
-                except BaseException:
-                    logger.debug(f"Could not find element for QuickView: "
-                                 f"{self.current_pipeline_element}")
-                    self.current_pipeline_element = None
-                    self.enable_interface(False)
+                # only update if the dataset shown changed
+                dirty = data.get("dirty")
+                if (dirty is None
+                        or slot_id not in self.pipeline.slot_ids
+                        or slot_id in dirty["slots"]):
+                    self.update_rtdc(slot_id, filt_id)
 
             self.update_polygon_panel()
 
@@ -773,7 +767,7 @@ class QuickView(QtWidgets.QWidget):
             # We have new plot data
 
             # These are the results from the computation in the task manager.
-            x, y, _, idx, brush = result
+            x, y, _, idx, brush, _ = result
 
             self.setEnabled(True)
             plot_state = task["kwargs"]["plot_state"]
@@ -872,6 +866,9 @@ class QuickView(QtWidgets.QWidget):
                     task=task,
                     topic="quickview-scatter",
                     reset_topic=True,
+                    sequential=True,
+                    # interactive, do not wait for batch jobs
+                    priority=10,
                     )
                 self._last_plot_hash = plot_hash
 
@@ -883,6 +880,8 @@ class QuickView(QtWidgets.QWidget):
                     # job (see above), then the "show_event" task will also be
                     # removed from the queue.
                     topic="quickview-scatter",
+                    sequential=True,
+                    priority=10,
                 )
 
     @QtCore.pyqtSlot()
@@ -1057,3 +1056,18 @@ class QuickView(QtWidgets.QWidget):
             # disable combo box if there are no filters
             self.ui.comboBox_poly.setEnabled(False)
         self.ui.groupBox_poly.setEnabled(False)
+
+    def update_rtdc(self, slot_id, filt_id):
+        """Show the dataset of a pipeline element"""
+        try:
+            slot_index = self.pipeline.slots.index_of(slot_id)
+            filt_index = self.pipeline.filters.index_of(filt_id)
+            ds = self.pipeline.get_dataset(slot_index=slot_index,
+                                           filt_index=filt_index)
+            self.show_rtdc(rtdc_ds=ds,
+                           slot=self.pipeline.slots[slot_index])
+        except BaseException:
+            logger.debug(f"Could not find element for QuickView: "
+                         f"{self.current_pipeline_element}")
+            self.current_pipeline_element = None
+            self.enable_interface(False)
@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+from concurrent.futures import ProcessPoolExecutor
 import logging
+import multiprocessing
+import os
 import threading
 import time
+from typing import Hashable
 import uuid
 
 from PyQt6 import QtCore
@@ -15,42 +19,78 @@ class TaskManager(QtCore.QObject):
     task_done = QtCore.pyqtSignal(dict, object)  # (task, result)
     task_error = QtCore.pyqtSignal(dict, object)  # (task, error)
 
-    def __init__(self, parent):
+    def __init__(self,
+                 parent,
+                 num_workers: int | None = None,
+                 num_processes: int = 0):
+        """Manage a pool of background workers
+
+        Parameters
+        ----------
+        parent: QtCore.QObject
+            Parent object
+        num_workers: int
+            Number of worker threads; defaults to the number of
+            CPU cores
+        num_processes: int
+            Number of worker processes; If set to a positive value, a
+            process pool is created and passed to all tasks whose
+            "func" accepts the `process_pool` keyword argument. This
+            is useful for CPU-bound Python code that holds the GIL.
+        """
         super(TaskManager, self).__init__(parent=parent)
         self.logger = logging.getLogger(__name__)
 
         self.task_queues = {}
+        #: topics for which tasks are run sequentially (see `add_task`)
+        self.topics_sequential = set()
+        #: priorities of the topics (see `add_task`)
+        self.topic_priorities = {}
+        # topic from which the most recent task was taken (the topics
+        # are served in a round-robin fashion)
+        self._topic_last = None
+        # topics of the tasks that were handed out to the workers
+        self._worker_topics = {}
+        # queued or running tasks by their `supersede` key
+        self._supersede_tasks = {}
+
+        if num_workers is None:
+            num_workers = os.cpu_count() or 1
 
         # threads in which the workers run
-        self.threads = [QtCore.QThread()]
+        self.threads = [QtCore.QThread() for _ in range(max(1, num_workers))]
         for thread in self.threads:
             self.quit_threads.connect(thread.quit)
             thread.setObjectName(f"TaskThread-{hex(id(thread))}")
             thread.start()
             self.logger.info(f"Started {thread}")
 
+        #: optional process pool for CPU-bound tasks
+        self.process_pool = None
+        if num_processes > 0:
+            self.process_pool = ProcessPoolExecutor(
+                max_workers=num_processes,
+                # Forking a process with running Qt threads is not safe.
+                mp_context=multiprocessing.get_context("spawn"))
+            self.logger.info(f"Started process pool ({num_processes})")
+
         # workers
         self.workers = []
         for thread in self.threads:
             worker = TaskWorker()
+            worker.process_pool = self.process_pool
             worker.moveToThread(thread)
             worker.task_done.connect(self.task_done)
             worker.task_error.connect(self.task_error)
+            # hand out the next task as soon as a worker is idle
+            worker.task_finished.connect(self._on_task_finished)
             self.workers.append(worker)
 
         # to make sure running next task is only run once at a time
         self.lock_run_next = threading.Lock()
 
-        # checks incoming queue for new tasks
-        self.timer = QtCore.QTimer(self)
-        self.timer.timeout.connect(self._run_next_task_in_thread)
-        self.timer.start(500)
-
-        self.timer_ss = QtCore.QTimer(self)
-        self.timer_ss.setSingleShot(True)
-        self.timer_ss.timeout.connect(self._run_next_task_in_thread)
-
-        self.task_done.connect(self.trigger_next)
+        # whether `trigger_next` already scheduled a dispatch
+        self._dispatch_scheduled = False
 
     @property
     def num_tasks(self):
@@ -86,8 +126,9 @@ class TaskManager(QtCore.QObject):
             # check the queues
             for q in self.task_queues.values():
                 for ii, item in enumerate(q):
-                    if item["identifier"] == task["identifier"]:
+                    if item[0]["identifier"] == task["identifier"]:
                         q.pop(ii)
+                        task["status"] = "aborted"
                         return
 
             # check the workers
@@ -108,10 +149,17 @@ class TaskManager(QtCore.QObject):
                  topic: str = "general",
                  communicate_progress: QtCore.PYQT_SIGNAL | None = None,
                  communicate_message: QtCore.PYQT_SIGNAL | None = None,
-                 reset_topic: bool = False):
+                 reset_topic: bool = False,
+                 sequential: bool = False,
+                 priority: int | None = None,
+                 supersede: Hashable | None = None):
         """Add a new task to the queue
 
-        Tasks are fetched and executed in threads when `self.timer` times out.
+        Tasks are handed out to idle workers right after they are
+        added and whenever a worker finishes a task. Topics with a
+        higher priority are served first. Tasks of different topics
+        with the same priority are handed out to the workers in turns,
+        so that a topic with many queued tasks does not block the others.
 
         The task dictionary must contain three entries:
 
@@ -120,14 +168,46 @@ class TaskManager(QtCore.QObject):
                   (progress goes from 0 to 1, string is progress message)
         - "args": arguments to the function
         - "kwargs": keyword arguments to the function
+
+        If `sequential` is set, the tasks of `topic` are never run
+        concurrently, i.e. they are processed one after another in the
+        order in which they were added.
+
+        If `priority` is given, it is set for `topic` (the default
+        priority of a topic is 0). E.g. interactive topics should have
+        a positive priority and batch processing a negative priority.
+
+        If `supersede` is given, any queued task that was added with
+        the same `supersede` key is removed from the queue and any such
+        running task is aborted. Use this for tasks that compute
+        something that is only needed for the most recent request
+        (e.g. the data of a plot that is redrawn).
+
+        The time a task spent in the queue is stored in seconds in
+        the "queue wait" key of the task dictionary.
         """
         if "identifier" not in task:
             task["identifier"] = str(uuid.uuid4())
+        task["time queued"] = time.perf_counter()
 
         if topic not in self.task_queues:
             self.task_queues[topic] = []
         q = self.task_queues[topic]
 
+        if sequential:
+            self.topics_sequential.add(topic)
+
+        if priority is not None:
+            self.topic_priorities[topic] = priority
+
+        if supersede is not None:
+            task_old = self._supersede_tasks.get(supersede)
+            if task_old is not None:
+                self.abort_task(task_old, raise_if_not_found=False)
+                self.logger.info(f"Task '{task_old['identifier']}' "
+                                 f"superseded by '{task['identifier']}'")
+            self._supersede_tasks[supersede] = task
+
         # We don't want any of the previous tasks being processed.
         if reset_topic:
             q.clear()
@@ -143,6 +223,8 @@ class TaskManager(QtCore.QObject):
         for thread in self.threads:
             self.logger.info(f"Waiting for {thread}")
             thread.wait()
+        if self.process_pool is not None:
+            self.process_pool.shutdown(cancel_futures=True)
 
     def get_task_result(self, task):
         if task.get("status") == "done":
@@ -174,58 +256,132 @@ class TaskManager(QtCore.QObject):
         """Check whether the task failed"""
         return task.get("status") == "error"
 
-    def reset(self):
-        """Reset everything"""
+    def reset(self, timeout: float = 0.5):
+        """Reset everything
+
+        All queued tasks are removed and all running tasks are aborted.
+        Waits at most `timeout` seconds for the running tasks to stop.
+        """
         with self.lock_run_next:
             for q in self.task_queues.values():
                 q.clear()
             self.task_queues.clear()
+            self._topic_last = None
+            self._supersede_tasks.clear()
 
+            busy = []
             for worker in self.workers:
-                worker.event_abort.set()
+                with worker.state_lock:
+                    if worker.event_busy.is_set():
+                        worker.event_abort.set()
+                        busy.append(worker)
 
-            for worker in self.workers:
-                if worker.event_busy.is_set():
-                    self.logger.info(f"Waiting for worker {worker}")
-                    time.sleep(0.5)
+        # Wait outside the lock, so that workers may finish.
+        deadline = time.perf_counter() + timeout
+        for worker in busy:
+            self.logger.info(f"Waiting for worker {worker}")
+            if not worker.wait_idle(max(0, deadline - time.perf_counter())):
+                self.logger.warning(f"Worker {worker} did not stop "
+                                    f"within {timeout}s")
+
+    def wait_idle(self, timeout: float | None = None) -> bool:
+        """Wait until all queued and running tasks are done
+
+        Qt events are processed in the meantime, so that the tasks
+        are handed out and their results are delivered. This method
+        must be called from the thread of the task manager.
+
+        Returns False if there are still tasks after `timeout` seconds.
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while self.num_tasks or self._dispatch_scheduled:
+            if deadline is not None and time.perf_counter() > deadline:
+                return False
+            QtCore.QCoreApplication.processEvents(
+                QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 50)
+            time.sleep(0.005)
+        # deliver the results of the last tasks
+        QtCore.QCoreApplication.processEvents()
+        return True
 
     @QtCore.pyqtSlot()
     def trigger_next(self):
-        """Immediately trigger running the next task"""
-        self.timer_ss.singleShot(0, self._run_next_task_in_thread)
+        """Trigger running the next task in the next event loop iteration
 
-    def _run_next_task_in_thread(self):
-        """Run the next task in a thread"""
-        if self.lock_run_next.locked():
-            return
+        Several calls before the event loop is reached result in only
+        one dispatch, so that tasks added in one go are handed out
+        according to their priorities.
+        """
+        if not self._dispatch_scheduled:
+            self._dispatch_scheduled = True
+            QtCore.QTimer.singleShot(0, self._run_next_task_in_thread)
 
+    def _is_topic_running(self, topic):
+        """Whether a worker is currently busy with a task from `topic`"""
+        for worker in self.workers:
+            if (worker.event_busy.is_set()
+                    and self._worker_topics.get(worker) == topic):
+                return True
+        return False
+
+    @QtCore.pyqtSlot(dict)
+    def _on_task_finished(self, task):
+        """A worker is idle again, hand out the next task"""
+        for key, task_s in list(self._supersede_tasks.items()):
+            if task_s is task:
+                self._supersede_tasks.pop(key)
+                break
+        self._run_next_task_in_thread()
+
+    def _pop_next_task(self):
+        """Return the next (topic, task_tuple) or (None, None)
+
+        Topics are served by priority. Topics with the same priority
+        are served in a round-robin fashion, starting with the topic
+        after the one that was served last.
+        """
+        topics = list(self.task_queues.keys())
+        if self._topic_last in topics:
+            start = topics.index(self._topic_last) + 1
+            topics = topics[start:] + topics[:start]
+        # `sorted` is stable, so the round-robin order is preserved
+        topics = sorted(topics,
+                        key=lambda t: -self.topic_priorities.get(t, 0))
+        for topic in topics:
+            q = self.task_queues[topic]
+            if not q:
+                continue
+            if (topic in self.topics_sequential
+                    and self._is_topic_running(topic)):
+                # wait until the previous task of this topic is done
+                continue
+            self._topic_last = topic
+            return topic, q.pop(0)
+        return None, None
+
+    @QtCore.pyqtSlot()
+    def _run_next_task_in_thread(self):
+        """Run the next tasks in idle worker threads"""
+        self._dispatch_scheduled = False
         with self.lock_run_next:
-            for _ in range(len(self.threads)):
-                for q in self.task_queues.values():
-                    if len(q):
-                        task_tuple = q.pop(0)
-                        break
-                else:
+            for worker in self.workers:
+                if worker.event_busy.is_set():
+                    continue
+
+                topic, task_tuple = self._pop_next_task()
+                if task_tuple is None:
                     # nothing to do
                     return
 
-                for worker in self.workers:
-                    if worker.event_busy.is_set():
-                        continue
-                    else:
-                        task, comm_progress, comm_message = task_tuple
-
-                        worker.disconnect_progress_handles()
-                        worker.connect_progress_handles(
-                            comm_progress, comm_message)
-
-                        worker.do_task.emit(task)
-                        self.logger.info(
-                            f"Running task '{task['identifier']}' "
-                            f"in '{worker.thread().objectName()}'")
-                        break
-                else:
-                    # put the task back in the queue
-                    q.insert(0, task_tuple)
-                    # all workers are busy, so we do not need to keep trying
-                    break
+                task, comm_progress, comm_message = task_tuple
+
+                worker.disconnect_progress_handles()
+                worker.connect_progress_handles(comm_progress, comm_message)
+
+                self._worker_topics[worker] = topic
+                task["queue wait"] = \
+                    time.perf_counter() - task.pop("time queued")
+                worker.submit_task(task)
+                self.logger.info(f"Running task '{task['identifier']}' "
+                                 f"in '{worker.thread().objectName()}' "
+                                 f"after waiting {task['queue wait']:.3f}s")
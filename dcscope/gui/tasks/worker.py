@@ -14,6 +14,8 @@ class TaskAbortError(BaseException):
 class TaskWorker(QtCore.QObject):
     task_done = QtCore.pyqtSignal(dict, object)
     task_error = QtCore.pyqtSignal(dict, object)
+    #: emitted when the worker is idle again (done, error, or aborted)
+    task_finished = QtCore.pyqtSignal(dict)
     communicate_progress = QtCore.pyqtSignal(object)  # int or float possible
     communicate_message = QtCore.pyqtSignal(str)
     do_task = QtCore.pyqtSignal(dict)
@@ -25,10 +27,15 @@ class TaskWorker(QtCore.QObject):
         """
         super(TaskWorker, self).__init__(*args, **kwargs)
         self.event_busy = threading.Event()
+        #: set when the worker is idle (inverse of `event_busy`)
+        self.event_idle = threading.Event()
+        self.event_idle.set()
         self.event_abort = threading.Event()
         self.state_lock = threading.Lock()
         self._progress_handles = None
         self.current_task_id = None
+        #: process pool passed to tasks that accept `process_pool`
+        self.process_pool = None
         self.do_task.connect(self.run_task)
 
     @QtCore.pyqtSlot()
@@ -103,13 +110,29 @@ class TaskWorker(QtCore.QObject):
             raise TaskAbortError(f"Task '{self.current_task_id}' aborted")
         self.communicate_progress.emit(*args)
 
+    def submit_task(self, task: dict):
+        """Reserve this worker for `task` and run it in the worker thread
+
+        The worker is marked busy immediately (and not only when the
+        task starts in the worker thread), so that the task manager
+        does not hand out more than one task to the same worker.
+        """
+        with self.state_lock:
+            self.event_busy.set()
+            self.event_idle.clear()
+            self.event_abort.clear()
+            self.current_task_id = task["identifier"]
+        self.do_task.emit(task)
+
     @QtCore.pyqtSlot(object)
     def run_task(self, task: dict):
         with self.state_lock:
             self.event_busy.set()
-            self.event_abort.clear()
-        self.current_task_id = task["identifier"]
+            self.current_task_id = task["identifier"]
         try:
+            if self.event_abort.is_set():
+                # task was aborted before it even started
+                raise TaskAbortError(f"Task '{task['identifier']}' aborted")
             func = task["func"]
             args = task.get("args", [])
             kwargs = task.get("kwargs", {})
@@ -125,6 +148,8 @@ class TaskWorker(QtCore.QObject):
                     self.communicate_progress_wrapper
             if "event_abort" in kw_list:
                 kwargs["event_abort"] = self.event_abort
+            if "process_pool" in kw_list:
+                kwargs["process_pool"] = self.process_pool
             result = func(*args, **kwargs)
         except TaskAbortError:
             # task intentionally aborted
@@ -142,7 +167,17 @@ class TaskWorker(QtCore.QObject):
                 task["result"] = result
                 self.task_done.emit(task, result)
 
-        self.current_task_id = None
         with self.state_lock:
+            self.current_task_id = None
             self.event_busy.clear()
             self.event_abort.clear()
+            self.event_idle.set()
+        self.task_finished.emit(task)
+
+    def wait_idle(self, timeout: float | None = None) -> bool:
+        """Wait until the worker finished its current task
+
+        Returns False if the worker is still busy after `timeout`
+        seconds.
+        """
+        return self.event_idle.wait(timeout)
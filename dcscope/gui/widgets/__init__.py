@@ -11,5 +11,6 @@ from .simple_image_view import SimpleImageView
 from .simple_plot_widget import (SimplePlotItem,
                                  SimplePlotWidget,
                                  SimpleViewBox)
-from .colorbaritem import DCscopeColorBarItem, get_colormap
+from .colorbaritem import (DCscopeColorBarItem, get_colormap,
+                           map_to_brushes)
 from .wait_cursor import show_wait_cursor, ShowWaitCursor
@@ -1,5 +1,7 @@
+import functools
 from typing import Any
 
+import numpy as np
 import pyqtgraph as pg
 from pyqtgraph.graphicsItems.GradientEditorItem import Gradients
 
@@ -37,6 +39,60 @@ def get_colormap(color_map_name):
     return colorMap
 
 
+@functools.lru_cache(maxsize=32)
+def get_colormap_brushes(color_map_name, num=256):
+    """Return an object array of `num` brushes sampling a colormap
+
+    The brushes are cached and shared between all scatter plots
+    that use the same colormap (see :func:`map_to_brushes`).
+    """
+    brushes = np.empty(num, dtype=object)
+    brushes[:] = [pg.mkBrush(*rgba)
+                  for rgba in get_colormap_lut(color_map_name, num)]
+    return brushes
+
+
+@functools.lru_cache(maxsize=32)
+def get_colormap_lut(color_map_name, num=256):
+    """Return the RGBA lookup table (uint8 array of shape (num, 4))"""
+    lut = get_colormap(color_map_name).getLookupTable(
+        start=0, stop=1, nPts=num, alpha=True, mode="byte")
+    lut.flags.writeable = False
+    return lut
+
+
+def map_to_brushes(values, color_map_name, nan_color="#FF0000", num=256):
+    """Map values to colormap brushes
+
+    This is a vectorized version of calling `ColorMap.mapToQColor`
+    for each value. The values are quantized to `num` colors, so
+    that the brushes can be reused (:func:`get_colormap_brushes`).
+
+    Parameters
+    ----------
+    values: 1d ndarray
+        values in the interval [0, 1] (other values are clipped)
+    color_map_name: str
+        name of the colormap (see :func:`get_colormap`)
+    nan_color: str
+        color used for nan-valued entries
+    num: int
+        number of colors in the lookup table
+
+    Returns
+    -------
+    brushes: 1d object ndarray
+        brushes that can be passed to `ScatterPlotItem.setData`
+    """
+    values = np.asarray(values, dtype=float)
+    invalid = np.isnan(values)
+    idx = np.rint(np.clip(np.where(invalid, 0, values), 0, 1) * (num - 1))
+    brushes = get_colormap_brushes(color_map_name, num)[idx.astype(np.intp)]
+    if np.any(invalid):
+        brushes[invalid] = pg.mkBrush(nan_color)
+    return brushes
+
+
 class DCscopeColorBarItem(pg.ColorBarItem):
     def __init__(self, yoffset, height, label, color_map_name,
                  *args, **kwargs):
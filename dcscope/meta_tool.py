@@ -1,8 +1,13 @@
 """Convenience methods to retrieve meta data from .rtdc files"""
+import concurrent.futures
 import functools
+import math
+import os
 import pathlib
 
 import dclab
+from dclab import cached
+from dclab.rtdc_dataset.config import Configuration
 
 import numpy as np
 
@@ -13,17 +18,39 @@ class dataset_monitoring_lru_cache:
     This is a modification of dclab.util.file_monitoring_lru_cache
     with an exception that when the `path` starts with "https://",
     then caching is done as well.
+
+    If `persistent` is set, the return values are additionally cached
+    with :class:`dclab.cached.umbrella_cache`, which stores them on
+    disk if a disk store is configured (DCscope does this on startup,
+    see "cache/disk store path" in the preferences). The disk store
+    has a size limit and removes the oldest entries. The cache key
+    consists of the resolved path, its modification time, and its
+    size (or only the URL for DCOR data), so the return values must
+    be JSON-serializable.
     """
 
-    def __init__(self, maxsize=100):
+    def __init__(self, maxsize=100, persistent=False):
         self.lru_cache = functools.lru_cache(maxsize=maxsize)
+        self.persistent = persistent
         self.cached_wrapper = None
 
     def __call__(self, func):
+        if self.persistent:
+            @cached.umbrella_cache(topic="dcscope-meta-tool",
+                                   evaluation_time_threshold=0)
+            @functools.wraps(func)
+            def compute(path, path_stats, *args, **kwargs):
+                return func(path, *args, **kwargs)
+        else:
+            def compute(path, path_stats, *args, **kwargs):
+                return func(path, *args, **kwargs)
+
         @self.lru_cache
         def cached_wrapper(path, path_stats, *args, **kwargs):
             assert path_stats, "We need stat for validating the cache"
-            return func(path, *args, **kwargs)
+            # Note that `str(path)` is required for hashing in
+            # the persistent cache.
+            return compute(str(path), path_stats, *args, **kwargs)
 
         @functools.wraps(func)
         def wrapper(path, *args, **kwargs):
@@ -32,15 +59,15 @@ class dataset_monitoring_lru_cache:
                 full_path = local_path.resolve()
                 path_stat = full_path.stat()
                 return cached_wrapper(
-                    path=full_path,
-                    path_stats=(path_stat.st_mtime_ns, path_stat.st_size),
+                    full_path,
+                    (path_stat.st_mtime_ns, path_stat.st_size),
                     *args,
                     **kwargs)
             elif isinstance(path, str) and path.startswith("https://"):
                 # DCOR metadata does not change
                 return cached_wrapper(
-                    path=path,
-                    path_stats="placeholder",
+                    path,
+                    "placeholder",
                     *args,
                     **kwargs)
             else:
@@ -71,12 +98,31 @@ def get_repr(path, append_path=False):
 
 @dataset_monitoring_lru_cache(maxsize=100)
 def get_rtdc_config(path):
+    """Return the configuration of a dataset
+
+    The configuration is taken from :func:`get_rtdc_metadata`.
+    """
+    return Configuration(cfg=get_rtdc_metadata(path)["config"],
+                         disable_checks=True)
+
+
+@dataset_monitoring_lru_cache(maxsize=1000, persistent=True)
+def get_rtdc_metadata(path):
+    """Return configuration, innate features, and format of a dataset
+
+    This only opens the dataset once and is used for initializing
+    lazy :class:`.pipeline.Dataslot` instances. The configuration
+    is returned as a dictionary.
+    """
     with dclab.new_dataset(path) as ds:
-        config = ds.config.copy()
-    return config
+        meta = {"config": ds.config.as_dict(),
+                "features innate": list(ds.features_innate),
+                "format": ds.format,
+                }
+    return meta
 
 
-@dataset_monitoring_lru_cache(maxsize=100)
+@dataset_monitoring_lru_cache(maxsize=100, persistent=True)
 def get_rtdc_features(path, scalar=True, only_loaded=False):
     """Return available features in a dataset"""
     av_feat = []
@@ -103,21 +149,130 @@ def get_rtdc_features_bulk(paths, scalar=True):
     return sorted(set(features))
 
 
-@dataset_monitoring_lru_cache(maxsize=10000)
+def compute_feature_statistics(ds, features, chunk_size=2**18):
+    """Compute statistics of scalar features in a single pass
+
+    The feature data are read via `ds[feat]` in blocks of about
+    `chunk_size` events (see :func:`get_block_size`), and all
+    features are reduced together while walking over the blocks,
+    so that no feature column is loaded into memory at once.
+
+    Parameters
+    ----------
+    ds: dclab.rtdc_dataset.RTDCBase
+        Dataset
+    features: list of str
+        Scalar features available in `ds`
+    chunk_size: int
+        Approximate number of events read per feature at once
+
+    Returns
+    -------
+    stats: dict
+        For each feature, a dictionary with the "min" and "max" of
+        the finite values (nan if there are none) and the number
+        of "finite", "nan", and "inf" values
+    """
+    stats = {}
+    for feat in features:
+        stats[feat] = {"min": np.inf,
+                       "max": -np.inf,
+                       "finite": 0,
+                       "nan": 0,
+                       "inf": 0}
+    size = len(ds)
+    block_size = get_block_size(ds, features, chunk_size)
+    for start in range(0, size, block_size):
+        for feat in features:
+            data = np.asarray(ds[feat][start:start + block_size])
+            fstats = stats[feat]
+            valid = np.isfinite(data)
+            num_finite = int(np.sum(valid))
+            num_nan = int(np.sum(np.isnan(data)))
+            fstats["nan"] += num_nan
+            fstats["inf"] += data.size - num_finite - num_nan
+            if num_finite:
+                if num_finite < data.size:
+                    data = data[valid]
+                fstats["finite"] += num_finite
+                fstats["min"] = min(fstats["min"], float(np.min(data)))
+                fstats["max"] = max(fstats["max"], float(np.max(data)))
+    for fstats in stats.values():
+        if not fstats["finite"]:
+            fstats["min"] = fstats["max"] = np.nan
+    return stats
+
+
+def get_block_size(ds, features, chunk_size=2**18):
+    """Return the number of events to read at once from a dataset
+
+    For HDF5-based feature columns (`ds[feat].h5ds`), the block
+    size is a multiple of the HDF5 chunk length of all `features`
+    (and close to `chunk_size`), so that every HDF5 chunk is read
+    and decompressed only once. Otherwise, `chunk_size` is
+    returned.
+    """
+    lengths = []
+    for feat in features:
+        h5ds = getattr(ds[feat], "h5ds", None)
+        chunks = getattr(h5ds, "chunks", None)
+        if chunks:
+            lengths.append(int(chunks[0]))
+    if lengths:
+        length = math.lcm(*lengths)
+        return max(1, chunk_size // length) * length
+    else:
+        return chunk_size
+
+
+def get_stored_min_max(col):
+    """Return the finite minimum and maximum stored with a feature
+
+    dclab stores the minimum and maximum of scalar features as
+    attributes of the HDF5 dataset (`col.h5ds`). Returns None if
+    these are not available (e.g. older files or in-memory data)
+    or not finite.
+    """
+    attrs = getattr(getattr(col, "h5ds", None), "attrs", {})
+    if "min" in attrs and "max" in attrs:
+        fmin, fmax = float(attrs["min"]), float(attrs["max"])
+        if np.isfinite(fmin) and np.isfinite(fmax):
+            return [fmin, fmax]
+    return None
+
+
+@dataset_monitoring_lru_cache(maxsize=10000, persistent=True)
 def get_rtdc_features_minmax(path, *features):
-    """Return dict with min/max of scalar features in a dataset"""
+    """Return dict with min/max of scalar features in a dataset
+
+    The minimum and maximum stored in the dataset are used if
+    available (see :func:`get_stored_min_max`). For all other
+    features, the finite minimum and maximum are computed together
+    in one pass over the data (see :func:`compute_feature_statistics`).
+    Features without any finite values are omitted.
+    """
     mmdict = {}
     with dclab.new_dataset(path) as ds:
         if len(features) == 0:
             features = ds.features_loaded
+        compute = []
         for feat in features:
             assert dclab.dfn.scalar_feature_exists(feat)
             if feat in ds:
-                mmdict[feat] = np.min(ds[feat]), np.max(ds[feat])
+                stored = get_stored_min_max(ds[feat])
+                if stored is not None:
+                    mmdict[feat] = stored
+                else:
+                    compute.append(feat)
+        if compute:
+            stats = compute_feature_statistics(ds, compute)
+            for feat in compute:
+                if stats[feat]["finite"]:
+                    mmdict[feat] = [stats[feat]["min"], stats[feat]["max"]]
     return mmdict
 
 
-def get_rtdc_features_minmax_bulk(paths, features=None):
+def get_rtdc_features_minmax_bulk(paths, features=None, num_workers=None):
     """Perform `get_rtdc_features_minmax` on a list of paths
 
     Parameters
@@ -127,16 +282,25 @@ def get_rtdc_features_minmax_bulk(paths, features=None):
     features: list of str or empty list
         Names of the features to compute the min/max values for.
         If empty, all loaded features will be used.
+    num_workers: int
+        Number of threads used for processing the files concurrently;
+        defaults to the number of CPUs (at most 8)
     """
     if features is None:
         features = []
+    if num_workers is None:
+        num_workers = min(8, os.cpu_count() or 1)
+    with concurrent.futures.ThreadPoolExecutor(
+            max_workers=num_workers) as executor:
+        mmdis = list(executor.map(
+            lambda pp: get_rtdc_features_minmax(pp, *features), paths))
     mmdict = {}
-    for pp in paths:
-        mmdi = get_rtdc_features_minmax(pp, *features)
+    for mmdi in mmdis:
         for feat in mmdi:
             if feat in mmdict:
-                fmin = min(mmdict[feat][0], mmdi[feat][0])
-                fmax = max(mmdict[feat][1], mmdi[feat][1])
+                # (`np.fmin` and `np.fmax` ignore nan values)
+                fmin = float(np.fmin(mmdict[feat][0], mmdi[feat][0]))
+                fmax = float(np.fmax(mmdict[feat][1], mmdi[feat][1]))
                 mmdict[feat] = (fmin, fmax)
             else:
                 mmdict[feat] = mmdi[feat]
@@ -3,3 +3,4 @@ from .dataslot import Dataslot  # noqa: F401
 from .filter import Filter  # noqa: F401
 from .filter_ray import FilterRay  # noqa: F401
 from .plot import Plot  # noqa: F401
+from . import plot_data  # noqa: F401
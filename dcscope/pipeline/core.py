@@ -1,19 +1,23 @@
+import concurrent.futures
 import copy
+import os
 import pathlib
 import threading
 import warnings
 
 import dclab
-from dclab.rtdc_dataset import RTDC_Hierarchy
 import numpy as np
 
-from ..idiom import FEATURES_MONOTONOUS
-from ..util import strip_common_prefix_suffix
+from ..util import hashobj, strip_common_prefix_suffix
 
 from .dataslot import Dataslot
 from .filter import Filter
+from . import filter_ray
 from .filter_ray import FilterRay
 from .plot import Plot
+from .registry import ElementRegistry
+from .stats_index import (StatisticsIndex, compute_statistics,
+                          compute_statistics_coarse)
 
 
 class EmptyDatasetWarning(UserWarning):
@@ -35,17 +39,25 @@ class Pipeline(object):
         self._filter_counter = 0
 
         #: Filters are instances of :class:`dcscope.pipeline.Filter`
-        self.filters = []
+        self.filters = ElementRegistry()
         #: Plots are instances of :class:`dcscope.pipeline.Plot`
-        self.plots = []
+        self.plots = ElementRegistry()
         #: Filter rays of the current pipeline
         self.rays = {}
         #: Slots are instances of :class:`dcscope.pipeline.Dataslot`
-        self.slots = []
+        self.slots = ElementRegistry()
         #: individual element states
         self.element_states = {}
+        #: feature statistics of the slots (see :func:`get_min_max`)
+        self.stats_index = StatisticsIndex()
 
         self.lock = threading.Lock()
+        # lock for creating filter rays (see `get_ray`)
+        self._rays_lock = threading.Lock()
+        # thread pool for building filter rays (see `prepare_rays`)
+        self._ray_pool = None
+        # element hashes of the last call to `get_dirty_elements`
+        self._element_hashes = {}
 
         self._reduced_sample_names = []
 
@@ -56,20 +68,33 @@ class Pipeline(object):
             self.__setstate__(state)
 
     def __setstate__(self, state):
+        """Apply a pipeline state from :func:`__getstate__`
+
+        Only the filters, plots, and slots that differ from the
+        current pipeline are added, removed, or updated. Unchanged
+        slots keep their datasets and filter rays.
+        """
         if self._old_state == state:
             # Nothing changed
             return
         self._old_state = state
-        self.reset()
-        for filt_state in state["filters"]:
-            self.add_filter(filt_state)
-        for plot_state in state["plots"]:
-            self.add_plot(plot_state)
-            self.check_contour_spacing(plot_state["identifier"])
-        for slot_state in state["slots"]:
-            self.add_slot(slot=slot_state)
+        self._update_elements("filters", state["filters"])
+        plot_ids = self._update_elements("plots", state["plots"])
+        slot_ids = self._update_elements("slots", state["slots"])
+        for slot_id in list(self.rays):
+            if not self.slots.has_identifier(slot_id):
+                self.rays.pop(slot_id)
+        if slot_ids:
+            # the reduced sample names are deduced again when needed
+            self._reduced_sample_names = []
+        # the counters are used for naming new filters and plots
+        self._filter_counter = self.num_filters
+        self._plot_counter = self.num_plots
+        self._slot_counter = self.num_slots
         # set element states at the end
         self.element_states = state["elements"]
+        for plot_id in plot_ids:
+            self.check_contour_spacing(plot_id)
 
         # sanity checks
         if set(self.filters_used) != set(state["filters used"]):
@@ -88,7 +113,7 @@ class Pipeline(object):
 
     @property
     def filter_ids(self):
-        return [filt.identifier for filt in self.filters]
+        return list(self.filters.identifiers)
 
     @property
     def filters_used(self):
@@ -96,11 +121,11 @@ class Pipeline(object):
 
     @property
     def plot_ids(self):
-        return [plot.identifier for plot in self.plots]
+        return list(self.plots.identifiers)
 
     @property
     def slot_ids(self):
-        return [slot.identifier for slot in self.slots]
+        return list(self.slots.identifiers)
 
     @property
     def slots_used(self):
@@ -160,7 +185,7 @@ class Pipeline(object):
 
         filt_id = filt.identifier
 
-        if filt_id in self.filter_ids:
+        if self.filters.has_identifier(filt_id):
             raise ValueError(
                 f"Filter with identifier {filt_id} already exists")
 
@@ -201,7 +226,7 @@ class Pipeline(object):
 
         plot_id = plot.identifier
 
-        if plot_id in self.plot_ids:
+        if self.plots.has_identifier(plot_id):
             raise ValueError(
                 f"Plot with identifier '{plot_id}' already exists")
 
@@ -239,17 +264,11 @@ class Pipeline(object):
             raise ValueError("Please specify either `slot` or `path`.")
         elif path is not None:
             slot = Dataslot(path=path)
-        elif isinstance(slot, Dataslot):
-            pass
         elif isinstance(slot, dict):
-            state = slot
-            slot = Dataslot(path=state["path"],
-                            identifier=state["identifier"]
-                            )
-            slot.__setstate__(state)
+            slot = Dataslot.from_state(slot)
 
         slot_id = slot.identifier
-        if slot_id in self.slot_ids:
+        if self.slots.has_identifier(slot_id):
             raise ValueError(
                 f"Slot with identifier '{slot_id}' already exists")
 
@@ -262,6 +281,82 @@ class Pipeline(object):
             self.element_states[slot_id][plot_id] = False
         return slot_id
 
+    def add_slots(self, slots, num_workers=None, lazy=False,
+                  communicate_progress=None, event_abort=None):
+        """Add multiple slots, opening the datasets in a thread pool
+
+        The datasets are opened (and their metadata read) concurrently,
+        which is considerably faster than calling :func:`add_slot`
+        for each dataset, especially for DCOR data. The slots are
+        added to the pipeline in the order given, as soon as they
+        are available.
+
+        Parameters
+        ----------
+        slots: list of str, pathlib.Path, or dict
+            Paths to measurements, DCOR URLs, or slot states from
+            :func:`.Dataslot.__getstate__()`
+        num_workers: int
+            Number of threads for opening the datasets; defaults
+            to the number of CPU cores (at most 8)
+        lazy: bool
+            Whether to create lazy slots that only open their
+            dataset when it is accessed (see :class:`.Dataslot`)
+        communicate_progress: callable
+            Called with the fraction of slots processed; This is also
+            called periodically while waiting for a dataset to be
+            opened, so that e.g. a GUI can process its events.
+        event_abort: threading.Event
+            If set, the remaining datasets are not added
+
+        Returns
+        -------
+        slot_ids: list of str
+            identifiers of the slots added
+        failed: list of tuple
+            items of `slots` that could not be opened together with
+            the corresponding exception
+        """
+        communicate_progress = communicate_progress or (lambda x: None)
+        event_abort = event_abort or threading.Event()
+        if num_workers is None:
+            num_workers = min(8, os.cpu_count() or 1)
+
+        slot_ids = []
+        failed = []
+        pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, num_workers))
+        try:
+            futures = []
+            for item in slots:
+                if isinstance(item, dict):
+                    futures.append(
+                        pool.submit(Dataslot.from_state, item, lazy=lazy))
+                else:
+                    futures.append(
+                        pool.submit(Dataslot, path=item, lazy=lazy))
+
+            for ii, (item, future) in enumerate(zip(slots, futures)):
+                while not event_abort.is_set():
+                    try:
+                        slot = future.result(timeout=0.1)
+                    except concurrent.futures.TimeoutError:
+                        communicate_progress(ii / len(slots))
+                    except BaseException as exc:
+                        failed.append((item, exc))
+                        break
+                    else:
+                        slot_ids.append(self.add_slot(slot=slot))
+                        break
+                if event_abort.is_set():
+                    break
+                communicate_progress((ii + 1) / len(slots))
+        finally:
+            # Do not wait for pending datasets, e.g. when
+            # `communicate_progress` raises a TaskAbortError.
+            pool.shutdown(wait=False, cancel_futures=True)
+        return slot_ids, failed
+
     def apply_filter_ray(self, rtdc_ds, slot_id):
         """Convenience function for applying filters to other data
 
@@ -276,7 +371,7 @@ class Pipeline(object):
             Identifier of the slot from which the filters are taken
         """
         # make sure the current ray is built correctly
-        self.get_dataset(self.slot_ids.index(slot_id), apply_filter=False)
+        self.get_dataset(self.slots.index_of(slot_id), apply_filter=False)
         # get the ray
         ray = self.get_ray(slot_id)
         ds = ray.get_final_child(rtdc_ds)
@@ -284,7 +379,7 @@ class Pipeline(object):
 
     def check_auto_range_and_spacing(self, plot_id):
         """If "auto range" or "auto spacing" is set, modify plot in-place"""
-        plot = self.plots[self.plot_ids.index(plot_id)]
+        plot = self.plots[self.plots.index_of(plot_id)]
         plot_state = plot.__getstate__()
         gen = plot_state["general"]
         # auto range (overrides stored ranges)
@@ -310,16 +405,14 @@ class Pipeline(object):
         This method was implemented to avoid tiny contour spacings for
         plotting, which could lead to OOM events.
         """
-        plot = self.plots[self.plot_ids.index(plot_id)]
+        plot = self.plots[self.plots.index_of(plot_id)]
         plot_state = plot.__getstate__()
         old_plot_state = copy.deepcopy(plot_state)
         if plot_state["general"]["auto range"]:
             for ax in ["x", "y"]:
                 feat = plot_state["general"][f"axis {ax}"]
                 spacing = plot_state["contour"][f"spacing {ax}"]
-                for ds, slot_state in zip(*self.get_plot_datasets(
-                        plot_id, apply_filter=False)):
-                    slot_id = slot_state["identifier"]
+                for slot_id in self.get_plot_slot_ids(plot_id):
                     slot = self.get_slot(slot_id)
                     sp_min, sp_max = slot.get_sane_spacing_range(feat=feat)
                     # Note that sp_min and sp_max may be `np.nan`
@@ -430,7 +523,7 @@ class Pipeline(object):
 
     def duplicate_filter(self, filter_id):
         """Duplicate a filter"""
-        filt_index = self.filter_ids.index(filter_id)
+        filt_index = self.filters.index_of(filter_id)
         filt = self.filters[filt_index]
         new_id = self.add_filter(index=filt_index + 1)
         # use original state
@@ -444,7 +537,7 @@ class Pipeline(object):
 
     def duplicate_plot(self, plot_id):
         """Duplicate a plot"""
-        plot_index = self.plot_ids.index(plot_id)
+        plot_index = self.plots.index_of(plot_id)
         plot = self.plots[plot_index]
         new_id = self.add_plot(index=plot_index + 1)
         # use original state
@@ -458,7 +551,7 @@ class Pipeline(object):
 
     def duplicate_slot(self, slot_id):
         """Duplicate a slot"""
-        slot_index = self.slot_ids.index(slot_id)
+        slot_index = self.slots.index_of(slot_id)
         slot = self.slots[slot_index]
         new_id = self.add_slot(path=slot.path,
                                index=slot_index + 1)
@@ -503,8 +596,9 @@ class Pipeline(object):
                                                 max_filter_index=filt_index)
             # filter ray magic
             ray = self.get_ray(slot_id)
-            ray.set_filters(filters)
-            ds = ray.get_dataset(apply_filter=apply_filter)
+            with ray.lock:
+                ray.set_filters(filters)
+                ds = ray.get_dataset(apply_filter=apply_filter)
         return ds
 
     def get_datasets(self,
@@ -525,10 +619,92 @@ class Pipeline(object):
             if set to `False`, only the filtering configuration
             of the dataset and its hierarchy parents are updated
         """
+        if filt_index == -1:
+            futures = self.prepare_rays(self.slot_ids,
+                                        apply_filter=apply_filter)
+            return [futures[slot_id].result() for slot_id in self.slot_ids]
         kw = {"filt_index": filt_index,
               "apply_filter": apply_filter}
         return [self.get_dataset(ii, **kw) for ii in range(len(self.slots))]
 
+    def get_dependency_graph(self):
+        """Return the dependencies between the pipeline elements
+
+        Polygon filters are used by filters, filters are applied
+        to slots, and slots are shown in plots.
+
+        Returns
+        -------
+        graph: dict
+            for each slot, filter, and polygon filter (unique ID of
+            :class:`dclab.PolygonFilter`), the set of identifiers of
+            the elements that depend on it directly
+        """
+        graph = {}
+        for slot_id in self.slot_ids:
+            graph[slot_id] = {plot_id for plot_id in self.plot_ids
+                              if self.element_states[slot_id][plot_id]}
+        for filt in self.filters:
+            graph[filt.identifier] = {
+                slot_id for slot_id in self.slot_ids
+                if self.element_states[slot_id][filt.identifier]}
+            for pid in filt.polylist:
+                graph.setdefault(pid, set()).add(filt.identifier)
+        return graph
+
+    def get_dirty_elements(self):
+        """Return the slots and plots affected by recent modifications
+
+        Each element is compared to its state during the previous
+        call of this method. Modified, added, or removed elements
+        and all elements that depend on them (see
+        :func:`get_dependency_graph`) are dirty. For instance,
+        modifying a polygon filter marks the filters using it,
+        the slots to which these filters are applied, and the
+        plots showing these slots as dirty.
+
+        Returns
+        -------
+        dirty: dict
+            with the keys "slots" and "plots", each holding the set
+            of identifiers of the elements that must be updated
+        """
+        graph = self.get_dependency_graph()
+        hashes = {}
+        for slot in self.slots:
+            # include the filters applied (in the order applied)
+            hashes[slot.identifier] = hashobj(
+                [slot.hash] + [filt_id for filt_id in self.filter_ids
+                               if self.element_states[slot.identifier][
+                                   filt_id]])
+        for filt in self.filters:
+            hashes[filt.identifier] = filt.hash
+        for plot in self.plots:
+            # include the slots shown (in the order of the slots)
+            hashes[plot.identifier] = hashobj(
+                [plot.hash] + [slot_id for slot_id in self.slot_ids
+                               if self.element_states[slot_id][
+                                   plot.identifier]])
+        for key in graph:
+            if key not in hashes:
+                # polygon filter
+                pf = dclab.PolygonFilter.get_instance_from_id(key)
+                hashes[key] = pf.hash
+
+        # elements that were modified
+        stack = [key for key in hashes
+                 if hashes[key] != self._element_hashes.get(key)]
+        self._element_hashes = hashes
+        # elements that depend on them
+        dirty = set()
+        while stack:
+            key = stack.pop()
+            if key not in dirty:
+                dirty.add(key)
+                stack += graph.get(key, [])
+        return {"slots": dirty.intersection(self.slot_ids),
+                "plots": dirty.intersection(self.plot_ids)}
+
     def get_features(self, scalar=False, label_sort=False, union=False,
                      plot_id=None, ret_labels=False):
         """Return a list of features in the pipeline
@@ -557,11 +733,11 @@ class Pipeline(object):
         available.
         """
         features = None
-        for slot_index in range(self.num_slots):
-            slot_id = self.slot_ids[slot_index]
+        for slot_index, slot in enumerate(self.slots):
+            slot_id = slot.identifier
             if (plot_id is None
                 or (self.element_states[slot_id][plot_id]
-                    and slot_id in self.slots_used)):
+                    and slot.slot_used)):
                 ds = self.get_dataset(slot_index=slot_index, filt_index=None)
                 if scalar:
                     ds_features = set(ds.features_scalar)
@@ -595,9 +771,10 @@ class Pipeline(object):
 
     def get_filter(self, filt_id):
         """Return the Filter matching the identifier"""
-        if filt_id not in self.filter_ids:
+        filt = self.filters.get(filt_id)
+        if filt is None:
             raise ValueError(f"Filter '{filt_id}' not part of this pipeline!")
-        return self.filters[self.filter_ids.index(filt_id)]
+        return filt
 
     def get_filters_for_slot(self, slot_id, max_filter_index=-1):
         """Return list of filters for a slot
@@ -617,16 +794,20 @@ class Pipeline(object):
         if max_filter_index < 0:
             # include all filters that are used for this slot
             max_filter_index = len(self.filters) - 1
-        for filt_id in self.filter_ids[:max_filter_index + 1]:
-            if (self.is_element_active(slot_id, filt_id)
-                and self.is_element_valid(slot_id, filt_id)
-                    and filt_id in self.filters_used):
-                filters.append(self.get_filter(filt_id))
+        for filt in self.filters[:max_filter_index + 1]:
+            if (filt.filter_used
+                and self.is_element_active(slot_id, filt.identifier)
+                    and self.is_element_valid(slot_id, filt.identifier)):
+                filters.append(filt)
         return filters
 
     def get_min_max(self, feat, plot_id=None, margin=0.0):
         """Return minimum and maximum values for a feature
 
+        The statistics of the individual datasets are kept in
+        :data:`Pipeline.stats_index`, so repeated calls (e.g.
+        for the auto range of a plot) are cheap.
+
         Parameters
         ----------
         feat: str
@@ -645,41 +826,50 @@ class Pipeline(object):
             is empty or only-nan, an :class:`EmptyDatasetWarning` is
             issued and both return values are set to zero.
         """
+        statslist = []
         if plot_id is not None:
-            dslist = self.get_plot_datasets(plot_id)[0]
+            for slot_id in self.get_plot_slot_ids(plot_id):
+                # The dataset and filter hashes define the filtered data.
+                key = filter_ray.get_ray_key(
+                    self.get_slot(slot_id),
+                    self.get_filters_for_slot(slot_id))
+                stats = self.stats_index.get(slot_id, feat, key)
+                if stats is None:
+                    ds = self.get_dataset(self.slots.index_of(slot_id))
+                    stats = compute_statistics(ds, feat)
+                    self.stats_index.set(slot_id, feat, key, stats)
+                statslist.append((slot_id, stats))
         else:
-            dslist = self.get_datasets(filt_index=None, apply_filter=False)
+            for slot_index, slot_id in enumerate(self.slot_ids):
+                ds = self.get_dataset(slot_index,
+                                      filt_index=None,
+                                      apply_filter=False)
+                key = filter_ray.get_dataset_key(ds)
+                if key is None:
+                    # no filter ray was applied to the dataset yet
+                    key = filter_ray.get_ray_key(self.slots[slot_index], [])
+                stats = self.stats_index.get(slot_id, feat, key)
+                if stats is None:
+                    stats = compute_statistics(ds, feat)
+                    self.stats_index.set(slot_id, feat, key, stats)
+                statslist.append((ds.identifier, stats))
+
         fmin = np.inf
         fmax = -np.inf
-        for ds in dslist:
-            with ds.lock:
-                if np.any(ds.filter.all):
-                    if feat in ds:
-                        fdata = ds[feat][ds.filter.all]
-                        invalid = np.isinf(fdata)
-                        if np.any(invalid):
-                            vdata = fdata[~invalid]
-                        else:
-                            vdata = fdata
-                        if feat in FEATURES_MONOTONOUS:
-                            # We are a little faster here.
-                            vmin = min(np.nanmin(vdata[:1000]),
-                                       np.nanmin(vdata[-1000:]))
-                            vmax = max(np.nanmax(vdata[:1000]),
-                                       np.nanmax(vdata[-1000:]))
-                        else:
-                            vmin = np.nanmin(vdata)
-                            vmax = np.nanmax(vdata)
-                        fmin = min(fmin, vmin)
-                        fmax = max(fmax, vmax)
-                    else:
-                        warnings.warn(f"Dataset {ds.identifier} does not "
-                                      f"contain the feature '{feat}'!",
-                                      MissingFeatureWarning)
+        for ds_id, stats in statslist:
+            if stats["events"]:
+                if stats["finite"] is not None:
+                    if stats["finite"]:
+                        fmin = min(fmin, stats["min"])
+                        fmax = max(fmax, stats["max"])
                 else:
-                    warnings.warn(f"Dataset {ds.identifier} does not "
-                                  f"contain any events when filtered!",
-                                  EmptyDatasetWarning)
+                    warnings.warn(f"Dataset {ds_id} does not "
+                                  f"contain the feature '{feat}'!",
+                                  MissingFeatureWarning)
+            else:
+                warnings.warn(f"Dataset {ds_id} does not "
+                              f"contain any events when filtered!",
+                              EmptyDatasetWarning)
         if margin:
             diff = fmax - fmin
             fmin -= margin * diff
@@ -696,7 +886,8 @@ class Pipeline(object):
         Coarse feature computation is faster then the accurate
         :func:`get_min_max`, because it uses metadata stored in the
         root dataset. The range is thus always equal to or larger
-        than that returned by :func:`get_min_max`.
+        than that returned by :func:`get_min_max`. The statistics
+        of the root datasets are kept in :data:`Pipeline.stats_index`.
 
         Parameters
         ----------
@@ -717,42 +908,29 @@ class Pipeline(object):
             issued and both return values are set to zero.
         """
         if plot_id is not None:
-            dslist_children = self.get_plot_datasets(plot_id)[0]
-            dslist = []
-            for ch in dslist_children:
-                if isinstance(ch, RTDC_Hierarchy):
-                    dslist.append(ch.get_root_parent())
-                else:
-                    dslist.append(ch)
+            slot_ids = self.get_plot_slot_ids(plot_id)
         else:
-            dslist = self.get_datasets(filt_index=None, apply_filter=False)
+            slot_ids = self.slot_ids
 
         fmin = np.inf
         fmax = -np.inf
-        for ds in dslist:
+        for slot_id in slot_ids:
+            ds = self.get_slot(slot_id).get_dataset()
             if np.any(ds.filter.all):
-                if feat in ds:
-                    fdata = ds[feat]
-                    vmin = fdata.min()
-                    vmax = fdata.max()
-
-                    if np.any(np.isinf([vmin, vmax])):
-                        # Until now, we might have gotton away with our
-                        # custom h5attrs-backed ufuncs to get the minimum
-                        # and maximum of the feature data. But if there is
-                        # an inf present, then data is probably already loaded
-                        # into memory anyway. The following triggers loading
-                        # the entire feature data into memory for computing
-                        # the non-nan, non-inf minimum and maximum.
-                        fdata_valid = fdata[~np.isinf(fdata)]
-                        if fdata_valid.size:
-                            vmin = np.nanmin(fdata_valid)
-                            vmax = np.nanmax(fdata_valid)
-
+                key = hashobj(["coarse",
+                               ds.hash,
+                               ds.config.get("calculation", {})])
+                stats = self.stats_index.get(slot_id, feat, key)
+                if stats is None:
+                    stats = compute_statistics_coarse(ds, feat)
+                    self.stats_index.set(slot_id, feat, key, stats)
+                if stats["min"] is not None:
+                    vmin = stats["min"]
+                    vmax = stats["max"]
                     if not (np.isnan(vmin) or np.isinf(vmin)):
                         fmin = min(vmin, fmin)
 
-                    if not (np.isnan(vmax) or np.isinf(vmin)):
+                    if not (np.isnan(vmax) or np.isinf(vmax)):
                         fmax = max(vmax, fmax)
                 else:
                     warnings.warn(f"Dataset {ds.identifier} does not "
@@ -773,29 +951,36 @@ class Pipeline(object):
         return [fmin, fmax]
 
     def get_plot(self, plot_id, run_checks=True):
-        if plot_id not in self.plot_ids:
+        plot = self.plots.get(plot_id)
+        if plot is None:
             raise ValueError(f"Plot '{plot_id}' not part of this pipeline!")
         if run_checks:
             self.check_contour_spacing(plot_id)
             self.check_auto_range_and_spacing(plot_id)
-        return self.plots[self.plot_ids.index(plot_id)]
+        return plot
 
     def get_plot_datasets(self, plot_id, apply_filter=True):
         """Return a list of datasets with slot states that belong to a plot"""
         datasets = []
         states = []
+        slot_ids = self.get_plot_slot_ids(plot_id)
+        futures = self.prepare_rays(slot_ids, apply_filter=apply_filter)
+        for slot_id in slot_ids:
+            datasets.append(futures[slot_id].result())
+            states.append(self.get_slot(slot_id).__getstate__())
+        return datasets, states
+
+    def get_plot_slot_ids(self, plot_id):
+        """Return the identifiers of the slots that belong to a plot"""
+        slot_ids = []
         # keep the same order as in self.slots
-        for slot_index in range(len(self.slots)):
-            slot = self.slots[slot_index]
+        for slot in self.slots:
             slot_id = slot.identifier
             if (self.element_states[slot_id][plot_id]
-                    and slot_id in self.slots_used):
-                if self.is_element_valid(slot_id, plot_id):
-                    ds = self.get_dataset(slot_index=slot_index,
-                                          apply_filter=apply_filter)
-                    datasets.append(ds)
-                    states.append(slot.__getstate__())
-        return datasets, states
+                    and slot.slot_used
+                    and self.is_element_valid(slot_id, plot_id)):
+                slot_ids.append(slot_id)
+        return slot_ids
 
     def get_plot_col_row_count(self, plot_id, pipeline_state=None):
         """Compute how many rows a plot layout requires
@@ -847,19 +1032,24 @@ class Pipeline(object):
         """Convenience function that creates and returns a filter ray"""
         # cleanup (just in case)
         for key in list(self.rays.keys()):
-            if key not in self.slot_ids:
-                self.rays.pop(key)
-        if slot_id not in self.rays:
-            # create filter ray if it does not exist
-            self.rays[slot_id] = FilterRay(self.get_slot(slot_id))
-        return self.rays[slot_id]
+            if not self.slots.has_identifier(key):
+                self.rays.pop(key, None)
+        ray = self.rays.get(slot_id)
+        if ray is None:
+            # create filter ray if it does not exist (rays may be
+            # requested from several threads)
+            with self._rays_lock:
+                ray = self.rays.get(slot_id)
+                if ray is None:
+                    ray = FilterRay(self.get_slot(slot_id))
+                    self.rays[slot_id] = ray
+        return ray
 
     def get_slot(self, slot_id):
         """Return the Dataslot matching the RTDCBase identifier"""
         slot_id = slot_id.split("-")[0]  # this is how FilterRay names children
-        if slot_id in self.slot_ids:
-            slot = self.slots[self.slot_ids.index(slot_id)]
-        else:
+        slot = self.slots.get(slot_id)
+        if slot is None:
             raise ValueError(f"Unknown dataset identifier: `{slot_id}`")
         return slot
 
@@ -868,32 +1058,127 @@ class Pipeline(object):
 
     def is_element_valid(self, slot_id, filt_plot_id):
         ds = self.get_slot(slot_id).get_dataset()
-        if filt_plot_id in self.filter_ids:
-            filt = self.get_filter(filt_plot_id)
+        filt = self.filters.get(filt_plot_id)
+        if filt is not None:
+            # Checking `feat in ds` is much faster than computing
+            # the list of all features available (`ds.features`).
             # box filters
             for feat in filt.boxdict:
-                if feat not in ds.features:
+                if feat not in ds:
                     return False
             else:
                 # polygon filters
                 for pid in filt.polylist:
                     pf = dclab.PolygonFilter.get_instance_from_id(pid)
-                    if (pf.axes[0] not in ds.features
-                            or pf.axes[1] not in ds.features):
+                    if pf.axes[0] not in ds or pf.axes[1] not in ds:
                         return False
             return True
-        elif filt_plot_id in self.plot_ids:
-            plot_index = self.plot_ids.index(filt_plot_id)
-            plot_state = self.plots[plot_index].__getstate__()
+        elif self.plots.has_identifier(filt_plot_id):
+            plot_state = self.plots.get(filt_plot_id).__getstate__()
             return (plot_state["general"]["axis x"] in ds
                     and plot_state["general"]["axis y"] in ds)
         else:
             raise ValueError(
                 f"Unknown filter or plot identifier: `{filt_plot_id}`")
 
+    def prepare_rays(self, slot_ids=None, apply_filter=True):
+        """Build the filter rays of multiple slots in a thread pool
+
+        After a filter was modified, the filter rays of all slots
+        that use it must be updated. Calling :func:`get_dataset`
+        for each slot would do this one slot after another. Here,
+        the filter rays are updated concurrently (the filtering of
+        a dataset mostly happens in NumPy which releases the GIL).
+
+        Parameters
+        ----------
+        slot_ids: list of str
+            identifiers of the slots to prepare; defaults to all
+            slots used
+        apply_filter: bool
+            whether to apply the filters (see :func:`get_dataset`)
+
+        Returns
+        -------
+        futures: dict
+            for each slot identifier, a :class:`concurrent.futures.Future`
+            whose result is the final dataset of the filter ray (as
+            returned by :func:`get_dataset`)
+
+        Notes
+        -----
+        Calling :func:`get_dataset` while a filter ray is being
+        prepared is safe; it waits for the filter ray and returns
+        the dataset prepared.
+        """
+        if slot_ids is None:
+            slot_ids = self.slots_used
+        if self._ray_pool is None:
+            self._ray_pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=min(8, os.cpu_count() or 1),
+                thread_name_prefix="FilterRay")
+        futures = {}
+        for slot_id in slot_ids:
+            futures[slot_id] = self._ray_pool.submit(
+                self._get_slot_dataset, slot_id, apply_filter)
+        return futures
+
+    def _get_slot_dataset(self, slot_id, apply_filter=True):
+        """Return the final dataset of a slot (see `prepare_rays`)"""
+        # The index of the slot is determined here, because the slots
+        # might have been reordered after the job was submitted.
+        return self.get_dataset(slot_index=self.slots.index_of(slot_id),
+                                apply_filter=apply_filter)
+
+    def _update_elements(self, kind, states):
+        """Add, remove, or update filters, plots, or slots
+
+        Parameters
+        ----------
+        kind: str
+            one of "filters", "plots", or "slots"
+        states: list of dict
+            states of the elements in the order of the pipeline
+
+        Returns
+        -------
+        changed_ids: list of str
+            identifiers of the elements that were added or updated
+        """
+        add, remove = {
+            "filters": (self.add_filter, self.remove_filter),
+            "plots": (self.add_plot, self.remove_plot),
+            "slots": (lambda state: self.add_slot(slot=state),
+                      self.remove_slot),
+        }[kind]
+        elements = {elem.identifier: elem for elem in getattr(self, kind)}
+        new_ids = [el_state.get("identifier") for el_state in states]
+        for el_id in elements:
+            if el_id not in new_ids:
+                remove(el_id)
+        changed_ids = []
+        for ii, el_state in enumerate(states):
+            elem = elements.get(new_ids[ii])
+            if (elem is not None and kind == "slots"
+                    and str(elem.path) != str(el_state["path"])):
+                # a different dataset (recreate slot and filter ray)
+                remove(elem.identifier)
+                self.rays.pop(elem.identifier, None)
+                elem = None
+            if elem is None:
+                new_ids[ii] = add(el_state)
+                changed_ids.append(new_ids[ii])
+            elif elem.__getstate__() != el_state:
+                elem.__setstate__(el_state)
+                changed_ids.append(elem.identifier)
+        # order of the elements in the state
+        elements = {elem.identifier: elem for elem in getattr(self, kind)}
+        getattr(self, kind)[:] = [elements[el_id] for el_id in new_ids]
+        return changed_ids
+
     def remove_filter(self, filt_id):
         """Remove a filter by filter identifier"""
-        index = self.filter_ids.index(filt_id)
+        index = self.filters.index_of(filt_id)
         self.filters.pop(index)
         for slot_id in self.element_states:
             if filt_id in self.element_states[slot_id]:
@@ -901,7 +1186,7 @@ class Pipeline(object):
 
     def remove_plot(self, plot_id):
         """Remove a filter by plot identifier"""
-        index = self.plot_ids.index(plot_id)
+        index = self.plots.index_of(plot_id)
         self.plots.pop(index)
         for slot_id in self.element_states:
             if plot_id in self.element_states[slot_id]:
@@ -909,9 +1194,10 @@ class Pipeline(object):
 
     def remove_slot(self, slot_id):
         """Remove a slot by slot identifier"""
-        index = self.slot_ids.index(slot_id)
+        index = self.slots.index_of(slot_id)
         slot = self.slots.pop(index)
         slot.close()
+        self.stats_index.invalidate(slot_id)
         if slot_id in self.element_states:
             self.element_states.pop(slot_id)
 
@@ -931,10 +1217,15 @@ class Pipeline(object):
         new_slots = []
         for idx in indices:
             new_slots.append(self.slots[idx])
-        self.slots = new_slots
+        self.slots[:] = new_slots
 
     def reset(self):
         """Reset the pipeline"""
+        if self._ray_pool is not None:
+            # wait for the filter rays that are being built
+            self._ray_pool.shutdown(wait=True, cancel_futures=True)
+            self._ray_pool = None
+
         for slot in self.slots:
             slot.close()
 
@@ -943,6 +1234,8 @@ class Pipeline(object):
         self.rays.clear()
         self.slots.clear()
         self.element_states.clear()
+        self.stats_index.clear()
+        self._element_hashes.clear()
 
         self._plot_counter = 0
         self._slot_counter = 0
@@ -955,9 +1248,9 @@ class Pipeline(object):
         self.element_states[slot_id][filt_plot_id] = active
 
         # Plots: increase plot width/height if required
-        if filt_plot_id in self.plot_ids:
+        if self.plots.has_identifier(filt_plot_id):
             plot_id = filt_plot_id
-            plot_index = self.plot_ids.index(plot_id)
+            plot_index = self.plots.index_of(plot_id)
             try:
                 old_ncol, old_nrow = self.get_plot_col_row_count(
                     filt_plot_id, pipeline_state=old_state)
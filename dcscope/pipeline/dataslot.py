@@ -1,5 +1,10 @@
+import collections
+import contextlib
 import copy
+import gc
+import threading
 import uuid
+import weakref
 
 import dclab
 from dclab.features.emodulus.viscosity import KNOWN_MEDIA
@@ -8,12 +13,120 @@ import numpy as np
 from ..idiom import FEATURES_MONOTONOUS
 from .. import meta_tool
 from ..util import hashobj
+from .versioned import VersionedState
 
 
-class Dataslot:
+class DatasetPool:
+    def __init__(self, max_open=0):
+        """Least-recently-used pool of open dataslot datasets
+
+        Every :class:`Dataslot` registers here when its dataset is
+        accessed. If more than `max_open` datasets are open, the
+        datasets of the least-recently-used slots are evicted (see
+        :func:`Dataslot.evict`). They are transparently reopened
+        when accessed again (and the filter rays are rebuilt, see
+        :class:`.FilterRay`).
+
+        Parameters
+        ----------
+        max_open: int
+            maximum number of open datasets; set to zero to keep
+            all datasets open
+        """
+        self.max_open = max_open
+        self._slots = collections.OrderedDict()
+        # datasets evicted by their slots (see `release`)
+        self._released = []
+        # number of released datasets that were still in use
+        # after the last garbage collection
+        self._num_in_use = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._slots)
+
+    def discard(self, slot):
+        """Remove a slot from the pool (does not close the dataset)"""
+        with self._lock:
+            self._slots.pop(id(slot), None)
+
+    def release(self, dataset_ref):
+        """Keep track of a dataset that was evicted by its slot
+
+        The file of a dataset is closed when the dataset is garbage-
+        collected, i.e. hierarchy children that are still used
+        elsewhere (e.g. by a plot) remain readable. Since dclab
+        datasets contain reference cycles, the garbage collector
+        is run whenever `max_open` (but at least 16) datasets were
+        released since the last collection.
+
+        Parameters
+        ----------
+        dataset_ref: weakref.ref
+            weak reference to the dataset
+        """
+        with self._lock:
+            self._released = [ref for ref in self._released
+                              if ref() is not None]
+            self._released.append(dataset_ref)
+            collect = (len(self._released)
+                       > self._num_in_use + max(self.max_open, 16))
+        if collect:
+            gc.collect()
+            with self._lock:
+                self._released = [ref for ref in self._released
+                                  if ref() is not None]
+                self._num_in_use = len(self._released)
+
+    def touch(self, slot):
+        """Mark a slot as recently used and evict old datasets"""
+        candidates = []
+        with self._lock:
+            self._slots[id(slot)] = weakref.ref(slot)
+            self._slots.move_to_end(id(slot))
+            num_evict = len(self._slots) - self.max_open
+            if self.max_open and num_evict > 0:
+                for key in list(self._slots):
+                    other = self._slots[key]()
+                    if other is None:
+                        # garbage-collected
+                        self._slots.pop(key)
+                        num_evict -= 1
+                    elif other is not slot:
+                        candidates.append(other)
+        for other in candidates:
+            if num_evict <= 0:
+                break
+            # slots that are currently in use are skipped
+            if other.evict():
+                num_evict -= 1
+
+
+#: pool of open datasets of all dataslots
+dataset_pool = DatasetPool()
+
+# locks of the slots by their datasets (see `get_dataset_lock`)
+_dataset_locks = weakref.WeakKeyDictionary()
+
+
+class Dataslot(VersionedState):
     """Handles datasets in a pipeline"""
 
-    def __init__(self, path, identifier=None):
+    def __init__(self, path, identifier=None, lazy=False):
+        """Dataslot for a measurement
+
+        Parameters
+        ----------
+        path: str or pathlib.Path
+            Path to a measurement or DCOR URL
+        identifier: str
+            Identifier of the slot; defaults to a random identifier
+        lazy: bool
+            If set to True, the dataset is only opened when it is
+            accessed for the first time (e.g. via :func:`get_dataset`).
+            The default settings of the slot are then taken from the
+            (cached) metadata, see :func:`.meta_tool.get_rtdc_metadata`.
+        """
         #: session-unique identifier of the slot
         self.identifier = identifier or f"slot:{uuid.uuid4()}".replace("-", "")
 
@@ -22,9 +135,28 @@ class Dataslot:
                              f"dashes '-', got {self.identifier}")
 
         self.path = path
-        self._dataset = None
-
-        cfg = meta_tool.get_rtdc_config(path)
+        #: lock for the dataset of the slot and the hierarchy children
+        #: of its filter ray (see :func:`get_dataset_lock`)
+        self.lock = threading.RLock()
+        #: filter rays of the slot (see :class:`.FilterRay`)
+        self.filter_rays = weakref.WeakSet()
+        # cache for `get_sane_spacing_range`
+        self._sane_spacing_ranges = {}
+
+        if lazy:
+            # The dataset is opened in `get_dataset`.
+            self._dataset = None
+            meta = meta_tool.get_rtdc_metadata(path)
+            cfg = meta["config"]
+            has_temp = "temp" in meta["features innate"]
+            fmt = meta["format"]
+        else:
+            # Open the dataset only once (and not again for the metadata).
+            self._dataset = dclab.new_dataset(path)
+            _dataset_locks[self._dataset] = self.lock
+            cfg = self._dataset.config
+            has_temp = "temp" in self._dataset
+            fmt = self._dataset.format
 
         #: user-defined name of the slot
         self.name = cfg["experiment"]["sample"]
@@ -65,20 +197,22 @@ class Dataslot:
         }
 
         # use the emodulus medium and temperature values as defaults
-        ds = self.get_dataset()
         calc = self.config["emodulus"]
-        if "medium" in ds.config["setup"]:
-            calc["emodulus medium"] = ds.config["setup"]["medium"]
-        if "temp" in ds:
+        if "medium" in cfg["setup"]:
+            calc["emodulus medium"] = cfg["setup"]["medium"]
+        if has_temp:
             # use the "temp" feature
             calc["emodulus scenario"] = "feature"
-        elif "temperature" in ds.config["setup"]:
+        elif "temperature" in cfg["setup"]:
             # use the average temperature
-            calc["emodulus temperature"] = ds.config["setup"]["temperature"]
+            calc["emodulus temperature"] = cfg["setup"]["temperature"]
             calc["emodulus scenario"] = "config"
 
         #: data file format
-        self.format = ds.format
+        self.format = fmt
+
+        if self._dataset is not None:
+            dataset_pool.touch(self)
 
     def __getstate__(self):
         state = {"color": self.color,
@@ -92,6 +226,15 @@ class Dataslot:
                  }
         return copy.deepcopy(state)
 
+    @classmethod
+    def from_state(cls, state, lazy=False):
+        """Create a Dataslot from a state of :func:`__getstate__`"""
+        slot = cls(path=state["path"],
+                   identifier=state["identifier"],
+                   lazy=lazy)
+        slot.__setstate__(state)
+        return slot
+
     def __repr__(self):
         return f"<Pipeline Slot '{self.identifier}' at {hex(id(self))}>"
 
@@ -107,10 +250,20 @@ class Dataslot:
         self.path = state["path"]
         self.slot_used = state["slot used"]
 
+    @property
+    def data_hash(self):
+        """Return the hash of the slot properties that define its data
+
+        Unlike :func:`hash`, this does not change when e.g. only the
+        color or the name of the slot are modified.
+        """
+        state = self.__getstate__()
+        return hashobj([state["path"], state["crosstalk"], state["emodulus"]])
+
     @property
     def hash(self):
-        """Return the hash of the slot"""
-        return hashobj(self.__getstate__())
+        """Return the hash of the slot (cached for each `version`)"""
+        return self._get_cached_hash(lambda: hashobj(self.__getstate__()))
 
     def _set_emodulus_config(self, dataset):
         """Set the Young's modulus data options
@@ -155,8 +308,54 @@ class Dataslot:
                 dataset.config["calculation"].pop("emodulus viscosity model")
 
     def close(self):
-        if isinstance(self._dataset, dclab.rtdc_dataset.RTDC_HDF5):
-            self._dataset.h5file.close()
+        """Close the dataset (it is reopened when accessed again)
+
+        Waits until the lock of the slot is released, i.e. until
+        the dataset is not used by other threads anymore.
+        """
+        with self.lock:
+            dataset_pool.discard(self)
+            for ray in list(self.filter_rays):
+                ray.reset()
+            if isinstance(self._dataset, dclab.rtdc_dataset.RTDC_HDF5):
+                self._dataset.h5file.close()
+            self._dataset = None
+
+    def evict(self):
+        """Release the dataset if it is not in use (see :class:`DatasetPool`)
+
+        Unlike :func:`close`, this does not wait for the lock of the
+        slot and it does not close the file of the dataset. The
+        segments of the filter rays of this slot are removed, so
+        that the file is closed once the dataset is garbage-collected.
+        Hierarchy children of the dataset that are still used
+        elsewhere (e.g. by a plot) remain readable until then.
+
+        Returns
+        -------
+        evicted: bool
+            False if the lock of the slot is held by another thread
+        """
+        if not self.lock.acquire(blocking=False):
+            return False
+        try:
+            dataset_pool.discard(self)
+            for ray in list(self.filter_rays):
+                ray.reset()
+            ds = self._dataset
+            self._dataset = None
+        finally:
+            self.lock.release()
+        if ds is not None:
+            ds_ref = weakref.ref(ds)
+            del ds
+            dataset_pool.release(ds_ref)
+        return True
+
+    @property
+    def is_open(self):
+        """Whether the dataset has been opened (see `lazy`)"""
+        return self._dataset is not None
 
     def get_dataset(self):
         """Return the corresponding dataset
@@ -166,19 +365,29 @@ class Dataslot:
         ds: dclab.RTDCBase
             Loaded dataset
         """
-        if self._dataset is None:
-            ds = dclab.new_dataset(self.path)
-            self._dataset = ds
-        else:
-            ds = self._dataset
-        self.update_dataset(ds)
+        with self.lock:
+            if self._dataset is None:
+                ds = dclab.new_dataset(self.path)
+                self._dataset = ds
+                _dataset_locks[ds] = self.lock
+            else:
+                ds = self._dataset
+            dataset_pool.touch(self)
+            self.update_dataset(ds)
         return ds
 
     def get_sane_spacing_range(self, feat):
         """Return sane contour spacing range for this dataset and feature"""
-        ds = self.get_dataset()
-        sp_min, sp_max = get_sane_contour_spacing_range(feat, ds[feat][:])
-        return sp_min, sp_max
+        # The feature data depend on the configuration (e.g. emodulus)
+        state = self.__getstate__()
+        key = (feat, hashobj([state["crosstalk"], state["emodulus"]]))
+        if key not in self._sane_spacing_ranges:
+            ds = self.get_dataset()
+            # Note that we pass the feature column and not `ds[feat][:]`,
+            # because only a small part of the data is required.
+            self._sane_spacing_ranges[key] = \
+                get_sane_contour_spacing_range(feat, ds[feat])
+        return self._sane_spacing_ranges[key]
 
     def update_dataset(self, dataset):
         """Update the configuration of an instance of RTDCBase
@@ -199,6 +408,25 @@ class Dataslot:
                     dataset.config["calculation"].pop(key)
 
 
+def get_dataset_lock(rtdc_ds):
+    """Return the lock of the slot to which a dataset belongs
+
+    The dataset of a slot and the hierarchy children of its filter
+    ray (see :class:`.FilterRay`) are shared, e.g. by all plots
+    showing the slot. Their filters and configuration change
+    when the filter ray is updated or when the filters are applied.
+    Hold this lock when applying the filters of and reading data
+    from these datasets in a background thread.
+
+    For datasets that do not belong to a slot, a context manager
+    that does nothing is returned.
+    """
+    while isinstance(rtdc_ds, dclab.rtdc_dataset.RTDC_Hierarchy):
+        rtdc_ds = rtdc_ds.hparent
+    lock = _dataset_locks.get(rtdc_ds)
+    return lock if lock is not None else contextlib.nullcontext()
+
+
 def get_sane_contour_spacing_range(feat, data):
     """Return a sane range for contour spacing for a feature
 
@@ -209,21 +437,24 @@ def get_sane_contour_spacing_range(feat, data):
         then spacing takes into account first and last item in `data`.
         Otherwise, the first 10000 elements of `data` are used to
         guess a sane contour spacing.
-    data: 1d ndarray
-        feature data
+    data: 1d ndarray or feature column of an RTDCBase
+        feature data; Only the elements required are accessed (the
+        entire data are only loaded if they contain invalid values).
     """
-    # TODO: caching?
-    if len(data) == 0:
+    size = len(data)
+    if size == 0:
         frange = np.nan
     elif feat in FEATURES_MONOTONOUS:
-        frange = np.abs(data[-1] - data[0])
+        frange = np.abs(data[size-1:size][0] - data[:1][0])
         if np.isnan(frange) or np.isinf(frange):
+            data = np.asarray(data[:])
             invalid = np.logical_or(np.isinf(data), np.isnan(data))
             data_valid = data[~invalid]
             frange = np.abs(data_valid[-1] - data_valid[0])
     else:
         frange = np.ptp(data[:10000])
         if np.isnan(frange) or np.isinf(frange):
+            data = np.asarray(data[:])
             invalid = np.logical_or(np.isinf(data), np.isnan(data))
             data_valid = data[~invalid]
             frange = np.ptp(data_valid[:10000])
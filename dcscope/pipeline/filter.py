@@ -4,9 +4,11 @@ import uuid
 import dclab
 
 from ..util import hashobj
+from .polygon_engine import get_polygon_masks
+from .versioned import VersionedState
 
 
-class Filter:
+class Filter(VersionedState):
     """Handles filters in a pipeline"""
 
     def __init__(self, identifier=None):
@@ -68,8 +70,8 @@ class Filter:
 
     @property
     def hash(self):
-        """Return the hash of the filter"""
-        return hashobj(self.__getstate__())
+        """Return the hash of the filter (cached for each `version`)"""
+        return self._get_cached_hash(lambda: hashobj(self.__getstate__()))
 
     def add_box_filter(self, feature, start, end, active=True):
         """Add a box filter"""
@@ -100,18 +102,56 @@ class Filter:
         self.update_dataset(dataset)
         dataset.apply_filter()
 
-    def update_dataset(self, dataset):
+    def update_dataset(self, dataset, incremental=False):
         """Update the filtering configuration of a dataset
 
+        Parameters
+        ----------
+        dataset: :class:`dclab.RTDCBase`
+            Input dataset
+        incremental: bool
+            By default, all previous filters of `dataset` are reset.
+            If set to True, the filtering configuration is modified
+            in-place instead, so that dclab only recomputes the box
+            and polygon filters that changed when
+            `dataset.apply_filter` is called.
+
+        Returns
+        -------
+        removed: list of str
+            Features of the box filters that were removed from the
+            filtering configuration in incremental mode. dclab does
+            not recompute these box filters by itself, they have to
+            be passed as `force` to `dataset.apply_filter`.
+
         Notes
         -----
         Due to the design of the filtering pipeline, it is not
         possible to use manual filters. If any are set, they
-        are removed from the filter.
+        are removed from the filter. For datasets that are not
+        hierarchy children, the manual filter holds the combined
+        mask of all polygon filters, which are evaluated at once
+        (see :mod:`.polygon_engine`).
         """
-        # remove all previous filters
-        dataset.reset_filter()
         cfgfilt = dataset.config["filtering"]
+        removed = []
+        if incremental:
+            # remove box filters that are not used anymore
+            for key in list(cfgfilt.keys()):
+                feat = key[:-4]
+                if (key.endswith((" min", " max"))
+                        and dclab.dfn.scalar_feature_exists(feat)
+                        and not (feat in self.boxdict
+                                 and self.boxdict[feat]["active"])):
+                    cfgfilt.pop(key)
+                    if feat not in removed:
+                        removed.append(feat)
+            # Polygon filters are added below (dclab discards the
+            # masks of polygon filters that are not used anymore).
+            cfgfilt["polygon filters"] = []
+        else:
+            # remove all previous filters
+            dataset.reset_filter()
 
         # set general options
         cfgfilt.update(self.general)
@@ -123,5 +163,17 @@ class Filter:
                 cfgfilt["{} max".format(feat)] = self.boxdict[feat]["end"]
 
         # set polygon filters
-        for pid in self.polylist:
-            dataset.polygon_filter_add(pid)
+        if isinstance(dataset, dclab.rtdc_dataset.RTDC_Hierarchy):
+            for pid in self.polylist:
+                dataset.polygon_filter_add(pid)
+        else:
+            polygons = []
+            for pid in self.polylist:
+                pf = dclab.PolygonFilter.get_instance_from_id(pid)
+                if pf.axes[0] in dataset and pf.axes[1] in dataset:
+                    polygons.append(pf)
+            manual = dataset.filter.manual
+            manual[:] = True
+            for mask in get_polygon_masks(dataset, polygons):
+                manual &= mask
+        return removed
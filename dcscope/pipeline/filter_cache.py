@@ -0,0 +1,164 @@
+"""Persistent cache of filter masks for filter ray segments
+
+Applying the box and polygon filters of a filter ray (see
+:class:`.FilterRay`) to large datasets is expensive, e.g. every time
+a session is loaded. The combined box, polygon, and invalid-event
+mask of the first ray segment (the filter applied to the dataset of
+the slot) is therefore stored (bit-packed) in the disk store of
+:class:`dclab.cached.StoreKeeper`, which DCscope configures on
+startup (see "cache/disk store path" in the preferences). If no
+disk store is configured, nothing is cached.
+
+The mask is restored via the public manual filter of the dataset
+(see :func:`set_mask`). The masks of the following segments are not
+cached, because the manual filter of dclab hierarchy children is
+kept as a list of root indices, which is slow for large datasets.
+
+The mask is identified by the partial hash of the dataset file (see
+:func:`.util.hash_file_partially`), the configuration of the slot
+(e.g. for computing the Young's modulus), and the properties of the
+filter that define the mask (including its polygon filters).
+Only the masks of local HDF5 files are cached.
+"""
+import logging
+import pathlib
+import traceback
+
+from dclab import cached
+from dclab import PolygonFilter
+import numpy as np
+
+from ..util import hash_file_partially, hashobj
+
+
+logger = logging.getLogger(__name__)
+
+
+class FilterMaskCache:
+    #: version of the mask format (part of the keys)
+    version = 2
+
+    def __init__(self, topic="dcscope-filter-masks"):
+        """Disk cache for the filter masks of datasets
+
+        Parameters
+        ----------
+        topic: str
+            topic of the keys in the disk store
+        """
+        self.topic = topic
+        self.store_keeper = cached.StoreKeeper.get_instance()
+
+    def __bool__(self):
+        return bool(self.store_keeper.disk_store)
+
+    def get(self, key):
+        """Return the bit-packed mask stored for `key` or None"""
+        disk_store = self.store_keeper.disk_store
+        if key is None or not self:
+            return None
+        path = self._get_path(key)
+        if path not in disk_store:
+            return None
+        try:
+            meta, packed = disk_store[path]
+        except BaseException:
+            # The data were probably removed by the store keeper
+            # (the entry is overridden once the mask is computed).
+            logger.warning(f"Could not fetch filter mask {path}: "
+                           f"{traceback.format_exc()}")
+            return None
+        return {"meta": meta, "packed": packed}
+
+    def set(self, key, mask):
+        """Store a bit-packed mask (see :func:`get_mask`) for `key`"""
+        if key is not None and self:
+            self.store_keeper.disk_store[self._get_path(key)] = [
+                mask["meta"], mask["packed"]]
+
+    def _get_path(self, key):
+        ref = hashobj([self.version, key])
+        return f"{self.topic}/{ref[:3]}/{ref[3:6]}/{ref[6:]}"
+
+
+def get_mask(ds):
+    """Return the bit-packed mask of the filters of a dataset
+
+    The mask combines the box, polygon, invalid-event, and manual
+    filters of `ds` (i.e. :attr:`dclab.rtdc_dataset.Filter.all`
+    without the "limit events" downsampling).
+    """
+    filt = ds.filter
+    mask = filt.box & filt.invalid & filt.polygon & filt.manual
+    return {"meta": {"size": int(mask.size),
+                     "count": int(np.sum(mask))},
+            "packed": np.packbits(mask)}
+
+
+def get_mask_key(slot, filt):
+    """Return the mask cache key for the first segment of a filter ray
+
+    Parameters
+    ----------
+    slot: .Dataslot
+        Slot of the filter ray
+    filt: .Filter
+        First active filter of the filter ray
+
+    Returns
+    -------
+    key: str or None
+        key for the mask of `filt` applied to the dataset of `slot`;
+        None if the dataset is not a local HDF5 file (e.g. DCOR or
+        other remote data), in which case the mask is not cached
+    """
+    if slot.format != "hdf5":
+        return None
+    path = pathlib.Path(slot.path)
+    data_id = [hash_file_partially(path), path.stat().st_size]
+    # Only use the filter properties that define the mask
+    # (and not e.g. the filter name or polygon filter ids).
+    box = {feat: [bf["start"], bf["end"]]
+           for feat, bf in filt.boxdict.items() if bf["active"]}
+    polygon = sorted(PolygonFilter.get_instance_from_id(pid).hash
+                     for pid in filt.polylist)
+    slot_state = slot.__getstate__()
+    return hashobj([data_id,
+                    [slot_state["crosstalk"], slot_state["emodulus"]],
+                    filt.general["remove invalid events"],
+                    box,
+                    polygon])
+
+
+def set_mask(ds, filt, mask):
+    """Apply a mask from :func:`get_mask` to a dataset
+
+    The filtering configuration of `ds` is reset and only the general
+    options of `filt` are set (see :func:`.Filter.update_dataset`).
+    The mask is applied as the manual filter of `ds`, so that
+    `ds.apply_filter` does not evaluate the box and polygon filters.
+
+    Returns
+    -------
+    success: bool
+        False if the mask does not match the dataset, in which
+        case nothing is restored
+    """
+    meta = mask["meta"]
+    if meta["size"] != len(ds):
+        return False
+    array = np.unpackbits(mask["packed"], count=meta["size"]).astype(bool)
+    if np.sum(array) != meta["count"]:
+        return False
+    ds.reset_filter()
+    cfgfilt = ds.config["filtering"]
+    cfgfilt.update(filt.general)
+    # invalid events are already excluded by the mask
+    cfgfilt["remove invalid events"] = False
+    cfgfilt["limit events"] = filt.limit_events[0] * filt.limit_events[1]
+    ds.filter.manual[:] = array
+    return True
+
+
+#: persistent cache of filter masks used by all filter rays
+filter_mask_cache = FilterMaskCache()
@@ -1,5 +1,14 @@
+import weakref
+
 import dclab
 
+from . import filter_cache
+from ..util import hashobj
+
+
+#: keys of the datasets of the filter rays (see :func:`get_dataset_key`)
+_dataset_keys = weakref.WeakKeyDictionary()
+
 
 class FilterRay(object):
     def __init__(self, slot):
@@ -12,37 +21,111 @@ class FilterRay(object):
         self.identifier = slot.identifier
         #: slot defining the ray
         self.slot = slot
-        #: segments of the filter ray, consisting of hash, previous, and
-        #: next dataset
+        #: segments of the filter ray, consisting of hash (see
+        #: :func:`get_segment_hash`), previous, and
+        #: next dataset, and the key of the filter mask (see
+        #: :func:`.filter_cache.get_mask_key`)
         self.segments = []
         # holds the filters (protected so that users use set_filters)
         self._filters = []
         # used for testing (incremented when the ray is cut)
         self._generation = 0
-        # used for checking validity of the ray
-        self._slot_hash = "unset"
+        # segments whose filter masks will be stored in the filter
+        # mask cache after the filters have been applied
+        self._masks_pending = []
+        #: lock for building the segments (see :func:`.Pipeline.prepare_rays`);
+        #: this is the lock of the slot, so that the segments are not
+        #: modified while their data are read in other threads
+        self.lock = slot.lock
+        # the segments are removed when the slot is closed
+        slot.filter_rays.add(self)
 
     def __repr__(self):
         repre = "<Pipeline Filter Ray '{}' at {}>".format(self.identifier,
                                                           hex(id(self)))
         return repre
 
-    def _add_segment(self, ds, filt):
-        """Add a filter segment"""
-        ds.reset_filter()
-        filt.update_dataset(ds)
+    def _add_segment(self, ds, filt, mask_key=None, incremental=False):
+        """Add a filter segment
+
+        If `mask_key` is given (only for the first segment) and the
+        filter mask for it is in the
+        :data:`.filter_cache.filter_mask_cache`, then the mask is
+        restored and not recomputed.
+
+        If `incremental` is set, the filtering configuration of `ds`
+        is modified in-place instead of being reset, so that only
+        the box and polygon filters that changed are recomputed
+        (see :func:`.Filter.update_dataset`).
+        """
+        mask = filter_cache.filter_mask_cache.get(mask_key)
+        if mask is not None and filter_cache.set_mask(ds, filt, mask):
+            restored = True
+        elif incremental:
+            restored = False
+            removed = filt.update_dataset(ds, incremental=True)
+            if removed:
+                # reset the masks of the removed box filters
+                ds.apply_filter(force=removed)
+        else:
+            restored = False
+            filt.update_dataset(ds)
         child = self._new_child(ds, filt)
-        self.segments.append([filt.hash, ds, child])
+        segment = [get_segment_hash(filt), ds, child, mask_key]
+        if not restored:
+            self._masks_pending.append(segment)
+        self.segments.append(segment)
         return child
 
-    def _new_child(self, ds, filt=None, apply_filter=False):
+    def _cache_masks(self):
+        """Store the filter mask of a new first segment in the disk cache"""
+        for segment in self._masks_pending:
+            _, ds, _, mask_key = segment
+            if (mask_key is not None
+                    and any(seg is segment for seg in self.segments)):
+                filter_cache.filter_mask_cache.set(
+                    mask_key, filter_cache.get_mask(ds))
+        self._masks_pending.clear()
+
+    def _get_mask_key(self, filters, index):
+        """Return the filter mask cache key for a new segment
+
+        Only the mask of the first segment is cached (see
+        :mod:`.filter_cache`).
+        """
+        if index == 0 and filter_cache.filter_mask_cache:
+            return filter_cache.get_mask_key(self.slot, filters[0])
+        else:
+            return None
+
+    def _get_child_identifier(self, filt=None):
         identifier = self.slot.identifier
         if filt is None:
             identifier += "-root"
         else:
             identifier += "-" + filt.identifier + "-child"
+        return identifier
+
+    def _set_dataset_keys(self, filters):
+        """Remember the keys of the datasets in the ray
+
+        The filtered data of the input dataset of a segment are
+        defined by the filter of that segment and the filters of
+        the previous segments (see :func:`get_dataset_key`).
+        """
+        for ii, seg in enumerate(self.segments):
+            _dataset_keys[seg[1]] = get_ray_key(self.slot, filters[:ii+1])
+        if self.segments:
+            final_ds = self.segments[-1][2]
+        else:
+            final_ds = self.slot.get_dataset()
+        _dataset_keys[final_ds] = get_ray_key(self.slot, filters)
+
+    def _new_child(self, ds, filt=None, apply_filter=False):
         ds = dclab.rtdc_dataset.RTDC_Hierarchy(
-            ds, apply_filter=apply_filter, identifier=identifier)
+            ds,
+            apply_filter=apply_filter,
+            identifier=self._get_child_identifier(filt))
         return ds
 
     @property
@@ -121,12 +204,20 @@ class FilterRay(object):
                     ds = self._new_child(ds, filt)
                 elif len(self.segments) < ii + 1:
                     # just create a new segment
-                    ds = self._add_segment(ds, filt)
-                elif filt.hash != self.segments[ii][0]:
+                    ds = self._add_segment(ds, filt,
+                                           self._get_mask_key(filters, ii))
+                elif get_segment_hash(filt) != self.segments[ii][0]:
                     # the filter ray is changing here;
                     # trim it and add a new segment
+                    # (if only the filter of this segment was modified,
+                    # dclab only recomputes what changed)
+                    modified = (self.segments[ii][2].identifier
+                                == self._get_child_identifier(filt))
                     self.segments = self.segments[:ii]
-                    ds = self._add_segment(ds, filt)
+                    ds = self._add_segment(ds,
+                                           filt,
+                                           self._get_mask_key(filters, ii),
+                                           incremental=modified)
                     self._generation += 1  # for testing
                 else:
                     # reuse previous segment
@@ -137,9 +228,14 @@ class FilterRay(object):
             # make sure no filters are applied to the returned dataset
             ds.reset_filter()
 
+        if not (external_ds or external_filt):
+            self._set_dataset_keys(filters)
+
         if apply_filter:
             # Apply all filters in the underlying hierarchy.
             final_ds.apply_filter()
+            if not (external_ds or external_filt):
+                self._cache_masks()
 
         return final_ds
 
@@ -157,10 +253,63 @@ class FilterRay(object):
             yourself.
         """
         # compute the final hierarchy child
-        ds = self.get_final_child(apply_filter=apply_filter)
+        with self.lock:
+            ds = self.get_final_child(apply_filter=apply_filter)
         return ds
 
+    def reset(self):
+        """Remove all segments (e.g. when the dataset of the slot is closed)
+
+        The hierarchy children are recreated when the dataset is
+        requested again.
+        """
+        with self.lock:
+            self.segments = []
+            self._masks_pending.clear()
+
     def set_filters(self, filters):
         """Set the filters of the current ray"""
         # only take into account active filters
         self._filters = filters
+
+
+def get_dataset_key(rtdc_ds):
+    """Return a key that identifies the filtered data of a ray dataset
+
+    The key is computed with :func:`get_ray_key` when the filter
+    ray yields `rtdc_ds` (see :func:`FilterRay.get_final_child`),
+    so that no feature data or filter arrays have to be hashed.
+    Returns None for datasets that are not part of a filter ray.
+    """
+    return _dataset_keys.get(rtdc_ds)
+
+
+def get_ray_key(slot, filters):
+    """Return a key that identifies the data of a slot after filtering
+
+    Parameters
+    ----------
+    slot: .Dataslot
+        Slot of the filter ray
+    filters: list of .Filter
+        Active filters applied to the dataset of `slot`
+
+    Only the properties of the slot that define its data are used
+    (see :func:`.Dataslot.data_hash`), so that e.g. changing the
+    color of a slot does not invalidate data derived from the key.
+    """
+    return hashobj([slot.data_hash]
+                   + [get_segment_hash(f) for f in filters])
+
+
+def get_segment_hash(filt):
+    """Return the hash of a filter including its polygon filters
+
+    The polygon filters of a root dataset are applied as a manual
+    filter (see :func:`.Filter.update_dataset`), so the segment
+    must be updated when their points change.
+    """
+    return hashobj(
+        [filt.hash]
+        + [dclab.PolygonFilter.get_instance_from_id(pid).hash
+           for pid in filt.polylist])
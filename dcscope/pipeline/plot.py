@@ -6,6 +6,7 @@ import numpy as np
 from dclab.kde import methods as kdem
 
 from ..util import hashobj
+from .versioned import VersionedState
 
 DEFAULT_STATE = {
     "identifier": "no default",
@@ -54,6 +55,16 @@ DEFAULT_STATE = {
     }
 }
 
+#: Plot state entries that only affect the presentation of a plot, i.e.
+#: neither the plot data nor the arrangement of the subplots
+#: (see :func:`split_plot_state`)
+PRESENTATION_STATE_KEYS = {
+    "layout": ["name", "size x", "size y"],
+    "scatter": ["colormap", "hue max", "hue min", "marker alpha",
+                "marker size"],
+    "contour": ["legend", "line styles", "line widths"],
+}
+
 _kde_methods = sorted(kdem.methods.keys())
 _kde_methods.remove("none")  # does not make sense here
 
@@ -110,8 +121,9 @@ STATE_OPTIONS = {
 }
 
 
-class Plot:
+class Plot(VersionedState):
     """Handles plotting information in a pipeline"""
+    _versioned = ("_state",)
 
     def __init__(self, identifier=None):
         identifier = identifier or f"plot:{uuid.uuid4()}".replace("-", "")
@@ -165,8 +177,8 @@ class Plot:
 
     @property
     def hash(self):
-        """Return the hash of the plot"""
-        return hashobj(self.__getstate__())
+        """Return the hash of the plot (cached for each `version`)"""
+        return self._get_cached_hash(lambda: hashobj(self.__getstate__()))
 
     @property
     def name(self):
@@ -175,3 +187,23 @@ class Plot:
     @name.setter
     def name(self, value):
         self._state["layout"]["name"] = value
+
+
+def split_plot_state(plot_state):
+    """Split a plot state into data-affecting and presentation-only parts
+
+    Returns
+    -------
+    data_state: dict
+        copy of `plot_state` without the presentation-only entries
+    presentation_state: dict
+        presentation-only entries of `plot_state`
+        (see :const:`PRESENTATION_STATE_KEYS`)
+    """
+    data_state = copy.deepcopy(plot_state)
+    presentation_state = {}
+    for topic, keys in PRESENTATION_STATE_KEYS.items():
+        presentation_state[topic] = {}
+        for key in keys:
+            presentation_state[topic][key] = data_state[topic].pop(key)
+    return data_state, presentation_state
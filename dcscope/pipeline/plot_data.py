@@ -0,0 +1,475 @@
+"""Computation of plot data that does not depend on Qt
+
+The functions in this module compute the data for contour and scatter
+plots from a dataset and a plot state. The `*_in_process` functions
+do the same for a picklable description of a filter ray (see
+:func:`get_ray_state`), so that they can be run in a process pool.
+In that case, the resulting arrays are returned via shared memory.
+
+Results are kept in :data:`plot_data_cache`, see :func:`get_cache_key`.
+"""
+import collections
+import concurrent.futures
+import logging
+from multiprocessing import shared_memory
+import sys
+import threading
+
+import dclab
+from dclab.kde import KernelDensityEstimator
+from dclab.rtdc_dataset.feat_anc_plugin import plugin_feature
+import numpy as np
+
+from . import filter_ray
+from .dataslot import Dataslot
+from .filter import Filter
+from ..util import hashobj
+
+
+#: plot state keys that define the contour data
+CONTOUR_STATE_KEYS = {
+    "general": ["axis x", "axis y", "kde", "scale x", "scale y",
+                "spacing x", "spacing y"],
+    "contour": ["percentiles"],
+}
+
+#: plot state keys that define the scatter data (not the brushes)
+SCATTER_STATE_KEYS = {
+    "general": ["axis x", "axis y", "kde", "scale x", "scale y",
+                "spacing x", "spacing y"],
+    "scatter": ["downsample", "downsampling value", "hue feature",
+                "marker hue"],
+}
+
+#: maximum number of filter rays kept in a worker process
+PROCESS_RAY_CACHE_SIZE = 20
+
+# filter rays of a worker process (see `get_ray_dataset`)
+_process_rays = collections.OrderedDict()
+_process_lock = threading.Lock()
+
+
+class PlotDataCache:
+    def __init__(self, max_size=64, max_bytes=512 * 1024**2):
+        """Least-recently-used cache for contour and scatter plot data
+
+        Parameters
+        ----------
+        max_size: int
+            maximum number of cached results
+        max_bytes: int
+            maximum total size of the numpy arrays of all results
+        """
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        #: number of cache hits
+        self.hits = 0
+        #: number of cache misses
+        self.misses = 0
+        self.logger = logging.getLogger(__name__)
+        self._data = collections.OrderedDict()
+        self._nbytes = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def nbytes(self):
+        """Total size of the numpy arrays in the cache"""
+        return sum(self._nbytes.values())
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._nbytes.clear()
+
+    def get(self, key):
+        """Return the cached result for `key` or None"""
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._data.move_to_end(key)
+        self.logger.debug(
+            f"Plot data cache {'miss' if value is None else 'hit'} "
+            f"(hits: {self.hits}, misses: {self.misses})")
+        return value
+
+    def set(self, key, value):
+        """Add a result to the cache, evicting the oldest results"""
+        nbytes = _get_nbytes(value)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._nbytes[key] = nbytes
+            while (len(self._data) > self.max_size
+                   or sum(self._nbytes.values()) > self.max_bytes):
+                old_key, _ = self._data.popitem(last=False)
+                self._nbytes.pop(old_key)
+
+
+#: cache for plot data (see :func:`get_cache_key`)
+plot_data_cache = PlotDataCache()
+
+
+def compute_contours(rtdc_ds, plot_state):
+    """Compute the contour lines for a plot state and a filtered dataset
+
+    The density grid is shared with :func:`compute_scatter` via the
+    dclab cache of :func:`dclab.kde.KernelDensityEstimator.get_raster`,
+    so e.g. changing the contour percentiles only requires the
+    extraction of new contour levels.
+    """
+    gen = plot_state["general"]
+    con = plot_state["contour"]
+    kde_instance = KernelDensityEstimator(rtdc_ds=rtdc_ds)
+    contours = kde_instance.get_contour_lines(
+        xax=gen["axis x"],
+        yax=gen["axis y"],
+        xacc=gen["spacing x"],
+        yacc=gen["spacing y"],
+        xscale=gen["scale x"],
+        yscale=gen["scale y"],
+        kde_type=gen["kde"],
+        # `get_at` uses an empty dictionary (not None) for the raster
+        kde_kwargs={},
+        quantiles=[p/100 for p in con["percentiles"]],
+    )
+    return contours
+
+
+def compute_scatter(rtdc_ds, plot_state):
+    """Compute scatter plot data for a plot state and a filtered dataset
+
+    Returns
+    -------
+    x, y: 1d ndarrays
+        downsampled scatter data
+    kde: 1d ndarray
+        density at (x, y) normalized to the interval [0, 1]
+    idx: 1d boolean ndarray
+        mask of the downsampled events in `rtdc_ds`
+    hue: 1d ndarray or None
+        values of the hue feature for "feature" marker hue
+    """
+    gen = plot_state["general"]
+    sca = plot_state["scatter"]
+
+    # get downsampled list of points for scatter plot
+    x, y, idx = rtdc_ds.get_downsampled_scatter(
+        downsample=sca["downsample"] * sca["downsampling value"],
+        xax=gen["axis x"],
+        yax=gen["axis y"],
+        xscale=gen["scale x"],
+        yscale=gen["scale y"],
+        remove_invalid=True,
+        ret_mask=True)
+
+    # create KDE instance
+    kde_instance = KernelDensityEstimator(rtdc_ds=rtdc_ds)
+
+    # interpolate the KDE at the specified positions
+    kde = kde_instance.get_at(
+        positions=(x, y),
+        xax=gen["axis x"],
+        yax=gen["axis y"],
+        kde_type=gen["kde"],
+        xscale=gen["scale x"],
+        yscale=gen["scale y"],
+        xacc=gen["spacing x"],
+        yacc=gen["spacing y"],
+    )
+
+    if kde.size:
+        kde_nan = np.isnan(kde)
+
+        if np.any(~kde_nan):
+            # We have non-nan values that we can normalize.
+            kde_min = np.nanmin(kde)
+            kde_max = np.nanmax(kde)
+            if not np.any(np.isnan([kde_min, kde_max])) and kde_min != kde_max:
+                kde -= kde_min
+                kde /= (kde_max - kde_min)
+
+        if np.any(kde_nan):
+            # Set all nan-values to zero so user can see the dots
+            kde[kde_nan] = 0
+
+    if sca["marker hue"] == "feature":
+        hue = np.asarray(rtdc_ds[sca["hue feature"]][idx], dtype=float)
+    else:
+        hue = None
+
+    return x, y, kde, idx, hue
+
+
+def compute_contours_in_process(ray_state, plot_state):
+    """Compute contour lines in a worker process
+
+    The contour lines are concatenated and returned via shared memory,
+    use :func:`receive_contours` to get them back.
+    """
+    rtdc_ds = get_ray_dataset(ray_state)
+    contours = compute_contours(rtdc_ds, plot_state)
+    lengths = [[len(cc) for cc in contour] for contour in contours]
+    flat = [cc for contour in contours for cc in contour]
+    if flat:
+        points = np.concatenate(flat)
+    else:
+        points = np.zeros((0, 2))
+    return lengths, share_arrays([points])
+
+
+def compute_scatter_in_process(ray_state, plot_state):
+    """Compute scatter plot data in a worker process
+
+    The arrays of :func:`compute_scatter` are returned via shared
+    memory, use :func:`receive_scatter` to get them back.
+    """
+    rtdc_ds = get_ray_dataset(ray_state)
+    data = compute_scatter(rtdc_ds, plot_state)
+    return None, share_arrays(data)
+
+
+def discard_arrays(shared):
+    """Free the shared memory of arrays that are not needed anymore"""
+    for item in shared:
+        if isinstance(item, tuple):
+            try:
+                shm = shared_memory.SharedMemory(name=item[0])
+            except FileNotFoundError:
+                continue
+            shm.close()
+            shm.unlink()
+
+
+def get_cache_key(kind, plot_state, dataset_key):
+    """Return the key for :data:`plot_data_cache`
+
+    Parameters
+    ----------
+    kind: str
+        "contour" or "scatter"
+    plot_state: dict
+        plot state; only the entries that define the data (see
+        :const:`CONTOUR_STATE_KEYS` and :const:`SCATTER_STATE_KEYS`)
+        are used
+    dataset_key: str
+        key of the filtered dataset (see :func:`get_dataset_key`)
+    """
+    state_keys = CONTOUR_STATE_KEYS if kind == "contour" else \
+        SCATTER_STATE_KEYS
+    tohash = [kind, dataset_key]
+    for topic in sorted(state_keys):
+        tohash.append([plot_state[topic][key] for key in state_keys[topic]])
+    return hashobj(tohash)
+
+
+def get_dataset_key(rtdc_ds=None, ray_state=None):
+    """Return a key that identifies the data of a filtered dataset
+
+    Parameters
+    ----------
+    rtdc_ds: dclab.rtdc_dataset.RTDCBase
+        dataset of a filter ray (see :func:`.filter_ray.get_dataset_key`)
+    ray_state: dict
+        filter ray description (see :func:`get_ray_state`), used
+        instead of `rtdc_ds` when the data are computed in a process
+
+    Returns
+    -------
+    key: str or None
+        key of the dataset; None if `rtdc_ds` is not part of a
+        filter ray, in which case the data must not be cached
+    """
+    if ray_state is not None:
+        # the color and names of a slot do not affect the data
+        slot_state = {k: v for (k, v) in ray_state["slot"].items()
+                      if k not in ["color", "fl names", "name"]}
+        return hashobj([slot_state,
+                        ray_state["filters"],
+                        ray_state["polygon filters"],
+                        ray_state["plugin paths"]])
+    else:
+        return filter_ray.get_dataset_key(rtdc_ds)
+
+
+def get_ray_dataset(ray_state):
+    """Return the final filter ray dataset of a ray state
+
+    This is meant to be called in a worker process. The filter rays
+    are kept in memory and reused if the slot did not change, so that
+    the hierarchy children of the filters are not recomputed.
+    """
+    with _process_lock:
+        # polygon filters
+        for pstate in ray_state["polygon filters"]:
+            pid = pstate["identifier"]
+            if dclab.PolygonFilter.unique_id_exists(pid):
+                pf = dclab.PolygonFilter.get_instance_from_id(pid)
+            else:
+                pf = dclab.PolygonFilter(
+                    axes=(pstate["axis x"], pstate["axis y"]),
+                    points=pstate["points"],
+                    unique_id=pid)
+            pf.__setstate__(pstate)
+
+        # plugin features
+        loaded = {str(pf.plugin_path): pf
+                  for pf in plugin_feature.PlugInFeature.features
+                  if isinstance(pf, plugin_feature.PlugInFeature)}
+        for path in set(loaded) - set(ray_state["plugin paths"]):
+            plugin_feature.remove_plugin_feature(loaded[path])
+        sys_path = list(sys.path)
+        try:
+            for path in set(ray_state["plugin paths"]) - set(loaded):
+                plugin_feature.load_plugin_feature(path)
+        finally:
+            # dclab does not restore `sys.path` properly
+            sys.path[:] = sys_path
+
+        # filter ray
+        slot_state = ray_state["slot"]
+        slot_id = slot_state["identifier"]
+        ray = _process_rays.pop(slot_id, None)
+        if ray is None or ray.slot.__getstate__() != slot_state:
+            if ray is not None:
+                ray.slot.close()
+            slot = Dataslot(path=slot_state["path"], identifier=slot_id)
+            slot.__setstate__(slot_state)
+            ray = filter_ray.FilterRay(slot)
+        _process_rays[slot_id] = ray
+        while len(_process_rays) > PROCESS_RAY_CACHE_SIZE:
+            _, old_ray = _process_rays.popitem(last=False)
+            old_ray.slot.close()
+
+        filters = []
+        for filt_state in ray_state["filters"]:
+            filt = Filter(identifier=filt_state["identifier"])
+            filt.__setstate__(filt_state)
+            filters.append(filt)
+        ray.set_filters(filters)
+        return ray.get_dataset(apply_filter=True)
+
+
+def get_ray_state(pipeline, slot_id):
+    """Return a picklable description of the filter ray of a slot
+
+    The description contains the slot state, the states of all
+    filters used for that slot, the states of their polygon filters,
+    and the paths of loaded plugin features.
+    """
+    slot = pipeline.get_slot(slot_id)
+    filters = pipeline.get_filters_for_slot(slot.identifier)
+    poly_ids = sorted(set(pid for filt in filters for pid in filt.polylist))
+    plugin_paths = sorted(
+        set(str(pf.plugin_path) for pf in plugin_feature.PlugInFeature.features
+            if isinstance(pf, plugin_feature.PlugInFeature)))
+    return {
+        "filters": [filt.__getstate__() for filt in filters],
+        "plugin paths": plugin_paths,
+        "polygon filters": [
+            dclab.PolygonFilter.get_instance_from_id(pid).__getstate__()
+            for pid in poly_ids],
+        "slot": slot.__getstate__(),
+    }
+
+
+def receive_arrays(shared):
+    """Copy arrays out of shared memory and free the shared memory"""
+    arrays = []
+    for item in shared:
+        if isinstance(item, tuple):
+            name, shape, dtype = item
+            shm = shared_memory.SharedMemory(name=name)
+            arrays.append(
+                np.ndarray(shape, dtype=dtype, buffer=shm.buf).copy())
+            shm.close()
+            shm.unlink()
+        else:
+            arrays.append(item)
+    return arrays
+
+
+def receive_contours(result):
+    """Return the contour lines from :func:`compute_contours_in_process`"""
+    lengths, shared = result
+    points = receive_arrays(shared)[0]
+    contours = []
+    start = 0
+    for contour_lengths in lengths:
+        contour = []
+        for size in contour_lengths:
+            contour.append(points[start:start + size])
+            start += size
+        contours.append(contour)
+    return contours
+
+
+def receive_scatter(result):
+    """Return the scatter data from :func:`compute_scatter_in_process`"""
+    return receive_arrays(result[1])
+
+
+def run_in_process_pool(process_pool, func, *args, event_abort=None):
+    """Run `func` in `process_pool` and wait for the result
+
+    `func` must return a tuple whose second item is the output of
+    :func:`share_arrays`. If `event_abort` is set while waiting, None
+    is returned and the shared memory of the result (once available)
+    is freed.
+    """
+    future = process_pool.submit(func, *args)
+    while True:
+        done, _ = concurrent.futures.wait([future], timeout=0.1)
+        if done:
+            return future.result()
+        elif event_abort is not None and event_abort.is_set():
+            if not future.cancel():
+                future.add_done_callback(_discard_future_result)
+            return None
+
+
+def share_arrays(arrays):
+    """Put arrays into shared memory
+
+    Returns a list with a tuple (name, shape, dtype) for each array
+    (empty arrays and None are returned as-is). The receiving process
+    must call :func:`receive_arrays` or :func:`discard_arrays`.
+    """
+    shared = []
+    for arr in arrays:
+        if arr is None or arr.nbytes == 0:
+            shared.append(arr)
+        else:
+            shm = shared_memory.SharedMemory(create=True, size=arr.nbytes)
+            np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[:] = arr
+            shared.append((shm.name, arr.shape, arr.dtype.str))
+            shm.close()
+    return shared
+
+
+def _get_nbytes(value):
+    """Return the total size of the numpy arrays in `value`"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    elif isinstance(value, (list, tuple)):
+        return sum(_get_nbytes(item) for item in value)
+    else:
+        return 0
+
+
+def _discard_future_result(future):
+    """Free the shared memory of a result that nobody is waiting for"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    discard_arrays(future.result()[1])
@@ -0,0 +1,182 @@
+"""Batch evaluation of polygon filters
+
+dclab evaluates the polygon filters of a dataset one after another,
+testing every event against every polygon. Here, all polygon filters
+of a dataset are evaluated at once:
+
+- the feature data of polygon filters that share the same axes are
+  only loaded once,
+- only the events within the bounding box of all polygons of the same
+  axes are considered at all and each polygon only tests the events
+  within its own bounding box,
+- the masks are kept in :data:`polygon_mask_cache`, identified by the
+  data of the dataset (see :func:`get_dataset_key`) and the polygon
+  filter (:func:`dclab.PolygonFilter.hash`).
+
+The resulting masks are identical to those of
+:func:`dclab.PolygonFilter.filter`. :func:`.Filter.update_dataset`
+combines them into the manual filter of datasets that are not
+hierarchy children (the polygon filters of hierarchy children are
+evaluated by dclab).
+"""
+import collections
+import threading
+
+from dclab.external.skimage.measure import points_in_poly
+import numpy as np
+
+from ..util import hashobj
+
+
+class PolygonMaskCache:
+    def __init__(self, max_size=128, max_bytes=256 * 1024**2):
+        """Least-recently-used cache for polygon filter masks
+
+        Parameters
+        ----------
+        max_size: int
+            maximum number of cached masks
+        max_bytes: int
+            maximum total size of all cached masks
+        """
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        #: number of cache hits
+        self.hits = 0
+        #: number of cache misses
+        self.misses = 0
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def nbytes(self):
+        """Total size of the cached masks"""
+        with self._lock:
+            return sum(mask.nbytes for mask in self._data.values())
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def get(self, key):
+        """Return the cached mask for `key` or None"""
+        with self._lock:
+            mask = self._data.get(key)
+            if mask is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._data.move_to_end(key)
+        return mask
+
+    def set(self, key, mask):
+        """Add a mask to the cache, evicting the oldest masks"""
+        if mask.nbytes > self.max_bytes:
+            return
+        # the masks are shared between datasets
+        mask.flags.writeable = False
+        with self._lock:
+            self._data[key] = mask
+            self._data.move_to_end(key)
+            nbytes = sum(m.nbytes for m in self._data.values())
+            while len(self._data) > self.max_size or nbytes > self.max_bytes:
+                _, old_mask = self._data.popitem(last=False)
+                nbytes -= old_mask.nbytes
+
+
+def compute_polygon_masks(rtdc_ds, polygons):
+    """Compute the masks of multiple polygon filters for a dataset
+
+    Parameters
+    ----------
+    rtdc_ds: dclab.rtdc_dataset.RTDCBase
+        dataset (its filters must be up-to-date if it is a
+        hierarchy child)
+    polygons: list of dclab.PolygonFilter
+        polygon filters to evaluate
+
+    Returns
+    -------
+    masks: list of np.ndarray
+        boolean mask for each polygon filter (in the same order);
+        the same as :func:`dclab.PolygonFilter.filter`
+    """
+    size = len(rtdc_ds)
+    masks = [None] * len(polygons)
+    # group the polygon filters by axes
+    groups = collections.defaultdict(list)
+    for ii, pf in enumerate(polygons):
+        groups[tuple(pf.axes)].append(ii)
+
+    for (xax, yax), indices in groups.items():
+        x = np.asarray(rtdc_ds[xax][:], dtype=np.float64)
+        y = np.asarray(rtdc_ds[yax][:], dtype=np.float64)
+        # bounding boxes of the polygons
+        bboxes = []
+        for ii in indices:
+            verts = np.asarray(polygons[ii].points, dtype=np.float64)
+            bboxes.append((verts[:, 0].min(), verts[:, 0].max(),
+                           verts[:, 1].min(), verts[:, 1].max()))
+        bboxes = np.array(bboxes)
+        # events within the bounding box of all polygons (this
+        # excludes nan-valued events, which are never in a polygon)
+        candidates = np.flatnonzero(
+            (x >= bboxes[:, 0].min()) & (x <= bboxes[:, 1].max())
+            & (y >= bboxes[:, 2].min()) & (y <= bboxes[:, 3].max()))
+        xc = x[candidates]
+        yc = y[candidates]
+        for ii, (xmin, xmax, ymin, ymax) in zip(indices, bboxes):
+            pf = polygons[ii]
+            in_bbox = np.flatnonzero((xc >= xmin) & (xc <= xmax)
+                                     & (yc >= ymin) & (yc <= ymax))
+            points = np.zeros((in_bbox.size, 2), dtype=np.float64)
+            points[:, 0] = xc[in_bbox]
+            points[:, 1] = yc[in_bbox]
+            inside = points_in_poly(points=points, verts=pf.points)
+            mask = np.zeros(size, dtype=bool)
+            mask[candidates[in_bbox[inside]]] = True
+            if pf.inverted:
+                np.invert(mask, mask)
+            masks[ii] = mask
+    return masks
+
+
+def get_dataset_key(rtdc_ds):
+    """Return a key that identifies the feature data of a dataset
+
+    The key of a hierarchy child depends on the filters of its
+    parent (see :func:`dclab.rtdc_dataset.RTDC_Hierarchy.hash`).
+    """
+    return hashobj([rtdc_ds.hash,
+                    len(rtdc_ds),
+                    rtdc_ds.config.get("calculation", {})])
+
+
+def get_polygon_masks(rtdc_ds, polygons):
+    """Return the masks of polygon filters, using the mask cache
+
+    This is :func:`compute_polygon_masks` with the masks
+    cached in :data:`polygon_mask_cache`.
+    """
+    ds_key = get_dataset_key(rtdc_ds)
+    keys = [hashobj([ds_key, pf.hash]) for pf in polygons]
+    masks = [polygon_mask_cache.get(key) for key in keys]
+    missing = [ii for ii, mask in enumerate(masks) if mask is None]
+    if missing:
+        computed = compute_polygon_masks(rtdc_ds,
+                                         [polygons[ii] for ii in missing])
+        for ii, mask in zip(missing, computed):
+            polygon_mask_cache.set(keys[ii], mask)
+            masks[ii] = mask
+    return masks
+
+
+#: cache for polygon filter masks (see :func:`get_polygon_masks`)
+polygon_mask_cache = PolygonMaskCache()
@@ -0,0 +1,113 @@
+"""Identifier-indexed lists of pipeline elements
+
+The pipeline looks up its slots, filters, and plots by identifier
+(e.g. :func:`.Pipeline.get_slot`) many times for each modification
+of the pipeline, often in nested loops over slots and filters.
+:class:`ElementRegistry` is a list that keeps a mapping from the
+identifiers of its elements to their positions, so that these
+lookups do not have to scan the list.
+"""
+
+
+class ElementRegistry(list):
+    def __init__(self, elements=()):
+        """List of pipeline elements with identifier lookup
+
+        The elements must have a unique (and constant) `identifier`
+        attribute. The index of the identifiers is updated lazily
+        on the first lookup after the list was modified.
+        """
+        super(ElementRegistry, self).__init__(elements)
+        self._identifiers = None
+        self._index = None
+
+    def _invalidate(self):
+        self._identifiers = None
+        self._index = None
+
+    @property
+    def identifiers(self):
+        """Tuple of the identifiers of all elements (in order)"""
+        identifiers = self._identifiers
+        if identifiers is None:
+            identifiers = tuple(elem.identifier for elem in self)
+            self._identifiers = identifiers
+        return identifiers
+
+    def get(self, identifier, default=None):
+        """Return the element with the given identifier"""
+        index = self._get_index().get(identifier)
+        return default if index is None else self[index]
+
+    def has_identifier(self, identifier):
+        """Whether an element with the given identifier exists"""
+        return identifier in self._get_index()
+
+    def index_of(self, identifier):
+        """Return the position of the element with the given identifier
+
+        Raises a ValueError if the identifier is unknown (like
+        `list.index`).
+        """
+        try:
+            return self._get_index()[identifier]
+        except KeyError:
+            raise ValueError(f"'{identifier}' is not in list")
+
+    def _get_index(self):
+        index = self._index
+        if index is None:
+            index = {el_id: ii for ii, el_id in enumerate(self.identifiers)}
+            self._index = index
+        return index
+
+    # list methods that modify the list
+    def __delitem__(self, index):
+        super(ElementRegistry, self).__delitem__(index)
+        self._invalidate()
+
+    def __iadd__(self, other):
+        self.extend(other)
+        return self
+
+    def __imul__(self, value):
+        super(ElementRegistry, self).__imul__(value)
+        self._invalidate()
+        return self
+
+    def __setitem__(self, index, value):
+        super(ElementRegistry, self).__setitem__(index, value)
+        self._invalidate()
+
+    def append(self, value):
+        super(ElementRegistry, self).append(value)
+        self._invalidate()
+
+    def clear(self):
+        super(ElementRegistry, self).clear()
+        self._invalidate()
+
+    def extend(self, values):
+        super(ElementRegistry, self).extend(values)
+        self._invalidate()
+
+    def insert(self, index, value):
+        super(ElementRegistry, self).insert(index, value)
+        self._invalidate()
+
+    def pop(self, *args):
+        value = super(ElementRegistry, self).pop(*args)
+        self._invalidate()
+        return value
+
+    def remove(self, value):
+        super(ElementRegistry, self).remove(value)
+        self._invalidate()
+
+    def reverse(self):
+        super(ElementRegistry, self).reverse()
+        self._invalidate()
+
+    def sort(self, *args, **kwargs):
+        super(ElementRegistry, self).sort(*args, **kwargs)
+        self._invalidate()
@@ -0,0 +1,140 @@
+"""Index of per-slot feature statistics used for plot ranges
+
+:func:`.Pipeline.get_min_max` and :func:`.Pipeline.get_min_max_coarse`
+are called whenever the auto-range of a plot or the box filter ranges
+are updated. Scanning the feature data each time is expensive, so the
+statistics are computed once per slot, feature, and dataset key (which
+changes when the filter ray or the slot changes) and kept in a
+:class:`StatisticsIndex`.
+"""
+import collections
+import threading
+
+import numpy as np
+
+from ..idiom import FEATURES_MONOTONOUS
+
+
+class StatisticsIndex:
+    def __init__(self, max_size=2048):
+        """Least-recently-used index of feature statistics
+
+        The entries are indexed by slot identifier, feature name,
+        and a key identifying the filtered dataset (e.g.
+        :func:`.plot_data.get_dataset_key`).
+
+        Parameters
+        ----------
+        max_size: int
+            maximum number of statistics entries
+        """
+        self.max_size = max_size
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def get(self, slot_id, feat, key):
+        """Return the statistics dictionary or None if not indexed"""
+        with self._lock:
+            stats = self._data.get((slot_id, feat, key))
+            if stats is not None:
+                self._data.move_to_end((slot_id, feat, key))
+        return stats
+
+    def invalidate(self, slot_id):
+        """Remove all entries of a slot"""
+        with self._lock:
+            for index_key in list(self._data):
+                if index_key[0] == slot_id:
+                    self._data.pop(index_key)
+
+    def set(self, slot_id, feat, key, stats):
+        """Add statistics to the index, evicting the oldest entries"""
+        with self._lock:
+            self._data[(slot_id, feat, key)] = stats
+            self._data.move_to_end((slot_id, feat, key))
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+
+def compute_statistics(rtdc_ds, feat):
+    """Compute the statistics of a filtered feature
+
+    Returns
+    -------
+    stats: dict
+        - "events": number of events that pass the filters
+        - "finite": number of finite feature values (None if
+          the feature is not available)
+        - "min", "max": minimum and maximum of the finite feature
+          values (nan if there are none, None if the feature
+          is not available)
+    """
+    with rtdc_ds.lock:
+        stats = {"events": int(np.sum(rtdc_ds.filter.all)),
+                 "finite": None,
+                 "min": None,
+                 "max": None,
+                 }
+        if stats["events"] and feat in rtdc_ds:
+            fdata = rtdc_ds[feat][rtdc_ds.filter.all]
+            valid = np.isfinite(fdata)
+            stats["finite"] = int(np.sum(valid))
+            if stats["finite"] == 0:
+                stats["min"] = stats["max"] = np.nan
+            else:
+                if stats["finite"] < fdata.size:
+                    vdata = fdata[valid]
+                else:
+                    vdata = fdata
+                if feat in FEATURES_MONOTONOUS:
+                    # We are a little faster here.
+                    stats["min"] = min(np.min(vdata[:1000]),
+                                       np.min(vdata[-1000:]))
+                    stats["max"] = max(np.max(vdata[:1000]),
+                                       np.max(vdata[-1000:]))
+                else:
+                    stats["min"] = np.min(vdata)
+                    stats["max"] = np.max(vdata)
+    return stats
+
+
+def compute_statistics_coarse(rtdc_ds, feat):
+    """Compute coarse statistics of an unfiltered feature
+
+    Only the minimum and maximum are computed (using the metadata
+    stored in the dataset, if possible). The returned dictionary
+    has the same keys as the one of :func:`compute_statistics`, but
+    "events" and "finite" are None.
+    """
+    stats = {"events": None,
+             "finite": None,
+             "min": None,
+             "max": None,
+             }
+    if feat in rtdc_ds:
+        fdata = rtdc_ds[feat]
+        vmin = fdata.min()
+        vmax = fdata.max()
+
+        if np.any(np.isinf([vmin, vmax])):
+            # Until now, we might have gotton away with our
+            # custom h5attrs-backed ufuncs to get the minimum
+            # and maximum of the feature data. But if there is
+            # an inf present, then data is probably already loaded
+            # into memory anyway. The following triggers loading
+            # the entire feature data into memory for computing
+            # the non-nan, non-inf minimum and maximum.
+            fdata_valid = fdata[~np.isinf(fdata)]
+            if fdata_valid.size:
+                vmin = np.nanmin(fdata_valid)
+                vmax = np.nanmax(fdata_valid)
+        stats["min"] = vmin
+        stats["max"] = vmax
+    return stats
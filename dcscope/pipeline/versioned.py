@@ -0,0 +1,223 @@
+"""Change tracking for pipeline elements
+
+Filters, dataslots, and plots are frequently checked for changes,
+e.g. by the filter rays (see :class:`.FilterRay`) or the plot
+widgets when the pipeline changes. Computing the hash of the
+(deep-copied) state of each element for every check is expensive.
+Instead, :class:`VersionedState` increments a version counter
+whenever an element is modified and caches the hash of the state
+for the current version.
+"""
+import collections.abc
+import copy
+
+
+class VersionedState:
+    """Mixin that keeps track of modifications of an object
+
+    Every assignment to a public attribute (not starting with an
+    underscore) or to an attribute listed in :attr:`_versioned`
+    increments :attr:`version`. Dictionaries and lists stored in
+    these attributes are wrapped (not copied, see :func:`track`),
+    so that in-place modifications through the attribute (also of
+    nested dictionaries and lists) increment :attr:`version` as well.
+    """
+    #: private attributes that are tracked as well
+    _versioned = ()
+
+    def __setattr__(self, name, value):
+        if not name.startswith("_") or name in self._versioned:
+            value = track(value, self._increment_version)
+            self._increment_version()
+        super(VersionedState, self).__setattr__(name, value)
+
+    @property
+    def version(self):
+        """Version of the object (incremented on each modification)"""
+        return self.__dict__.get("_version", 0)
+
+    def _get_cached_hash(self, compute_hash):
+        """Return the cached hash or compute it with `compute_hash`"""
+        version, the_hash = self.__dict__.get("_hash_cache", (None, None))
+        if version != self.version:
+            version = self.version
+            the_hash = compute_hash()
+            self._hash_cache = (version, the_hash)
+        return the_hash
+
+    def _increment_version(self):
+        self._version = self.version + 1
+
+
+class TrackedDict(collections.abc.MutableMapping):
+    def __init__(self, data, callback):
+        """View of a dictionary that calls `callback` when it is modified
+
+        `data` is not copied, all modifications are applied to it.
+        """
+        self._data = data
+        self._callback = callback
+
+    def __deepcopy__(self, memo):
+        # copies are plain dictionaries (e.g. in `__getstate__`)
+        return copy.deepcopy(self._data, memo)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __copy__(self):
+        return copy.copy(self._data)
+
+    def __reduce__(self):
+        return dict, (self._data,)
+
+    def __delitem__(self, key):
+        del self._data[key]
+        self._callback()
+
+    def __eq__(self, other):
+        return self._data == untrack(other)
+
+    def __getitem__(self, key):
+        return track(self._data[key], self._callback)
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return repr(self._data)
+
+    def __setitem__(self, key, value):
+        self._data[key] = untrack(value)
+        self._callback()
+
+    def clear(self):
+        self._data.clear()
+        self._callback()
+
+    def copy(self):
+        return self._data.copy()
+
+    def pop(self, *args):
+        value = self._data.pop(*args)
+        self._callback()
+        return value
+
+    def popitem(self):
+        item = self._data.popitem()
+        self._callback()
+        return item
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self._data[key] = untrack(value)
+        self._callback()
+
+
+class TrackedList(collections.abc.MutableSequence):
+    def __init__(self, data, callback):
+        """View of a list that calls `callback` when it is modified
+
+        `data` is not copied, all modifications are applied to it.
+        """
+        self._data = data
+        self._callback = callback
+
+    def __deepcopy__(self, memo):
+        # copies are plain lists (e.g. in `__getstate__`)
+        return copy.deepcopy(self._data, memo)
+
+    def __contains__(self, value):
+        return value in self._data
+
+    def __copy__(self):
+        return copy.copy(self._data)
+
+    def __reduce__(self):
+        return list, (self._data,)
+
+    def __delitem__(self, index):
+        del self._data[index]
+        self._callback()
+
+    def __eq__(self, other):
+        return self._data == untrack(other)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._data[index]
+        return track(self._data[index], self._callback)
+
+    def __iadd__(self, other):
+        self.extend(other)
+        return self
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return repr(self._data)
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            value = [untrack(item) for item in value]
+        else:
+            value = untrack(value)
+        self._data[index] = value
+        self._callback()
+
+    def clear(self):
+        self._data.clear()
+        self._callback()
+
+    def copy(self):
+        return self._data.copy()
+
+    def extend(self, values):
+        self._data.extend([untrack(value) for value in values])
+        self._callback()
+
+    def insert(self, index, value):
+        self._data.insert(index, untrack(value))
+        self._callback()
+
+    def pop(self, *args):
+        value = self._data.pop(*args)
+        self._callback()
+        return value
+
+    def reverse(self):
+        self._data.reverse()
+        self._callback()
+
+    def sort(self, *args, **kwargs):
+        self._data.sort(*args, **kwargs)
+        self._callback()
+
+
+def track(value, callback):
+    """Return a tracked view of a dictionary or list
+
+    The view calls `callback` whenever it is modified. Other
+    objects are returned unchanged.
+    """
+    value = untrack(value)
+    if isinstance(value, dict):
+        return TrackedDict(value, callback)
+    elif isinstance(value, list):
+        return TrackedList(value, callback)
+    return value
+
+
+def untrack(value):
+    """Return the dictionary or list of a tracked view"""
+    if isinstance(value, (TrackedDict, TrackedList)):
+        return value._data
+    return value
@@ -1,4 +1,3 @@
-import hashlib
 import io
 import json
 import os
@@ -10,10 +9,10 @@ from typing import Callable, IO
 import zipfile
 
 import dclab
-from dclab.util import file_monitoring_lru_cache
 import numpy as np
 
 from .pipeline import Filter, Pipeline
+from .util import hash_file_partially
 from ._version import version
 
 
@@ -174,22 +173,6 @@ def import_filter_set(path, pipeline, strict=False):
         pipeline.add_filter(filt=filt)
 
 
-@file_monitoring_lru_cache(maxsize=1000)
-def hash_file_partially(path, size=524288):
-    """Hash parts of a file for basic identification
-
-    By default, the first and final 512kB are hashed.
-    """
-    fsize = path.stat().st_size
-    size = min(size, fsize)
-    with path.open("rb") as fd:
-        head = fd.read(size)
-        fd.seek(fsize-size)
-        tail = fd.read(size)
-        hexhash = hashlib.md5(head + tail).hexdigest()
-    return hexhash
-
-
 def save_session(path, pipeline):
     """Save an entire pipeline session"""
     path = pathlib.Path(path)
@@ -383,14 +366,18 @@ def open_session(path: str | pathlib.Path,
         import_filters(arc.open("filters.sof"), pipeline, strict=True)
 
         # load slots
-        for ii, sstate in enumerate(slot_states):
-            communicate_message(f"adding slot {sstate['name']}")
-            communicate_progress(0.1 + 0.8 * (ii + 1) / len(slot_states))
-            if event_abort.is_set():
-                pipeline.reset()
-                return pipeline
-
-            pipeline.add_slot(sstate)
+        communicate_message(f"adding {len(slot_states)} slots")
+        # Datasets are only opened when they are needed.
+        _, failed = pipeline.add_slots(
+            slot_states,
+            lazy=True,
+            communicate_progress=lambda x: communicate_progress(0.1 + 0.8*x),
+            event_abort=event_abort)
+        if event_abort.is_set():
+            pipeline.reset()
+            return pipeline
+        elif failed:
+            raise failed[0][1]
 
         # load plots
         plotnames = sorted(
@@ -1,6 +1,8 @@
+import hashlib
 import os.path
 
 import dclab
+from dclab.util import file_monitoring_lru_cache
 # hashobj is imported from several other submodules in DCscope.
 # Would we need to add additional functionalities in the future, which
 # are not within the scope of dclab, then we can patch this method here.
@@ -53,6 +55,22 @@ def get_valid_filename(value):
     return ret
 
 
+@file_monitoring_lru_cache(maxsize=1000)
+def hash_file_partially(path, size=524288):
+    """Hash parts of a file for basic identification
+
+    By default, the first and final 512kB are hashed.
+    """
+    fsize = path.stat().st_size
+    size = min(size, fsize)
+    with path.open("rb") as fd:
+        head = fd.read(size)
+        fd.seek(fsize-size)
+        tail = fd.read(size)
+        hexhash = hashlib.md5(head + tail).hexdigest()
+    return hexhash
+
+
 def strip_common_prefix_suffix(string_list: list[str]) -> list[str]:
     sl = string_list
 
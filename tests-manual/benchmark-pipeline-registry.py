@@ -0,0 +1,61 @@
+"""Benchmark of identifier lookups in large pipelines
+
+Measures the time for looking up all slots and filters by identifier
+and for determining the filters and plots of all slots in pipelines
+with 50, 200, and 500 slots, 20 filters, and 5 plots.
+"""
+import pathlib
+import time
+
+from dcscope import pipeline
+
+
+def timeit(func, repeat=3):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def lookup(pl):
+    for slot_id in pl.slot_ids:
+        pl.get_slot(slot_id)
+        pl.get_ray(slot_id)
+    for filt_id in pl.filter_ids:
+        pl.get_filter(filt_id)
+
+
+def filters_for_slots(pl):
+    for slot_id in pl.slot_ids:
+        pl.get_filters_for_slot(slot_id)
+
+
+def plot_slots(pl):
+    for plot_id in pl.plot_ids:
+        pl.get_plot_slot_ids(plot_id)
+
+
+path = pathlib.Path(__file__).parents[1] / "tests" / "data" / \
+    "calibration_beads_47.rtdc"
+
+print(f"{'slots':>6} {'lookup [s]':>11} {'filters [s]':>12} "
+      f"{'plots [s]':>10}")
+for num_slots in [50, 200, 500]:
+    pl = pipeline.Pipeline()
+    pl.add_slots([path] * num_slots)
+    for ii in range(20):
+        filt_id = pl.add_filter()
+        pl.get_filter(filt_id).boxdict["area_um"] = {
+            "start": 0, "end": 100 + ii, "active": True}
+        for slot_id in pl.slot_ids[ii::2]:
+            pl.element_states[slot_id][filt_id] = True
+    for ii in range(5):
+        plot_id = pl.add_plot()
+        for slot_id in pl.slot_ids[ii::5]:
+            pl.element_states[slot_id][plot_id] = True
+    print(f"{num_slots:>6} {timeit(lambda: lookup(pl)):>11.3f} "
+          f"{timeit(lambda: filters_for_slots(pl)):>12.3f} "
+          f"{timeit(lambda: plot_slots(pl)):>10.3f}")
+    pl.reset()
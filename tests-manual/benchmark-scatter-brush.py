@@ -0,0 +1,46 @@
+"""Benchmark of the scatter plot brush computation
+
+Compares the per-point `ColorMap.mapToQColor` approach with the
+vectorized `map_to_brushes` (including `ScatterPlotItem.setData`).
+"""
+import sys
+import time
+
+import numpy as np
+import pyqtgraph as pg
+from PyQt6.QtWidgets import QApplication
+
+from dcscope.gui.widgets import get_colormap, map_to_brushes
+
+
+def brushes_per_point(values, color_map_name):
+    cmap = get_colormap(color_map_name)
+    return [cmap.mapToQColor(v) for v in values]
+
+
+def brushes_vectorized(values, color_map_name):
+    return map_to_brushes(values, color_map_name)
+
+
+def timeit(func, values, repeat=3):
+    item = pg.ScatterPlotItem()
+    x = np.random.random(values.size)
+    y = np.random.random(values.size)
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        item.setData(x=x, y=y, brush=func(values, "viridis"))
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+app = QApplication(sys.argv)
+rng = np.random.default_rng(42)
+
+print(f"{'points':>8} {'per point [s]':>14} {'vectorized [s]':>15} "
+      f"{'speedup':>8}")
+for size in [5_000, 50_000, 500_000]:
+    values = rng.random(size)
+    t_old = timeit(brushes_per_point, values, repeat=1 if size > 5e4 else 3)
+    t_new = timeit(brushes_vectorized, values)
+    print(f"{size:>8} {t_old:>14.3f} {t_new:>15.3f} {t_old / t_new:>7.1f}x")
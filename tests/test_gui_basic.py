@@ -4,6 +4,7 @@ from unittest import mock
 import sys
 
 import dcscope
+from dcscope.gui.helpers import PPModCoalescer
 from dcscope.gui.main import DCscope
 from dcscope import session
 import pytest
@@ -52,6 +53,31 @@ def test_init_load_dataslot(qtbot):
     mw.close()
 
 
+def test_add_dataslot_hold_pp_mod(qtbot, monkeypatch):
+    """Pipeline modifications are passed on after all slots are added"""
+    mw = DCscope()
+    received = []
+    mw.pp_mod_coalescer.pp_mod_send.connect(received.append)
+    add_slots = mw.pipeline.add_slots
+
+    def add_slots_checked(*args, **kwargs):
+        num_received = len(received)
+        slot_ids, failed = add_slots(*args, **kwargs)
+        # modification while Qt events are processed
+        mw.pp_mod_send.emit({"pipeline-rendering": {}})
+        kwargs["communicate_progress"](1)
+        assert len(received) == num_received
+        return slot_ids, failed
+
+    monkeypatch.setattr(mw.pipeline, "add_slots", add_slots_checked)
+    mw.add_dataslot(paths=[data_path / "calibration_beads_47.rtdc"])
+    assert len(mw.pipeline.slots) == 1
+    assert received[-2] == {"pipeline-rendering": {}}
+    assert received[-1] == {
+        "pipeline": {"slots_added": mw.pipeline.slot_ids}}
+    mw.close()
+
+
 @pytest.mark.skipif(sys.version_info < (3, 8), reason="requires python>=3.8")
 def test_on_action_about(qtbot):
     with mock.patch("PyQt6.QtWidgets.QMessageBox.about") as mock_about:
@@ -68,3 +94,46 @@ def test_simple(qtbot):
     """Open the main window and close it again"""
     main_window = DCscope()
     main_window.close()
+
+
+def test_pp_mod_coalescer(qtbot):
+    coalescer = PPModCoalescer(interval=100)
+    received = []
+    coalescer.pp_mod_send.connect(received.append)
+
+    # the first modification is sent immediately
+    coalescer.on_pp_mod_recv({"pipeline": {"filter_modified": "a"}})
+    assert received == [{"pipeline": {"filter_modified": "a"}}]
+
+    # a burst of identical modifications (e.g. resize events) is combined
+    for _ in range(10):
+        coalescer.on_pp_mod_recv(
+            {"pipeline-rendering": {"plot_size_changed": "p"}})
+    assert len(received) == 1
+    # different modifications are not merged, but sent in order
+    coalescer.on_pp_mod_recv({"pipeline": {"filter_modified": "b"}})
+    assert received[1] == {"pipeline-rendering": {"plot_size_changed": "p"}}
+
+    # the final state is always delivered
+    qtbot.waitUntil(lambda: len(received) == 3, timeout=1000)
+    assert received[2] == {"pipeline": {"filter_modified": "b"}}
+    qtbot.wait(200)
+    assert len(received) == 3
+
+    # other signals are sent immediately (after pending modifications)
+    coalescer.on_pp_mod_recv({"pipeline": {"plot_changed": "p"}})
+    coalescer.on_pp_mod_recv({"pipeline": {"plot_changed": "p"}})
+    coalescer.on_pp_mod_recv({"pipeline": {"plot_removed": "p"}})
+    assert received[3:] == [{"pipeline": {"plot_changed": "p"}},
+                            {"pipeline": {"plot_changed": "p"}},
+                            {"pipeline": {"plot_removed": "p"}}]
+
+    # nothing is sent on hold, not even after the interval
+    del received[:]
+    with coalescer.hold():
+        coalescer.on_pp_mod_recv({"pipeline": {"slots_added": ["s"]}})
+        coalescer.on_pp_mod_recv({"pipeline": {"filter_modified": "a"}})
+        qtbot.wait(200)
+        assert received == []
+    assert received == [{"pipeline": {"slots_added": ["s"]}},
+                        {"pipeline": {"filter_modified": "a"}}]
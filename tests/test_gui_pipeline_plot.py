@@ -1,8 +1,13 @@
 import pathlib
+import threading
+import time
 
 import dclab
+import numpy as np
 
-from dcscope.gui import pipeline_plot
+from dcscope import pipeline
+from dcscope.gui import pipeline_plot, pipeline_plot_compute
+from dcscope.gui.widgets import get_colormap, map_to_brushes
 
 
 datapath = pathlib.Path(__file__).parent / "data"
@@ -90,3 +95,72 @@ def test_get_hash_flag_dataset_with_hash():
     assert results[0] is None
     assert results[1] is None
     assert results[2] == "Pipeline 1d01"
+
+
+def test_map_to_brushes():
+    values = np.linspace(0, 1, 1000)
+    values[10] = np.nan
+    values[11] = 1.5
+    brushes = map_to_brushes(values, "viridis")
+    assert brushes.shape == (1000,)
+    # quantized colors are reused
+    assert len({id(b) for b in brushes}) <= 256 + 1
+    assert brushes[10].color().name() == "#ff0000"
+    # out-of-range values are clipped
+    assert brushes[11] is brushes[-1]
+
+    cmap = get_colormap("viridis")
+    for ii in [0, 100, 500, 999]:
+        ref = np.array(cmap.mapToQColor(values[ii]).getRgb())
+        act = np.array(brushes[ii].color().getRgb())
+        assert np.all(np.abs(ref - act) <= 1)
+
+
+def test_compute_from_state_serialized_per_slot(monkeypatch):
+    """Tasks for the same slot do not apply filters concurrently"""
+    pl = pipeline.Pipeline()
+    slot_id = pl.add_slot(path=datapath / "calibration_beads_47.rtdc")
+    filt_id = pl.add_filter()
+    pl.get_filter(filt_id).boxdict["area_um"] = {
+        "start": 0, "end": 40, "active": True}
+    pl.set_element_active(slot_id, filt_id)
+    plot_id = pl.add_plot()
+    pl.set_element_active(slot_id, plot_id)
+    plot_state = pl.get_plot(plot_id).__getstate__()
+    rtdc_ds = pl.get_dataset(0)
+
+    active = []
+    overlaps = []
+    apply_filter = dclab.rtdc_dataset.RTDC_Hierarchy.apply_filter
+
+    def apply_filter_slow(self, *args, **kwargs):
+        if active:
+            overlaps.append(self)
+        active.append(self)
+        time.sleep(0.05)
+        try:
+            apply_filter(self, *args, **kwargs)
+        finally:
+            active.remove(self)
+
+    monkeypatch.setattr(dclab.rtdc_dataset.RTDC_Hierarchy, "apply_filter",
+                        apply_filter_slow)
+
+    errors = []
+
+    def compute(func):
+        try:
+            func(plot_state=plot_state, rtdc_ds=rtdc_ds, pipeline=pl)
+        except BaseException as e:
+            errors.append(e)
+
+    funcs = [pipeline_plot_compute.compute_contours_from_state,
+             pipeline_plot_compute.compute_scatter_data_from_state] * 2
+    threads = [threading.Thread(target=compute, args=(func,))
+               for func in funcs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert not overlaps
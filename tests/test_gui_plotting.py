@@ -689,3 +689,87 @@ def test_plot_not_resized_on_apply(qtbot, mw):
 
     assert state_c["layout"]["size x"] == state_a["layout"]["size x"]
     assert state_c["layout"]["size y"] == state_a["layout"]["size y"]
+
+
+def test_plot_restyle_without_recomputation(qtbot, mw):
+    """Presentation-only changes do not redraw the plot items"""
+    qtbot.addWidget(mw)
+
+    path = datapath / "calibration_beads_47.rtdc"
+    slot_id = mw.add_dataslot(paths=[path])[0]
+    plot_id = mw.add_plot()
+    pe = mw.ui.block_matrix.get_widget(slot_id, plot_id)
+    qtbot.mouseClick(pe, QtCore.Qt.MouseButton.LeftButton)
+    mw.wait_for_tasks()
+    # make sure the plot is drawn with the automatic range and spacing
+    mw.pp_mod_send.emit({"pipeline": {"plot_changed": plot_id}})
+    mw.wait_for_tasks()
+
+    plot_widget = mw.subwindows_plots[plot_id].widget()
+    items = list(plot_widget.plot_items)
+    scatter_item = items[0]._scatter_items[0]["item"]
+    # restyling does not access the dataset (shared with other threads)
+    assert "rtdc_ds" not in items[0]._scatter_items[0]
+    contour_line = items[-1]._contour_items[0][2]
+
+    plot = mw.pipeline.get_plot(plot_id)
+    state = plot.__getstate__()
+    state["layout"]["name"] = "restyled"
+    state["scatter"]["marker size"] = 7.0
+    state["scatter"]["colormap"] = "inferno"
+    state["contour"]["line widths"] = [5.0, 1.0]
+    state["contour"]["legend"] = True
+    plot.__setstate__(state)
+    mw.pp_mod_send.emit({"pipeline": {"plot_changed": plot_id}})
+    mw.wait_for_tasks()
+
+    # the plot items are the same
+    assert plot_widget.plot_items == items
+    assert items[0]._scatter_items[0]["item"] is scatter_item
+    assert scatter_item.opts["size"] == 7.0
+    assert contour_line.opts["pen"].widthF() == 5.0
+    assert items[-1].legend is not None
+    assert plot_widget.windowTitle() == "restyled"
+
+    # changing the data redraws the plot
+    state["contour"]["percentiles"] = [90.0, 50.0]
+    plot.__setstate__(state)
+    mw.pp_mod_send.emit({"pipeline": {"plot_changed": plot_id}})
+    mw.wait_for_tasks()
+    assert plot_widget.plot_items != items
+
+
+def test_plot_and_filter_modification_in_one_burst(qtbot, mw, monkeypatch):
+    """A filter modification redraws plots next to a plot modification"""
+    qtbot.addWidget(mw)
+    # make sure all modifications below are part of one burst
+    mw.pp_mod_coalescer.interval = 1000
+
+    slot_id = mw.add_dataslot(paths=[datapath / "calibration_beads_47.rtdc"])
+    plot_id_a = mw.add_plot()
+    plot_id_b = mw.add_plot()
+    filt_id = mw.pipeline.filter_ids[0]
+    for plot_id in [plot_id_a, plot_id_b, filt_id]:
+        em = mw.ui.block_matrix.get_widget(filt_plot_id=plot_id,
+                                           slot_id=slot_id[0])
+        qtbot.mouseClick(em, QtCore.Qt.MouseButton.LeftButton)
+    mw.wait_for_tasks()
+
+    plot_widget_b = mw.subwindows_plots[plot_id_b].widget()
+    updated = []
+    update_content = plot_widget_b.update_content
+    monkeypatch.setattr(plot_widget_b, "update_content",
+                        lambda: updated.append(True) or update_content())
+
+    # modify plot A, then the filter, then plot A again
+    mw.pp_mod_send.emit({"pipeline": {"plot_changed": plot_id_a}})
+    filt = mw.pipeline.get_filter(filt_id)
+    filt.limit_events = [True, 4]
+    mw.pp_mod_send.emit({"pipeline": {"filter_modified": filt_id}})
+    mw.pp_mod_send.emit({"pipeline": {"plot_changed": plot_id_a}})
+    mw.wait_for_tasks()
+
+    # plot B was redrawn with the filtered data
+    assert updated
+    scat = plot_widget_b.plot_items[0].items[-1]
+    assert len(scat.data) == 4
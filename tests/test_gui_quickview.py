@@ -27,6 +27,22 @@ def run_around_tests():
     session.clear_session()
 
 
+def wait_for_quick_view(mw):
+    """Wait until the pipeline updates and QuickView plots are done
+
+    QuickView is disabled (and ignores clicks) while it computes the
+    scatter plot data, and pipeline modifications cancel polygon
+    filter edits (issue 148).
+    """
+    qv = mw.widget_quick_view
+    for _ in range(10):
+        mw.wait_for_tasks()
+        assert qv.tm.wait_idle(timeout=10)
+        # QuickView results may have triggered new tasks and vice versa
+        if mw.tm.num_tasks == 0 and qv.isEnabled():
+            break
+
+
 def test_simple(qtbot):
     """Open the main window and close it again"""
     main_window = DCscope()
@@ -82,6 +98,7 @@ def test_duplicate_polygon_filter_issue_148(qtbot, mw):
     qtbot.mouseClick(em, QtCore.Qt.MouseButton.LeftButton)
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 500)
+    wait_for_quick_view(mw)
 
     # did that work?
     assert mw.ui.toolButton_quick_view.isChecked()
@@ -94,6 +111,7 @@ def test_duplicate_polygon_filter_issue_148(qtbot, mw):
                      QtCore.Qt.MouseButton.LeftButton)
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 500)
+    wait_for_quick_view(mw)
 
     # three positions (not sure how to do this with mouse clicks)
     points = [[22, 0.01],
@@ -117,6 +135,7 @@ def test_duplicate_polygon_filter_issue_148(qtbot, mw):
 
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 500)
+    wait_for_quick_view(mw)
 
     assert mw.widget_ana_view.ui.tab_filter.isVisible()
     cb = fv._polygon_checkboxes[pf.unique_id]
@@ -126,6 +145,7 @@ def test_duplicate_polygon_filter_issue_148(qtbot, mw):
     qtbot.mouseClick(fv.ui.pushButton_apply, QtCore.Qt.MouseButton.LeftButton)
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 500)
+    wait_for_quick_view(mw)
 
     # Did that work?
     ds = mw.pipeline.get_dataset(slot_index=0, filt_index=0,
@@ -136,6 +156,8 @@ def test_duplicate_polygon_filter_issue_148(qtbot, mw):
     # in the filter widget, and hit "Save" in QuickView.
     # Hit modify
     qv.ui.comboBox_poly.setCurrentIndex(1)
+    # wait for the plot of the polygon filter axes
+    assert qv.tm.wait_idle(timeout=10)
     # Uncheck checkbox
     cb = fv._polygon_checkboxes[pf.unique_id]
     assert cb.checkState() == QtCore.Qt.CheckState.Checked
@@ -143,11 +165,13 @@ def test_duplicate_polygon_filter_issue_148(qtbot, mw):
     qtbot.mouseClick(fv.ui.pushButton_apply, QtCore.Qt.MouseButton.LeftButton)
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 500)
+    wait_for_quick_view(mw)
 
     assert not cb.checkState() == QtCore.Qt.CheckState.Checked
 
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 500)
+    wait_for_quick_view(mw)
 
     # Make sure we only have one polygon filter
     assert len(dclab.PolygonFilter.instances) == 1, "this worked before"
@@ -155,6 +179,7 @@ def test_duplicate_polygon_filter_issue_148(qtbot, mw):
     assert qv.ui.comboBox_poly.count() == 2
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 5000)
+    wait_for_quick_view(mw)
 
     # Now hit "Save" if it is visible (it should not be visible)
     if qv.ui.pushButton_poly_save.isVisible():
@@ -162,6 +187,7 @@ def test_duplicate_polygon_filter_issue_148(qtbot, mw):
                          QtCore.Qt.MouseButton.LeftButton)
         QtWidgets.QApplication.processEvents(
             QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 500)
+        wait_for_quick_view(mw)
 
     # Check again
     # "Polygon Filter X" and "Choose..." selection
@@ -192,6 +218,7 @@ def test_no_events_disable(qtbot, mw):
                      QtCore.Qt.KeyboardModifier.ShiftModifier)
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 5000)
+    wait_for_quick_view(mw)
 
     # Get Quick View instance
     qv = mw.widget_quick_view
@@ -312,6 +339,7 @@ def test_no_events_issue_223_nan(qtbot, mw):
     qtbot.mouseClick(sv.ui.pushButton_apply, QtCore.Qt.MouseButton.LeftButton)
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 500)
+    wait_for_quick_view(mw)
 
     # did that work?
     assert sv.ui.comboBox_lut.currentData() == "HE-3D-FEM-22"
@@ -365,6 +393,7 @@ def test_remove_dataset_h5py_error(qtbot, mw):
                      QtCore.Qt.KeyboardModifier.ShiftModifier)
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 500)
+    wait_for_quick_view(mw)
     # did that work?
     assert mw.pipeline.is_element_active(slot_id, filt_id)
 
@@ -409,6 +438,7 @@ def test_translate_polygon_filter_issue_115(qtbot, mw):
     qtbot.mouseClick(em, QtCore.Qt.MouseButton.LeftButton)
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 500)
+    wait_for_quick_view(mw)
 
     # did that work?
     assert mw.ui.toolButton_quick_view.isChecked()
@@ -421,6 +451,7 @@ def test_translate_polygon_filter_issue_115(qtbot, mw):
                      QtCore.Qt.MouseButton.LeftButton)
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 500)
+    wait_for_quick_view(mw)
     # three positions (not sure how to do this with mouse clicks)
     points = [[22, 0.01],
               [30, 0.01],
@@ -444,6 +475,7 @@ def test_translate_polygon_filter_issue_115(qtbot, mw):
 
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 500)
+    wait_for_quick_view(mw)
 
     assert not cb.checkState() == QtCore.Qt.CheckState.Checked
     cb.setCheckState(QtCore.Qt.CheckState.Checked)
@@ -452,6 +484,7 @@ def test_translate_polygon_filter_issue_115(qtbot, mw):
 
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 500)
+    wait_for_quick_view(mw)
 
     # did that work?
     ds = mw.pipeline.get_dataset(slot_index=0, filt_index=0,
@@ -460,6 +493,8 @@ def test_translate_polygon_filter_issue_115(qtbot, mw):
 
     # Modify the polygon filter by translating it
     qv.ui.comboBox_poly.setCurrentIndex(1)
+    # wait for the plot of the polygon filter axes
+    assert qv.tm.wait_idle(timeout=10)
     # do this without mouse interaction in this test
     qv.ui.widget_scatter.poly_line_roi.translate(1, -.002, snap=False)
     qtbot.mouseClick(qv.ui.pushButton_poly_save,
@@ -468,6 +503,7 @@ def test_translate_polygon_filter_issue_115(qtbot, mw):
     pf2 = dclab.PolygonFilter.instances[0]
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 5000)
+    wait_for_quick_view(mw)
     points2 = [[23, 0.008],
                [31, 0.008],
                [31, 0.012],
@@ -508,6 +544,7 @@ def test_update_polygon_filter_issue_26(qtbot, mw):
     qtbot.mouseClick(em, QtCore.Qt.MouseButton.LeftButton)
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 500)
+    wait_for_quick_view(mw)
 
     # did that work?
     assert mw.ui.toolButton_quick_view.isChecked()
@@ -520,6 +557,7 @@ def test_update_polygon_filter_issue_26(qtbot, mw):
                      QtCore.Qt.MouseButton.LeftButton)
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 500)
+    wait_for_quick_view(mw)
     # three positions (not sure how to do this with mouse clicks)
     points = [[22, 0.01],
               [30, 0.01],
@@ -542,6 +580,7 @@ def test_update_polygon_filter_issue_26(qtbot, mw):
 
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 500)
+    wait_for_quick_view(mw)
 
     assert mw.widget_ana_view.ui.tab_filter.isVisible()
 
@@ -550,11 +589,13 @@ def test_update_polygon_filter_issue_26(qtbot, mw):
 
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 5000)
+    wait_for_quick_view(mw)
 
     assert cb.checkState() == QtCore.Qt.CheckState.Checked
     qtbot.mouseClick(fv.ui.pushButton_apply, QtCore.Qt.MouseButton.LeftButton)
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 500)
+    wait_for_quick_view(mw)
 
     # did that work?
     ds = mw.pipeline.get_dataset(slot_index=0, filt_index=0,
@@ -563,6 +604,8 @@ def test_update_polygon_filter_issue_26(qtbot, mw):
 
     # Modify the polygon filter
     qv.ui.comboBox_poly.setCurrentIndex(1)
+    # wait for the plot of the polygon filter axes
+    assert qv.tm.wait_idle(timeout=10)
     points2 = [[22, 0.01],
                [30, 0.01],
                [30, 0.012],
@@ -572,6 +615,7 @@ def test_update_polygon_filter_issue_26(qtbot, mw):
                      QtCore.Qt.MouseButton.LeftButton)
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 500)
+    wait_for_quick_view(mw)
 
     assert len(dclab.PolygonFilter.instances) == 1
     pf2 = dclab.PolygonFilter.instances[0]
@@ -618,6 +662,7 @@ def test_subtract_background(qtbot, mw):
                      QtCore.Qt.KeyboardModifier.ShiftModifier)
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 5000)
+    wait_for_quick_view(mw)
 
     # Check if QuickView-window is open
     assert mw.ui.toolButton_quick_view.isChecked(), "Quickview not Open"
@@ -630,6 +675,7 @@ def test_subtract_background(qtbot, mw):
     qtbot.mouseClick(event_tool, QtCore.Qt.MouseButton.LeftButton)
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 5000)
+    wait_for_quick_view(mw)
 
     # Test if checkbox is visible and checked by default
     assert qv.ui.checkBox_image_background.isVisible(), (
@@ -649,6 +695,7 @@ def test_subtract_background(qtbot, mw):
                      QtCore.Qt.KeyboardModifier.ShiftModifier)
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 5000)
+    wait_for_quick_view(mw)
 
     qv2 = mw.widget_quick_view
 
@@ -696,6 +743,7 @@ def test_auto_contrast(qtbot, mw):
     qtbot.mouseClick(event_tool, QtCore.Qt.MouseButton.LeftButton)
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 5000)
+    wait_for_quick_view(mw)
 
     # Test if checkbox is visible and checked by default
     assert qv.ui.checkBox_image_contrast.isVisible(), "Checkbox is not visible"
@@ -744,6 +792,7 @@ def test_auto_contrast_qpi(qtbot, mw):
 
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 500)
+    wait_for_quick_view(mw)
     # Get QuickView instance
     qv = mw.widget_quick_view
 
@@ -752,6 +801,7 @@ def test_auto_contrast_qpi(qtbot, mw):
     qtbot.mouseClick(event_tool, QtCore.Qt.MouseButton.LeftButton)
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 500)
+    wait_for_quick_view(mw)
 
     # Test if checkbox is visible and checked by default
     assert qv.ui.checkBox_image_contrast.isVisible(), "Checkbox is not visible"
@@ -812,6 +862,7 @@ def test_auto_contrast_vmin_vmax_qpi(qtbot, mw):
 
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 5000)
+    wait_for_quick_view(mw)
 
     # Test if checkbox is visible and checked by default
     assert qv.ui.checkBox_image_contrast.isVisible(), "Checkbox is not visible"
@@ -878,6 +929,7 @@ def test_contour_display(qtbot, mw):
 
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 5000)
+    wait_for_quick_view(mw)
 
     # Test if checkbox is visible and checked by default
     assert qv.ui.checkBox_image_contour.isVisible(), "Checkbox is not visible"
@@ -939,6 +991,7 @@ def test_contour_display_qpi_amp(qtbot, mw):
     qtbot.mouseClick(event_tool, QtCore.Qt.MouseButton.LeftButton)
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 5000)
+    wait_for_quick_view(mw)
 
     # Test if checkbox is visible and checked by default
     assert qv.ui.checkBox_image_contour.isVisible(), "Checkbox is not visible"
@@ -1002,6 +1055,7 @@ def test_contour_display_qpi_pha(qtbot, mw):
     qtbot.mouseClick(event_tool, QtCore.Qt.MouseButton.LeftButton)
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 5000)
+    wait_for_quick_view(mw)
 
     # Test if checkbox is visible and checked by default
     assert qv.ui.checkBox_image_contour.isVisible(), "Checkbox is not visible"
@@ -1277,11 +1331,13 @@ def test_cache_selected_event_using_dataslot_issue_196(qtbot, mw):
                      QtCore.Qt.KeyboardModifier.ShiftModifier)
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 500)
+    wait_for_quick_view(mw)
 
     em1 = mw.ui.block_matrix.get_widget(slot_id1, filt_id)
     qtbot.mouseClick(em1, QtCore.Qt.MouseButton.LeftButton)
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 500)
+    wait_for_quick_view(mw)
 
     # did that work?
     assert mw.pipeline.is_element_active(slot_id1, filt_id)
@@ -1299,6 +1355,7 @@ def test_cache_selected_event_using_dataslot_issue_196(qtbot, mw):
     qtbot.mouseClick(plot_tool, QtCore.Qt.MouseButton.LeftButton)
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 500)
+    wait_for_quick_view(mw)
 
     # select an event index in slot1
     qv.show_event(slot1_event)
@@ -1323,6 +1380,7 @@ def test_cache_selected_event_using_dataslot_issue_196(qtbot, mw):
     qtbot.mouseClick(em2, QtCore.Qt.MouseButton.LeftButton)
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 500)
+    wait_for_quick_view(mw)
 
     # did that work?
     assert mw.pipeline.is_element_active(slot_id2, filt_id)
@@ -1346,6 +1404,7 @@ def test_cache_selected_event_using_dataslot_issue_196(qtbot, mw):
     qtbot.mouseClick(em2, QtCore.Qt.MouseButton.LeftButton)
     QtWidgets.QApplication.processEvents(
         QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 500)
+    wait_for_quick_view(mw)
 
     # Do we still have the correct event shown?
     assert qv.ui.spinBox_event.value()-1 == slot1_event
@@ -1,3 +1,5 @@
+import os
+import threading
 import time
 
 from PyQt6 import QtWidgets, QtTest
@@ -10,8 +12,215 @@ import pytest
 def test_task_empty(qtbot):
     mw = QtWidgets.QMainWindow()
     tm = TaskManager(mw)
-    assert len(tm.workers) == 1
-    assert len(tm.threads) == 1
+    assert len(tm.workers) == (os.cpu_count() or 1)
+    assert len(tm.threads) == (os.cpu_count() or 1)
+    tm.close()
+
+
+def test_task_empty_num_workers(qtbot):
+    mw = QtWidgets.QMainWindow()
+    tm = TaskManager(mw, num_workers=3)
+    assert len(tm.workers) == 3
+    assert len(tm.threads) == 3
+    tm.close()
+
+
+def test_task_pool_concurrent(qtbot):
+    """Tasks of the same topic are distributed over the workers"""
+    mw = QtWidgets.QMainWindow()
+    barrier = threading.Barrier(3, timeout=10)
+
+    def method(argument):
+        # this only works if all three tasks run at the same time
+        barrier.wait()
+        return threading.current_thread().name, argument
+
+    tm = TaskManager(mw, num_workers=3)
+
+    tasks = [{"func": method, "args": [ii]} for ii in range(3)]
+    for task in tasks:
+        tm.add_task(task)
+
+    while tm.num_tasks:
+        QtTest.QTest.qWait(100)
+
+    for ii, task in enumerate(tasks):
+        assert tm.get_task_result(task)[1] == ii
+    tm.close()
+
+
+def test_task_pool_fair_topics(qtbot):
+    """Topics are served in turns"""
+    mw = QtWidgets.QMainWindow()
+    order = []
+
+    def method(argument):
+        order.append(argument)
+
+    tm = TaskManager(mw, num_workers=1)
+    # keep the worker busy while we fill up the queues
+    event = threading.Event()
+    tm.add_task({"func": lambda: event.wait(10)}, topic="block")
+    while not tm.num_tasks_running:
+        QtTest.QTest.qWait(10)
+
+    for ii in range(3):
+        tm.add_task({"func": method, "args": [f"a{ii}"]}, topic="a")
+    tm.add_task({"func": method, "args": ["b0"]}, topic="b")
+    event.set()
+
+    while tm.num_tasks:
+        QtTest.QTest.qWait(100)
+
+    assert order == ["a0", "b0", "a1", "a2"]
+    tm.close()
+
+
+def test_task_dispatch_event_driven(qtbot):
+    """Finished (or failed) tasks immediately hand out the next task"""
+    mw = QtWidgets.QMainWindow()
+
+    def method(argument):
+        if argument % 2:
+            raise ValueError("A TEST ERROR")
+        return argument
+
+    tm = TaskManager(mw, num_workers=1)
+    tasks = [{"func": method, "args": [ii]} for ii in range(20)]
+    t0 = time.perf_counter()
+    for task in tasks:
+        tm.add_task(task)
+
+    while tm.num_tasks:
+        QtTest.QTest.qWait(10)
+
+    # polling every 500 ms would take several seconds
+    assert time.perf_counter() - t0 < 2
+    for ii, task in enumerate(tasks):
+        if ii % 2:
+            assert tm.is_task_failed(task)
+        else:
+            assert tm.get_task_result(task) == ii
+    tm.close()
+
+
+def test_task_priority(qtbot):
+    """Topics with a higher priority are served first"""
+    mw = QtWidgets.QMainWindow()
+    order = []
+
+    def method(argument):
+        order.append(argument)
+
+    tm = TaskManager(mw, num_workers=1)
+    # keep the worker busy while we fill up the queues
+    event = threading.Event()
+    tm.add_task({"func": lambda: event.wait(10)}, topic="block")
+    while not tm.num_tasks_running:
+        QtTest.QTest.qWait(10)
+
+    for ii in range(2):
+        tm.add_task({"func": method, "args": [f"export{ii}"]},
+                    topic="export", priority=-10)
+        tm.add_task({"func": method, "args": [f"general{ii}"]})
+    tm.add_task({"func": method, "args": ["quickview"]},
+                topic="quickview", priority=10)
+    event.set()
+
+    while tm.num_tasks:
+        QtTest.QTest.qWait(100)
+
+    assert order == ["quickview", "general0", "general1",
+                     "export0", "export1"]
+    tm.close()
+
+
+def test_task_queue_wait(qtbot):
+    mw = QtWidgets.QMainWindow()
+    tm = TaskManager(mw, num_workers=1)
+    event = threading.Event()
+    task_block = {"func": lambda: event.wait(10)}
+    tm.add_task(task_block)
+    task = {"func": lambda: None}
+    tm.add_task(task)
+    while not tm.num_tasks_running:
+        QtTest.QTest.qWait(10)
+    QtTest.QTest.qWait(200)
+    event.set()
+
+    while tm.num_tasks:
+        QtTest.QTest.qWait(10)
+
+    assert task_block["queue wait"] < task["queue wait"]
+    assert task["queue wait"] >= 0.2
+    assert "time queued" not in task
+    tm.close()
+
+
+def test_task_supersede(qtbot):
+    """New tasks replace queued and running tasks with the same key"""
+    mw = QtWidgets.QMainWindow()
+
+    def method_running(event_abort):
+        for _ in range(100):
+            if event_abort.is_set():
+                return
+            time.sleep(0.1)
+
+    def method(argument):
+        return argument
+
+    tm = TaskManager(mw, num_workers=1)
+    task_running = {"func": method_running}
+    tm.add_task(task_running, supersede="plot")
+    while not tm.is_task_running(task_running):
+        QtTest.QTest.qWait(10)
+
+    # superseded while running
+    task_queued = {"func": method, "args": [1]}
+    tm.add_task(task_queued, supersede="plot")
+    assert task_running["status"] == "aborted"
+    # superseded while queued
+    task_latest = {"func": method, "args": [2]}
+    tm.add_task(task_latest, supersede="plot")
+    assert task_queued["status"] == "aborted"
+    # other keys are not affected
+    task_other = {"func": method, "args": [3]}
+    tm.add_task(task_other, supersede="other")
+
+    while tm.num_tasks:
+        QtTest.QTest.qWait(10)
+
+    assert not tm.is_task_finished(task_running)
+    assert not tm.is_task_finished(task_queued)
+    assert tm.get_task_result(task_latest) == 2
+    assert tm.get_task_result(task_other) == 3
+    tm.close()
+
+
+def test_task_pool_sequential_topic(qtbot):
+    """Tasks of a sequential topic never run at the same time"""
+    mw = QtWidgets.QMainWindow()
+    lock = threading.Lock()
+    order = []
+
+    def method(argument):
+        assert lock.acquire(blocking=False), "tasks ran concurrently"
+        time.sleep(0.05)
+        order.append(argument)
+        lock.release()
+
+    tm = TaskManager(mw, num_workers=4)
+    tasks = [{"func": method, "args": [ii]} for ii in range(5)]
+    for task in tasks:
+        tm.add_task(task, topic="serial", sequential=True)
+
+    while tm.num_tasks:
+        QtTest.QTest.qWait(100)
+
+    for task in tasks:
+        assert tm.is_task_finished(task)
+    assert order == list(range(5))
     tm.close()
 
 
@@ -282,3 +491,55 @@ def test_task_reset(qtbot):
     assert task["status"] == "aborted"
 
     tm.close()
+
+
+def test_task_reset_waits_for_workers(qtbot):
+    """Reset returns as soon as the running tasks stopped"""
+    mw = QtWidgets.QMainWindow()
+    tm = TaskManager(mw, num_workers=4)
+
+    def method(event_abort):
+        while not event_abort.is_set():
+            time.sleep(0.01)
+
+    tasks = [{"func": method} for _ in range(4)]
+    for task in tasks:
+        tm.add_task(task)
+
+    while tm.num_tasks_running < 4:
+        QtTest.QTest.qWait(10)
+
+    t0 = time.perf_counter()
+    tm.reset()
+    # Previously, `reset` slept 0.5s for every busy worker.
+    assert time.perf_counter() - t0 < 0.5
+    assert not [w for w in tm.workers if w.event_busy.is_set()]
+    assert [task["status"] for task in tasks] == ["aborted"] * 4
+
+    tm.close()
+
+
+def test_task_wait_idle(qtbot):
+    """wait_idle returns when all tasks are done and delivered"""
+    mw = QtWidgets.QMainWindow()
+    tm = TaskManager(mw, num_workers=2)
+
+    results = []
+    tm.task_done.connect(lambda task, result: results.append(result))
+
+    def method(value):
+        time.sleep(0.05)
+        return value
+
+    for ii in range(5):
+        tm.add_task({"func": method, "args": [ii]})
+
+    assert tm.wait_idle(timeout=10)
+    assert tm.num_tasks == 0
+    assert sorted(results) == list(range(5))
+
+    tm.add_task({"func": lambda: time.sleep(1)})
+    assert not tm.wait_idle(timeout=0.1)
+    assert tm.wait_idle()
+
+    tm.close()
@@ -0,0 +1,130 @@
+import pathlib
+import shutil
+
+import dclab
+from dclab import cached
+import h5py
+import numpy as np
+
+from dcscope import meta_tool
+
+
+data_path = pathlib.Path(__file__).parent / "data"
+
+
+def test_get_rtdc_metadata_persistent(tmp_path, monkeypatch):
+    path = tmp_path / "calibration_beads_47.rtdc"
+    shutil.copy2(data_path / "calibration_beads_47.rtdc", path)
+    cache_path = tmp_path / "cache"
+    cache_path.mkdir()
+
+    store_keeper = cached.StoreKeeper.get_instance()
+    disk_store_path = store_keeper.disk_store.path
+    store_keeper.set_disk_store_path(cache_path)
+    try:
+        meta = meta_tool.get_rtdc_metadata(path)
+        mm = meta_tool.get_rtdc_features_minmax(path, "deform")
+        # move the cached data to the disk store
+        store_keeper.perform_tasks()
+        store_keeper.memory_store.clear()
+        meta_tool.get_rtdc_metadata.cache_clear()
+        meta_tool.get_rtdc_features_minmax.cache_clear()
+
+        # the dataset must not be opened again
+        def new_dataset(*args, **kwargs):
+            raise AssertionError("Dataset opened despite cache")
+        monkeypatch.setattr(meta_tool.dclab, "new_dataset", new_dataset)
+
+        meta2 = meta_tool.get_rtdc_metadata(path)
+        assert meta2 == meta
+        assert meta2["config"]["experiment"]["sample"] == "calibration_beads"
+        assert meta2["format"] == "hdf5"
+        assert "deform" in meta2["features innate"]
+        assert np.allclose(meta_tool.get_rtdc_features_minmax(path, "deform")
+                           ["deform"], mm["deform"])
+        cfg = meta_tool.get_rtdc_config(path)
+        assert cfg["setup"]["channel width"] == 20
+    finally:
+        store_keeper.disk_store.path = disk_store_path
+        store_keeper.disk_store.index.clear()
+        store_keeper.memory_store.clear()
+        meta_tool.get_rtdc_metadata.cache_clear()
+        meta_tool.get_rtdc_features_minmax.cache_clear()
+        meta_tool.get_rtdc_config.cache_clear()
+
+
+def test_compute_feature_statistics(tmp_path):
+    path = tmp_path / "test.rtdc"
+    deform = np.linspace(0.01, 0.2, 1000)
+    deform[10] = np.nan
+    deform[20] = np.inf
+    deform[999] = -np.inf
+    with dclab.RTDCWriter(path) as hw:
+        hw.store_metadata({"experiment": {"sample": "test", "run index": 1}})
+        hw.store_feature("deform", deform)
+        hw.store_feature("area_um", np.arange(1000) + 5.)
+    # remove the stored minimum and maximum
+    with h5py.File(path, "a") as h5:
+        for feat in ["deform", "area_um"]:
+            for key in ["min", "max"]:
+                h5["events"][feat].attrs.pop(key, None)
+
+    with dclab.new_dataset(path) as ds:
+        stats = meta_tool.compute_feature_statistics(
+            ds, ["deform", "area_um"], chunk_size=100)
+    assert stats["deform"]["nan"] == 1
+    assert stats["deform"]["inf"] == 2
+    assert stats["deform"]["finite"] == 997
+    assert np.allclose(stats["deform"]["min"], 0.01)
+    assert np.allclose(stats["deform"]["max"], deform[998])
+    assert stats["area_um"]["finite"] == 1000
+    assert stats["area_um"]["min"] == 5
+    assert stats["area_um"]["max"] == 1004
+
+    mm = meta_tool.get_rtdc_features_minmax(path, "deform", "area_um")
+    assert np.allclose(mm["deform"], [0.01, deform[998]])
+    assert np.allclose(mm["area_um"], [5, 1004])
+
+    mmb = meta_tool.get_rtdc_features_minmax_bulk(
+        [path, data_path / "calibration_beads_47.rtdc"],
+        features=["deform"])
+    assert np.allclose(mmb["deform"], [0.008171429857611656, deform[998]])
+
+
+def test_compute_feature_statistics_dict():
+    deform = np.linspace(0.01, 0.2, 1000)
+    deform[500] = np.nan
+    ds = dclab.new_dataset({"deform": deform,
+                            "area_um": np.linspace(20, 100, 1000)})
+    stats = meta_tool.compute_feature_statistics(
+        ds, ["deform", "area_um"], chunk_size=64)
+    assert stats["deform"]["nan"] == 1
+    assert stats["deform"]["finite"] == 999
+    assert np.allclose(stats["deform"]["min"], 0.01)
+    assert np.allclose(stats["deform"]["max"], 0.2)
+    assert np.allclose(stats["area_um"]["min"], 20)
+    assert np.allclose(stats["area_um"]["max"], 100)
+
+
+def test_get_rtdc_features_minmax_stored(tmp_path):
+    path = tmp_path / "test.rtdc"
+    with dclab.RTDCWriter(path) as hw:
+        hw.store_metadata({"experiment": {"sample": "test", "run index": 1}})
+        hw.store_feature("deform", np.linspace(0.01, 0.2, 1000))
+        hw.store_feature("area_um", np.full(1000, np.nan))
+    with h5py.File(path, "a") as h5:
+        # the stored values are used (and not computed)
+        h5["events"]["deform"].attrs["min"] = 0.05
+        h5["events"]["deform"].attrs["max"] = 0.15
+        for key in ["min", "max"]:
+            h5["events"]["area_um"].attrs.pop(key, None)
+
+    mm = meta_tool.get_rtdc_features_minmax(path, "deform", "area_um")
+    assert mm["deform"] == [0.05, 0.15]
+    # features without finite values are omitted
+    assert "area_um" not in mm
+
+    with dclab.new_dataset(path) as ds:
+        chunk_length = ds["deform"].h5ds.chunks[0]
+        block_size = meta_tool.get_block_size(ds, ["deform"], chunk_size=150)
+    assert block_size % chunk_length == 0
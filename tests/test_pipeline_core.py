@@ -1,10 +1,13 @@
 import copy
 import pathlib
 import socket
+import threading
+import time
 
 import dclab
 import numpy as np
 from dcscope import pipeline, session
+from dcscope.pipeline import plot_data
 import pytest
 
 
@@ -18,6 +21,69 @@ with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         NET_AVAILABLE = False
 
 
+def test_add_slots(tmp_path):
+    path = pathlib.Path(__file__).parent / "data" / "calibration_beads_47.rtdc"
+    bad_path = tmp_path / "does_not_exist.rtdc"
+
+    pl = pipeline.Pipeline()
+    progress = []
+    slot_ids, failed = pl.add_slots([path, bad_path, path],
+                                    communicate_progress=progress.append)
+    assert len(slot_ids) == 2
+    assert pl.slot_ids == slot_ids
+    assert len(failed) == 1
+    assert failed[0][0] == bad_path
+    assert progress[-1] == 1
+
+    # slot states are also supported
+    state = pl.slots[0].__getstate__()
+    state["identifier"] = "slot:copy"
+    slot_ids2, _ = pl.add_slots([state])
+    assert slot_ids2 == ["slot:copy"]
+    assert pl.get_slot("slot:copy").name == state["name"]
+
+
+def test_add_slots_abort():
+    path = pathlib.Path(__file__).parent / "data" / "calibration_beads_47.rtdc"
+
+    pl = pipeline.Pipeline()
+    event_abort = threading.Event()
+    event_abort.set()
+    slot_ids, failed = pl.add_slots([path, path], event_abort=event_abort)
+    assert not slot_ids
+    assert not failed
+    assert pl.num_slots == 0
+
+
+def test_add_slots_abort_progress(monkeypatch):
+    """Raising in `communicate_progress` does not wait for all slots"""
+    path = pathlib.Path(__file__).parent / "data" / "calibration_beads_47.rtdc"
+
+    class AbortError(BaseException):
+        pass
+
+    def communicate_progress(value):
+        raise AbortError()
+
+    opened = []
+
+    def open_slot_slow(*args, **kwargs):
+        time.sleep(0.2)
+        opened.append(True)
+        return pipeline.Dataslot(*args, **kwargs)
+
+    monkeypatch.setattr(pipeline.core, "Dataslot", open_slot_slow)
+    pl = pipeline.Pipeline()
+    with pytest.raises(AbortError):
+        pl.add_slots([path] * 10,
+                     num_workers=1,
+                     communicate_progress=communicate_progress)
+    time.sleep(0.5)
+    # the pending slots were not opened
+    assert len(opened) < 10
+    assert pl.num_slots == 0
+
+
 def test_apply_filter_ray():
     path = pathlib.Path(__file__).parent / "data" / "calibration_beads_47.rtdc"
 
@@ -78,6 +144,60 @@ def test_session_dcor():
     ]
 
 
+def test_get_dirty_elements():
+    path = pathlib.Path(__file__).parent / "data" / "calibration_beads_47.rtdc"
+
+    pl = pipeline.Pipeline()
+    slot_ids = [pl.add_slot(path=path) for _ in range(3)]
+    filt_ids = [pl.add_filter() for _ in range(2)]
+    plot_ids = [pl.add_plot() for _ in range(3)]
+    pf = dclab.PolygonFilter(axes=["area_um", "deform"],
+                             points=[[0, 0], [100, 0], [100, .1]])
+    pl.get_filter(filt_ids[0]).polylist.append(pf.unique_id)
+    # slot0 -> plot0, plot1; slot1 -> plot1; slot2 -> plot2
+    for slot_id, filt_id, plot_id in [(slot_ids[0], filt_ids[0], plot_ids[0]),
+                                      (slot_ids[0], filt_ids[0], plot_ids[1]),
+                                      (slot_ids[1], filt_ids[1], plot_ids[1]),
+                                      (slot_ids[2], filt_ids[1], plot_ids[2]),
+                                      ]:
+        pl.set_element_active(slot_id, filt_id)
+        pl.set_element_active(slot_id, plot_id)
+
+    # all elements are new
+    dirty = pl.get_dirty_elements()
+    assert dirty == {"slots": set(slot_ids), "plots": set(plot_ids)}
+    # nothing changed
+    assert pl.get_dirty_elements() == {"slots": set(), "plots": set()}
+
+    # modify the polygon filter
+    pf.points = [[0, 0], [100, 0], [100, .2]]
+    assert pl.get_dirty_elements() == {"slots": {slot_ids[0]},
+                                       "plots": set(plot_ids[:2])}
+
+    # modify a filter
+    pl.get_filter(filt_ids[1]).boxdict["area_um"] = {
+        "start": 0, "end": 30, "active": True}
+    assert pl.get_dirty_elements() == {"slots": set(slot_ids[1:]),
+                                       "plots": set(plot_ids[1:])}
+
+    # modify a plot
+    plot_state = pl.get_plot(plot_ids[2]).__getstate__()
+    plot_state["general"]["axis x"] = "area_um"
+    pl.get_plot(plot_ids[2]).__setstate__(plot_state)
+    assert pl.get_dirty_elements() == {"slots": set(),
+                                       "plots": {plot_ids[2]}}
+
+    # add a slot to a plot
+    pl.set_element_active(slot_ids[2], plot_ids[0])
+    assert pl.get_dirty_elements() == {"slots": set(),
+                                       "plots": {plot_ids[0]}}
+
+    # remove a filter
+    pl.remove_filter(filt_ids[0])
+    assert pl.get_dirty_elements() == {"slots": {slot_ids[0]},
+                                       "plots": set(plot_ids[:2])}
+
+
 def test_get_min_max_inf(tmp_path):
     # generate fake dataset
     path = pathlib.Path(__file__).parent / "data" / "calibration_beads_47.rtdc"
@@ -146,6 +266,174 @@ def test_get_min_max_plot():
     assert amax2 <= (amin + amax) / 2
 
 
+def test_get_min_max_stats_index(monkeypatch):
+    path = pathlib.Path(__file__).parent / "data" / "calibration_beads_47.rtdc"
+
+    pl = pipeline.Pipeline()
+    slot_id = pl.add_slot(path=path)
+    filt_id = pl.add_filter()
+    pl.set_element_active(slot_id, filt_id)
+    plot_id = pl.add_plot()
+    pl.set_element_active(slot_id, plot_id)
+
+    amin, amax = pl.get_min_max("area_um", plot_id=plot_id)
+    assert len(pl.stats_index) == 1
+
+    # the index is keyed on the dataset and filter hashes
+    def get_ray_state(*args, **kwargs):
+        raise AssertionError("The ray state should not be computed!")
+    monkeypatch.setattr(plot_data, "get_ray_state", get_ray_state)
+
+    # repeated query uses the index
+    assert pl.get_min_max("area_um", plot_id=plot_id) == [amin, amax]
+    assert len(pl.stats_index) == 1
+
+    # cosmetic changes of the slot do not affect the index
+    slot = pl.get_slot(slot_id)
+    slot.color = "#123456"
+    slot.name = "renamed"
+    assert pl.get_min_max("area_um", plot_id=plot_id) == [amin, amax]
+    assert len(pl.stats_index) == 1
+
+    # modifying the filter yields a new entry
+    filt = pl.get_filter(filt_id)
+    filt.boxdict["area_um"] = {"start": amin,
+                               "end": (amin + amax)/2,
+                               "active": True}
+    amin2, amax2 = pl.get_min_max("area_um", plot_id=plot_id)
+    assert len(pl.stats_index) == 2
+    assert amin2 == amin
+    assert amax2 <= (amin + amax) / 2
+
+    # removing the slot invalidates its entries
+    pl.remove_slot(slot_id)
+    assert len(pl.stats_index) == 0
+
+
+def test_get_sane_spacing_range_cached():
+    path = pathlib.Path(__file__).parent / "data" / "calibration_beads_47.rtdc"
+
+    pl = pipeline.Pipeline()
+    slot_id = pl.add_slot(path=path)
+    slot = pl.get_slot(slot_id)
+    ds = slot.get_dataset()
+    for feat in ["area_um", "time"]:
+        ref = pipeline.dataslot.get_sane_contour_spacing_range(
+            feat, np.array(ds[feat][:]))
+        assert slot.get_sane_spacing_range(feat) == ref
+        assert slot.get_sane_spacing_range(feat) == ref
+    assert len(slot._sane_spacing_ranges) == 2
+
+
+def test_prepare_rays():
+    path = pathlib.Path(__file__).parent / "data" / "calibration_beads_47.rtdc"
+
+    threads_before = threading.enumerate()
+    pl = pipeline.Pipeline()
+    slot_ids = [pl.add_slot(path=path) for _ in range(4)]
+    filt_id = pl.add_filter()
+    filt = pl.get_filter(filt_id)
+    amin, amax = pl.get_min_max("area_um")
+    filt.boxdict["area_um"] = {"start": amin,
+                               "end": (amin + amax) / 2,
+                               "active": True}
+    for slot_id in slot_ids:
+        pl.set_element_active(slot_id, filt_id)
+    # slot not used
+    pl.get_slot(slot_ids[3]).slot_used = False
+
+    futures = pl.prepare_rays()
+    assert sorted(futures) == sorted(slot_ids[:3])
+    datasets = {slot_id: fut.result() for slot_id, fut in futures.items()}
+    for ii, slot_id in enumerate(slot_ids[:3]):
+        ds = datasets[slot_id]
+        # the hierarchy child contains the filtered events
+        assert 0 < len(ds) < 47
+        # consumers get the prepared datasets
+        assert pl.get_dataset(ii) is ds
+
+    # concurrent calls to `get_dataset` are safe
+    filt.boxdict["area_um"]["end"] = amax
+    futures = pl.prepare_rays(slot_ids)
+    ds0 = pl.get_dataset(0)
+    assert futures[slot_ids[0]].result() is ds0
+    assert len(ds0) == 47
+    assert pl.get_datasets() == [fut.result() for fut in futures.values()]
+
+    # concurrent calls to `get_ray` create only one ray
+    pl.rays.clear()
+    rays = []
+    threads = [threading.Thread(target=lambda: rays.append(
+        pl.get_ray(slot_ids[0]))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(rays) == 8
+    assert all(ray is rays[0] for ray in rays)
+
+    # resetting the pipeline shuts down the thread pool
+    threads = [th for th in threading.enumerate()
+               if th.name.startswith("FilterRay")
+               and th not in threads_before]
+    assert threads
+    pl.reset()
+    assert not any(th.is_alive() for th in threads)
+
+
+def test_setstate_incremental():
+    path = pathlib.Path(__file__).parent / "data" / "calibration_beads_47.rtdc"
+
+    pl = pipeline.Pipeline()
+    slot_ids = [pl.add_slot(path=path) for _ in range(3)]
+    filt_ids = [pl.add_filter() for _ in range(2)]
+    plot_id = pl.add_plot()
+    for slot_id in slot_ids:
+        pl.set_element_active(slot_id, filt_ids[0])
+        pl.set_element_active(slot_id, plot_id)
+    ds0 = pl.get_slot(slot_ids[0]).get_dataset()
+    child0 = pl.get_dataset(0)
+    assert len(child0) == 47
+    slot0 = pl.get_slot(slot_ids[0])
+    filt0 = pl.get_filter(filt_ids[0])
+    ray0 = pl.get_ray(slot_ids[0])
+
+    state = pl.__getstate__()
+    # modify a filter
+    state["filters"][0]["box filters"]["area_um"] = {
+        "start": 0, "end": 30, "active": True}
+    # remove a slot and reorder the others
+    state["slots"] = [state["slots"][2], state["slots"][0]]
+    state["slots used"] = [slot_ids[2], slot_ids[0]]
+    state["elements"].pop(slot_ids[1])
+    # remove a filter
+    state["filters"].pop(1)
+    state["filters used"].pop(1)
+    for slot_id in state["elements"]:
+        state["elements"][slot_id].pop(filt_ids[1])
+    # add a plot
+    plot_state = pipeline.Plot().__getstate__()
+    state["plots"].append(plot_state)
+    for slot_id in state["elements"]:
+        state["elements"][slot_id][plot_state["identifier"]] = False
+
+    pl.__setstate__(state)
+    assert pl.__getstate__() == state
+    assert pl.slot_ids == [slot_ids[2], slot_ids[0]]
+    assert pl.filter_ids == [filt_ids[0]]
+    assert pl.plot_ids == [plot_id, plot_state["identifier"]]
+    # unchanged elements are kept with their datasets and filter rays
+    assert pl.get_slot(slot_ids[0]) is slot0
+    assert slot0.get_dataset() is ds0
+    assert pl.get_filter(filt_ids[0]) is filt0
+    assert pl.get_ray(slot_ids[0]) is ray0
+    assert slot_ids[1] not in pl.rays
+    child1 = pl.get_dataset(1)
+    assert len(child1) == np.sum(ds0["area_um"] <= 30)
+    # the state is the same as that of a new pipeline
+    assert pipeline.Pipeline(state).__getstate__() == state
+
+
 if __name__ == "__main__":
     # Run all tests
     loc = locals()
@@ -1,7 +1,12 @@
 import pathlib
+import threading
 
+import dclab
+from dclab import cached
 import numpy as np
 from dcscope import pipeline
+from dcscope.pipeline.dataslot import get_dataset_lock
+from dcscope.pipeline import filter_cache, polygon_engine
 
 
 def test_get_heredity():
@@ -147,3 +152,246 @@ def test_remove_filter():
     ds2 = ray.get_dataset()
     assert len(ds2) == 47
     assert np.sum(ds2.filter.all) == 47
+
+
+def test_dataset_lock():
+    path = pathlib.Path(__file__).parent / "data" / "calibration_beads_47.rtdc"
+    slot = pipeline.Dataslot(path)
+    ray = pipeline.FilterRay(slot)
+    filt = pipeline.Filter()
+    filt.boxdict["area_um"] = {"start": 0, "end": 40, "active": True}
+    ray.set_filters([filt])
+    ds = ray.get_dataset()
+    # the slot dataset and the ray children share the lock of the slot
+    assert ray.lock is slot.lock
+    assert get_dataset_lock(slot.get_dataset()) is slot.lock
+    assert get_dataset_lock(ds) is slot.lock
+    # datasets that do not belong to a slot
+    with dclab.new_dataset(path) as ds_other:
+        assert get_dataset_lock(ds_other) is not slot.lock
+        with get_dataset_lock(ds_other):
+            pass
+
+
+def test_reopen_evicted_dataset(monkeypatch):
+    path = pathlib.Path(__file__).parent / "data" / "calibration_beads_47.rtdc"
+    monkeypatch.setattr(pipeline.dataslot.dataset_pool, "max_open", 1)
+
+    slot1 = pipeline.Dataslot(path)
+    ds = slot1.get_dataset()
+    ray = pipeline.FilterRay(slot1)
+    filt = pipeline.Filter()
+    filt.boxdict["area_um"] = {"start": np.min(ds["area_um"]),
+                               "end": np.mean(ds["area_um"]),
+                               "active": True}
+    ray.set_filters([filt])
+    deform = np.array(ray.get_dataset()["deform"])
+
+    # opening another dataset closes the dataset of the first slot
+    slot2 = pipeline.Dataslot(path)
+    slot2.get_dataset()
+    assert not slot1.is_open
+
+    # the dataset is reopened and the filter ray is restored
+    ds2 = ray.get_dataset()
+    assert slot1.is_open
+    assert not slot2.is_open
+    assert ray._generation == 0
+    assert np.all(ds2["deform"] == deform)
+    assert len(ds2) < len(slot1.get_dataset())
+
+
+def test_evicted_dataset_child_in_use(monkeypatch):
+    """Hierarchy children remain readable when their slot is closed"""
+    path = pathlib.Path(__file__).parent / "data" / "calibration_beads_47.rtdc"
+    monkeypatch.setattr(pipeline.dataslot.dataset_pool, "max_open", 1)
+    slot1 = pipeline.Dataslot(path)
+    ray = pipeline.FilterRay(slot1)
+    filt = pipeline.Filter()
+    filt.boxdict["area_um"] = {"start": 0, "end": 30, "active": True}
+    ray.set_filters([filt])
+    child = ray.get_dataset()
+    with dclab.new_dataset(path) as ds0:
+        deform = ds0["deform"][ds0["area_um"] <= 30]
+
+    # closes the dataset of the first slot
+    slot2 = pipeline.Dataslot(path)
+    slot2.get_dataset()
+    assert not slot1.is_open
+    assert not ray.segments
+    assert len(child) == deform.size
+    assert np.all(child["deform"] == deform)
+
+    # the filter ray is rebuilt with the reopened dataset
+    child2 = ray.get_dataset()
+    assert child2 is not child
+    assert np.all(child2["deform"] == deform)
+
+
+def test_evicted_dataset_locked(monkeypatch):
+    """Slots whose lock is held by another thread are not closed"""
+    path = pathlib.Path(__file__).parent / "data" / "calibration_beads_47.rtdc"
+    monkeypatch.setattr(pipeline.dataslot.dataset_pool, "max_open", 1)
+    slot1 = pipeline.Dataslot(path)
+    slot2 = pipeline.Dataslot(path)
+    slot1.get_dataset()
+    assert not slot2.is_open
+
+    locked = threading.Event()
+    done = threading.Event()
+
+    def hold_lock():
+        with slot1.lock:
+            locked.set()
+            done.wait(timeout=10)
+
+    thread = threading.Thread(target=hold_lock)
+    thread.start()
+    try:
+        assert locked.wait(timeout=10)
+        slot2.get_dataset()
+        assert slot1.is_open
+        assert slot2.is_open
+    finally:
+        done.set()
+        thread.join()
+    # the first slot is closed once it is not used anymore
+    slot2.get_dataset()
+    assert not slot1.is_open
+
+
+def test_filter_mask_cache(tmp_path, monkeypatch):
+    path = pathlib.Path(__file__).parent / "data" / "calibration_beads_47.rtdc"
+    cache_path = tmp_path / "cache"
+    cache_path.mkdir()
+    store_keeper = cached.StoreKeeper.get_instance()
+    disk_store_path = store_keeper.disk_store.path
+    store_keeper.set_disk_store_path(cache_path)
+
+    def get_filters():
+        pf = dclab.PolygonFilter(axes=["area_um", "deform"],
+                                 points=[[10, 0], [10, 0.02],
+                                         [40, 0.02], [40, 0]])
+        filt1 = pipeline.Filter(identifier="filter:a")
+        filt1.boxdict["area_um"] = {"start": 0, "end": 40, "active": True}
+        filt1.polylist.append(pf.unique_id)
+        filt2 = pipeline.Filter(identifier="filter:b")
+        filt2.boxdict["deform"] = {"start": 0, "end": 0.015, "active": True}
+        return [filt1, filt2]
+
+    try:
+        slot = pipeline.Dataslot(path, identifier="slot:a")
+        ray = pipeline.FilterRay(slot)
+        ray.set_filters(get_filters())
+        ds = ray.get_dataset()
+        filt_ref = ds.hparent.filter.all.copy()
+        assert 0 < len(ds) < len(ds.get_root_parent())
+        assert np.sum(ds.hparent.filter.all) < len(ds.hparent)
+        # only the mask of the first segment is cached
+        assert len(list(cache_path.rglob("*_meta.json"))) == 1
+
+        # new filters (with new polygon filter ids), slot, and ray
+        dclab.PolygonFilter.clear_all_filters()
+        polygon_engine.polygon_mask_cache.clear()
+        filters = get_filters()
+        slot2 = pipeline.Dataslot(path, identifier="slot:a")
+        ray2 = pipeline.FilterRay(slot2)
+        ray2.set_filters(filters)
+
+        # the mask must not be computed again
+        def compute_polygon_masks(*args, **kwargs):
+            raise AssertionError("polygon filter computed")
+        monkeypatch.setattr(polygon_engine, "compute_polygon_masks",
+                            compute_polygon_masks)
+        ds2 = ray2.get_dataset()
+        assert len(ds2) == len(ds)
+        assert np.all(ds2.hparent.filter.all == filt_ref)
+        assert np.all(ds2["deform"] == ds["deform"])
+
+        # modifying the first filter after restoring its mask
+        monkeypatch.undo()
+        filters[0].boxdict["area_um"]["end"] = 30
+        ds3 = ray2.get_dataset()
+        ds0 = slot2.get_dataset()
+        pf = dclab.PolygonFilter.get_instance_from_id(filters[0].polylist[0])
+        ref = (pf.filter(ds0["area_um"], ds0["deform"])
+               & (ds0["area_um"] <= 30) & (ds0["deform"] <= 0.015))
+        assert 0 < len(ds3) == np.sum(ref) < len(ds2)
+    finally:
+        dclab.PolygonFilter.clear_all_filters()
+        store_keeper.disk_store.path = disk_store_path
+        store_keeper.disk_store.index.clear()
+
+
+def test_filter_mask_cache_remote_dataset():
+    path = pathlib.Path(__file__).parent / "data" / "calibration_beads_47.rtdc"
+    slot = pipeline.Dataslot(path)
+    filt = pipeline.Filter()
+    filt.boxdict["area_um"] = {"start": 0, "end": 40, "active": True}
+    assert filter_cache.get_mask_key(slot, filt) is not None
+    # masks of datasets that are not local HDF5 files are not cached
+    slot.format = "dcor"
+    slot.path = "http://example.com/calibration_beads_47.rtdc"
+    assert filter_cache.get_mask_key(slot, filt) is None
+
+
+def test_incremental_filter_update(monkeypatch):
+    path = pathlib.Path(__file__).parent / "data" / "calibration_beads_47.rtdc"
+    # disable the persistent filter mask cache
+    monkeypatch.setattr(cached.StoreKeeper.get_instance().disk_store,
+                        "path", None)
+    pf = dclab.PolygonFilter(axes=["area_um", "deform"],
+                             points=[[10, 0], [10, 0.02],
+                                     [40, 0.02], [40, 0]])
+    try:
+        slot = pipeline.Dataslot(path)
+        ds0 = slot.get_dataset()
+        filt1 = pipeline.Filter()
+        filt1.boxdict["area_um"] = {"start": 0, "end": 40, "active": True}
+        filt1.boxdict["deform"] = {"start": 0, "end": 0.1, "active": True}
+        filt2 = pipeline.Filter()
+        filt2.polylist.append(pf.unique_id)
+        ray = pipeline.FilterRay(slot)
+        ray.set_filters([filt1])
+        ds = ray.get_dataset()
+        size1 = len(ds)
+
+        # narrow down the box filter of the first filter
+        filt1.boxdict["area_um"]["end"] = 30
+        features = []
+        getitem = ds0.__class__.__getitem__
+
+        def getitem_record(self, feat):
+            if self is ds0:
+                features.append(feat)
+            return getitem(self, feat)
+        monkeypatch.setattr(ds0.__class__, "__getitem__", getitem_record)
+
+        ds2 = ray.get_dataset()
+        assert ray._generation == 1
+        assert ray.segments[0][1] is ds0
+        # only the modified box filter is recomputed
+        assert "area_um" in features
+        assert "deform" not in features
+        assert len(ds2) < size1
+        monkeypatch.undo()
+
+        # compare with a new filter ray
+        ray.set_filters([filt1, filt2])
+        ds2 = ray.get_dataset()
+        ray_new = pipeline.FilterRay(pipeline.Dataslot(path))
+        ray_new.set_filters([filt1, filt2])
+        ds_new = ray_new.get_dataset()
+        assert len(ds_new) == len(ds2)
+        assert np.all(ds_new["area_um"] == ds2["area_um"])
+        assert np.all(ds_new.hparent.filter.all == ds2.hparent.filter.all)
+
+        # removing a box filter works as well
+        filt1.boxdict.pop("area_um")
+        ds3 = ray.get_dataset()
+        assert ray._generation == 2
+        assert np.max(ds3["area_um"]) > 30
+        ref = pf.filter(ds0["area_um"], ds0["deform"]) & (ds0["deform"] <= .1)
+        assert len(ds3) == np.sum(ref)
+    finally:
+        dclab.PolygonFilter.clear_all_filters()
@@ -0,0 +1,191 @@
+from concurrent.futures import ProcessPoolExecutor
+import copy
+import multiprocessing
+import pathlib
+import time
+
+import dclab
+import numpy as np
+from dcscope import pipeline
+from dcscope.pipeline import plot_data
+
+
+data_path = pathlib.Path(__file__).parent / "data"
+
+
+def setup_pipeline():
+    path = data_path / "calibration_beads_47.rtdc"
+    pl = pipeline.Pipeline()
+    slot_id = pl.add_slot(path=path)
+    filt_id = pl.add_filter()
+    filt = pl.get_filter(filt_id)
+    amin, amax = pl.get_min_max("area_um")
+    filt.boxdict["area_um"] = {"start": amin,
+                               "end": (amin + amax)/2,
+                               "active": True}
+    pf = dclab.PolygonFilter(axes=["area_um", "deform"],
+                             points=[[0, 0], [0, 1], [100, 1], [100, 0]])
+    filt.polylist.append(pf.unique_id)
+    pl.set_element_active(slot_id, filt_id)
+    plot_id = pl.add_plot()
+    pl.set_element_active(slot_id, plot_id)
+    return pl, slot_id, plot_id
+
+
+def test_compute_in_process():
+    pl, slot_id, plot_id = setup_pipeline()
+    plot_state = pl.get_plot(plot_id).__getstate__()
+    plot_state["scatter"]["marker hue"] = "feature"
+    plot_state["scatter"]["hue feature"] = "bright_avg"
+    ds = pl.get_dataset(0)
+    ray_state = plot_data.get_ray_state(pl, ds.identifier)
+    assert ray_state["slot"]["identifier"] == slot_id
+    assert len(ray_state["polygon filters"]) == 1
+
+    scatter_ref = plot_data.compute_scatter(ds, plot_state)
+    contours_ref = plot_data.compute_contours(ds, plot_state)
+
+    with ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn")) as pool:
+        scatter = plot_data.receive_scatter(
+            plot_data.run_in_process_pool(
+                pool, plot_data.compute_scatter_in_process,
+                ray_state, plot_state))
+        contours = plot_data.receive_contours(
+            plot_data.run_in_process_pool(
+                pool, plot_data.compute_contours_in_process,
+                ray_state, plot_state))
+
+    assert len(scatter) == len(scatter_ref) == 5
+    for arr, arr_ref in zip(scatter, scatter_ref):
+        assert np.allclose(arr, arr_ref, equal_nan=True)
+
+    assert len(contours) == len(contours_ref)
+    for cc, cc_ref in zip(contours, contours_ref):
+        assert len(cc) == len(cc_ref)
+        for line, line_ref in zip(cc, cc_ref):
+            assert np.allclose(line, line_ref)
+
+
+def test_share_arrays():
+    arrays = [np.arange(10, dtype=float),
+              np.zeros(0),
+              None,
+              np.ones(5, dtype=bool)]
+    shared = plot_data.share_arrays(arrays)
+    assert isinstance(shared[0], tuple)
+    assert shared[2] is None
+    received = plot_data.receive_arrays(shared)
+    assert np.all(received[0] == arrays[0])
+    assert received[1].size == 0
+    assert received[2] is None
+    assert received[3].dtype == bool
+    assert np.all(received[3])
+
+
+def test_cache_key():
+    pl, slot_id, plot_id = setup_pipeline()
+    plot_state = pl.get_plot(plot_id).__getstate__()
+    ds = pl.get_dataset(0)
+    ray_state = plot_data.get_ray_state(pl, ds.identifier)
+
+    for kw in [{"rtdc_ds": ds}, {"ray_state": ray_state}]:
+        dataset_key = plot_data.get_dataset_key(**kw)
+        key_s = plot_data.get_cache_key("scatter", plot_state, dataset_key)
+        key_c = plot_data.get_cache_key("contour", plot_state, dataset_key)
+        assert key_s != key_c
+
+        # presentation-only changes
+        ps2 = copy.deepcopy(plot_state)
+        ps2["scatter"]["colormap"] = "inferno"
+        ps2["contour"]["line widths"] = [1.0, 1.0]
+        assert plot_data.get_cache_key("scatter", ps2, dataset_key) == key_s
+        assert plot_data.get_cache_key("contour", ps2, dataset_key) == key_c
+
+        # percentiles only affect contours
+        ps3 = copy.deepcopy(plot_state)
+        ps3["contour"]["percentiles"] = [90.0, 50.0]
+        assert plot_data.get_cache_key("scatter", ps3, dataset_key) == key_s
+        assert plot_data.get_cache_key("contour", ps3, dataset_key) != key_c
+
+    # the slot color does not affect the data
+    rs2 = copy.deepcopy(ray_state)
+    rs2["slot"]["color"] = "#123456"
+    assert plot_data.get_dataset_key(ray_state=rs2) == \
+        plot_data.get_dataset_key(ray_state=ray_state)
+
+    # changing a filter changes the key
+    filt = pl.filters[0]
+    filt.boxdict["area_um"]["end"] *= .9
+    ds2 = pl.get_dataset(0)
+    assert plot_data.get_dataset_key(rtdc_ds=ds2) != \
+        plot_data.get_dataset_key(rtdc_ds=ds)
+    ray_state2 = plot_data.get_ray_state(pl, ds2.identifier)
+    assert plot_data.get_dataset_key(ray_state=ray_state2) != \
+        plot_data.get_dataset_key(ray_state=ray_state)
+
+    # datasets that are not part of a filter ray are not cached
+    ds3 = dclab.new_dataset(pl.slots[0].path)
+    assert plot_data.get_dataset_key(rtdc_ds=ds3) is None
+
+
+def test_cache_lru():
+    cache = plot_data.PlotDataCache(max_size=2, max_bytes=1000)
+    cache.set("a", np.zeros(10))
+    cache.set("b", [np.zeros(10)])
+    assert cache.nbytes == 160
+    assert cache.get("a") is not None
+    cache.set("c", np.zeros(10))
+    # "b" was the least recently used
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+    assert cache.get("b") is None
+    assert cache.hits == 1
+    assert cache.misses == 1
+    # too large
+    cache.set("d", np.zeros(200))
+    assert "d" not in cache
+    # evicted due to size
+    cache.set("e", np.zeros(120))
+    assert len(cache) == 1
+    assert "e" in cache
+
+
+def test_density_grid_reused_for_percentiles(monkeypatch):
+    pl, slot_id, plot_id = setup_pipeline()
+    plot_state = pl.get_plot(plot_id).__getstate__()
+    plot_state["general"]["kde"] = "histogram"
+    ds = pl.get_dataset(0)
+
+    # count the density grids computed by dclab
+    calls = []
+    kde_fct = dclab.kde.base.methods["histogram"]
+
+    def kde_counted(**kwargs):
+        calls.append(1)
+        # dclab only caches results that took more than 10 ms
+        time.sleep(0.02)
+        return kde_fct(**kwargs)
+
+    monkeypatch.setitem(dclab.kde.base.methods, "histogram", kde_counted)
+
+    # use a spacing that no other test used (dclab cache)
+    plot_state["general"]["spacing x"] *= 1.01
+    plot_data.compute_contours(ds, plot_state)
+    assert len(calls) == 1
+
+    # new percentiles only require the contour-level extraction
+    ps2 = copy.deepcopy(plot_state)
+    ps2["contour"]["percentiles"] = [80.0, 20.0]
+    plot_data.compute_contours(ds, ps2)
+    # the scatter density is interpolated from the same grid
+    plot_data.compute_scatter(ds, plot_state)
+    assert len(calls) == 1
+
+    # a different spacing requires a new grid
+    ps3 = copy.deepcopy(plot_state)
+    ps3["general"]["spacing x"] *= 2
+    plot_data.compute_contours(ds, ps3)
+    assert len(calls) == 2
@@ -0,0 +1,88 @@
+import pathlib
+
+import dclab
+from dclab import cached
+import numpy as np
+from dcscope import pipeline
+from dcscope.pipeline import polygon_engine
+
+
+data_path = pathlib.Path(__file__).parent / "data"
+
+
+def test_compute_polygon_masks():
+    rng = np.random.default_rng(42)
+    area_um = rng.uniform(0, 100, 5000)
+    deform = rng.uniform(0, 0.1, 5000)
+    area_um[:10] = np.nan
+    deform[10:20] = np.inf
+    ds = dclab.new_dataset({"area_um": area_um,
+                            "deform": deform,
+                            "bright_avg": rng.uniform(0, 200, 5000)})
+    polygons = [
+        dclab.PolygonFilter(axes=["area_um", "deform"],
+                            points=[[10, 0.01], [50, 0.01], [30, 0.05]]),
+        dclab.PolygonFilter(axes=["area_um", "deform"],
+                            points=[[40, 0.02], [90, 0.02],
+                                    [90, 0.08], [40, 0.08]],
+                            inverted=True),
+        dclab.PolygonFilter(axes=["deform", "bright_avg"],
+                            points=[[0, 0], [0.05, 0], [0.05, 100]]),
+    ]
+    try:
+        masks = polygon_engine.compute_polygon_masks(ds, polygons)
+        assert len(masks) == 3
+        for pf, mask in zip(polygons, masks):
+            ref = pf.filter(ds[pf.axes[0]], ds[pf.axes[1]])
+            assert np.sum(ref) > 0
+            assert np.all(mask == ref)
+    finally:
+        for pf in polygons:
+            dclab.PolygonFilter.remove(pf.unique_id)
+
+
+def test_polygon_filters_in_pipeline(monkeypatch):
+    # disable the persistent filter mask cache
+    monkeypatch.setattr(cached.StoreKeeper.get_instance().disk_store,
+                        "path", None)
+    polygon_engine.polygon_mask_cache.clear()
+    pl = pipeline.Pipeline()
+    slot_id = pl.add_slot(path=data_path / "calibration_beads_47.rtdc")
+    filt_id = pl.add_filter()
+    filt = pl.get_filter(filt_id)
+    pf1 = dclab.PolygonFilter(axes=["area_um", "deform"],
+                              points=[[0, 0], [0, 1], [30, 1], [30, 0]])
+    pf2 = dclab.PolygonFilter(axes=["area_um", "deform"],
+                              points=[[25, 0], [25, 1], [100, 1], [100, 0]])
+    try:
+        filt.polylist += [pf1.unique_id, pf2.unique_id]
+        pl.set_element_active(slot_id, filt_id)
+        ds = pl.get_dataset(0)
+        ds0 = dclab.new_dataset(data_path / "calibration_beads_47.rtdc")
+        ref = (pf1.filter(ds0["area_um"], ds0["deform"])
+               & pf2.filter(ds0["area_um"], ds0["deform"]))
+        assert 0 < np.sum(ref) < len(ds0)
+        assert len(ds) == np.sum(ref)
+        assert np.all(ds.hparent.filter.all == ref)
+        # both polygons were evaluated in one batch
+        assert len(polygon_engine.polygon_mask_cache) == 2
+
+        # disabling and enabling a polygon filter uses the cache
+        filt.polylist.remove(pf2.unique_id)
+        assert len(pl.get_dataset(0)) > np.sum(ref)
+        filt.polylist.append(pf2.unique_id)
+        hits = polygon_engine.polygon_mask_cache.hits
+        misses = polygon_engine.polygon_mask_cache.misses
+        assert len(pl.get_dataset(0)) == np.sum(ref)
+        assert polygon_engine.polygon_mask_cache.hits == hits + 2
+        assert polygon_engine.polygon_mask_cache.misses == misses
+
+        # modifying the points of a polygon filter updates the dataset
+        pf2.points = [[35, 0], [35, 1], [100, 1], [100, 0]]
+        ref2 = (pf1.filter(ds0["area_um"], ds0["deform"])
+                & pf2.filter(ds0["area_um"], ds0["deform"]))
+        assert np.sum(ref2) != np.sum(ref)
+        assert len(pl.get_dataset(0)) == np.sum(ref2)
+    finally:
+        dclab.PolygonFilter.remove(pf1.unique_id)
+        dclab.PolygonFilter.remove(pf2.unique_id)
@@ -0,0 +1,67 @@
+import copy
+import pathlib
+
+from dcscope import pipeline
+from dcscope.pipeline.registry import ElementRegistry
+
+import pytest
+
+
+data_path = pathlib.Path(__file__).parent / "data"
+
+
+class Element:
+    def __init__(self, identifier):
+        self.identifier = identifier
+
+
+def test_registry_index():
+    filters = [pipeline.Filter() for _ in range(4)]
+    reg = ElementRegistry(filters[:3])
+    assert reg.identifiers == tuple(f.identifier for f in filters[:3])
+    assert reg.index_of(filters[2].identifier) == 2
+    assert reg.get(filters[1].identifier) is filters[1]
+    assert reg.get(filters[3].identifier) is None
+    assert not reg.has_identifier(filters[3].identifier)
+    with pytest.raises(ValueError, match="is not in list"):
+        reg.index_of(filters[3].identifier)
+
+    # the index is updated when the list is modified
+    for modify in [lambda r: r.insert(0, filters[3]),
+                   lambda r: r.pop(1),
+                   lambda r: r.reverse(),
+                   lambda r: r.__setitem__(slice(None), r[1:] + r[:1]),
+                   lambda r: r.remove(r[0]),
+                   lambda r: r.append(filters[0]),
+                   lambda r: r.sort(key=lambda f: f.identifier),
+                   ]:
+        modify(reg)
+        for ii, filt in enumerate(reg):
+            assert reg.index_of(filt.identifier) == ii
+        assert reg.identifiers == tuple(f.identifier for f in reg)
+
+
+def test_registry_copy():
+    reg = ElementRegistry([Element("a"), Element("b")])
+    assert reg.index_of("b") == 1
+    reg2 = copy.deepcopy(reg)
+    assert isinstance(reg2, ElementRegistry)
+    assert reg2.identifiers == ("a", "b")
+    reg2.insert(0, Element("c"))
+    assert reg2.index_of("b") == 2
+    assert reg.index_of("b") == 1
+
+
+def test_pipeline_reorder_slots():
+    path = data_path / "calibration_beads_47.rtdc"
+    pl = pipeline.Pipeline()
+    slot_ids = [pl.add_slot(path=path) for _ in range(3)]
+    pl.reorder_slots([2, 0, 1])
+    assert pl.slot_ids == [slot_ids[2], slot_ids[0], slot_ids[1]]
+    for ii, slot_id in enumerate(pl.slot_ids):
+        assert pl.slots.index_of(slot_id) == ii
+        assert pl.get_slot(slot_id) is pl.slots[ii]
+    pl.remove_slot(slot_ids[0])
+    assert pl.slot_ids == [slot_ids[2], slot_ids[1]]
+    with pytest.raises(ValueError, match="Unknown dataset identifier"):
+        pl.get_slot(slot_ids[0])
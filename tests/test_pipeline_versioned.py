@@ -0,0 +1,106 @@
+import copy
+import json
+import pathlib
+import pickle
+
+from dcscope import pipeline
+from dcscope.pipeline import versioned
+
+
+data_path = pathlib.Path(__file__).parent / "data"
+
+
+def test_filter_version():
+    filt = pipeline.Filter()
+    hash0 = filt.hash
+    version = filt.version
+    # the hash is cached
+    assert filt.hash == hash0
+    assert filt.version == version
+
+    filt.boxdict["area_um"] = {"start": 0, "end": 100, "active": True}
+    assert filt.version > version
+    hash1 = filt.hash
+    assert hash1 != hash0
+
+    # nested in-place modifications
+    version = filt.version
+    filt.boxdict["area_um"]["end"] *= .9
+    assert filt.version > version
+    assert filt.hash != hash1
+
+    for modify in [lambda f: f.polylist.append(1),
+                   lambda f: f.polylist.remove(1),
+                   lambda f: f.boxdict.pop("area_um"),
+                   lambda f: f.general.update({"remove invalid events": True}),
+                   lambda f: setattr(f, "filter_used", False),
+                   lambda f: setattr(f, "name", "peter"),
+                   ]:
+        version = filt.version
+        modify(filt)
+        assert filt.version > version
+
+    # state is restored
+    filt2 = pipeline.Filter(identifier=filt.identifier)
+    filt2.__setstate__(filt.__getstate__())
+    assert filt2.hash == filt.hash
+
+
+def test_slot_and_plot_version():
+    slot = pipeline.Dataslot(data_path / "calibration_beads_47.rtdc")
+    version = slot.version
+    hash0 = slot.hash
+    slot.config["emodulus"]["emodulus temperature"] = 23.0
+    assert slot.version > version
+    assert slot.hash != hash0
+
+    plot = pipeline.Plot()
+    version = plot.version
+    hash0 = plot.hash
+    state = plot.__getstate__()
+    state["general"]["axis x"] = "deform"
+    plot.__setstate__(state)
+    assert plot.version > version
+    assert plot.hash != hash0
+    version = plot.version
+    plot.name = "peter"
+    assert plot.version > version
+
+
+def test_tracked_copies_are_plain():
+    calls = []
+    data = versioned.track({"a": [1, {"b": 2}]}, lambda: calls.append(1))
+    data["a"][1]["b"] = 3
+    assert len(calls) == 1
+    for other in [copy.deepcopy(data),
+                  copy.copy(data),
+                  pickle.loads(pickle.dumps(data))]:
+        assert other == {"a": [1, {"b": 3}]}
+        assert type(other) is dict
+    assert json.loads(json.dumps(versioned.untrack(data))) == \
+        {"a": [1, {"b": 3}]}
+    # modifying the copies does not call the callback
+    other["a"].append(4)
+    assert len(calls) == 1
+
+
+def test_tracked_not_copied():
+    filt = pipeline.Filter()
+    box = {"start": 0, "end": 100, "active": True}
+    filt.boxdict = {"area_um": box}
+    version = filt.version
+    filt.boxdict["area_um"]["end"] = 50
+    assert filt.version > version
+    # the dictionaries assigned are modified (aliasing is preserved)
+    assert box["end"] == 50
+    assert versioned.untrack(filt.boxdict)["area_um"] is box
+
+    # sharing objects between elements does not copy them
+    filt2 = pipeline.Filter()
+    filt2.boxdict = filt.boxdict
+    assert versioned.untrack(filt2.boxdict) is \
+        versioned.untrack(filt.boxdict)
+    version2 = filt2.version
+    filt2.boxdict["area_um"]["start"] = 10
+    assert filt2.version > version2
+    assert filt.boxdict["area_um"]["start"] == 10
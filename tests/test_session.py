@@ -284,6 +284,22 @@ def test_simple_save_open_session():
     assert not equal_state(old_state, new_state)
 
 
+def test_open_session_lazy_slots():
+    pl = make_pipeline()
+    old_state = pl.__getstate__()
+
+    tempdir = pathlib.Path(tempfile.mkdtemp(prefix="test_dcscope_session_"))
+    spath = tempdir / "session.so2"
+    session.save_session(spath, pl)
+
+    session.open_session(spath, pl)
+    # the datasets are only opened when needed
+    assert not pl.slots[0].is_open
+    assert equal_state(old_state, pl.__getstate__())
+    pl.get_dataset(0)
+    assert pl.slots[0].is_open
+
+
 def test_wrong_hash():
     tempdir = pathlib.Path(tempfile.mkdtemp(prefix="test_dcscope_session_"))
     spath = tempdir / "session.so2"